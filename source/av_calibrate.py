@@ -0,0 +1,216 @@
+# av_calibrate.py
+#
+# A/V delay estimation for IPStreamer, run as a worker process.
+#
+# Captures a few seconds of two audio sources at the same time (normally
+# the DVB service from the enigma2 stream server, 127.0.0.1:8001/<ref>,
+# and the IP commentary stream), decodes both to low-rate mono PCM with
+# ffmpeg and finds the offset between them with an FFT cross-correlation
+# (GCC-PHAT) in NumPy. Like gst_engine.py it must not import any enigma2
+# module, so it also works offline:
+#
+#   python3 av_calibrate.py --synth 1.25 ref.wav other.wav
+#   python3 av_calibrate.py ref.wav other.wav
+#
+# Output: one JSON object per line on stdout
+#   capturing (seconds), result (offset, confidence), error (message)
+# offset is in seconds and positive when OTHER runs ahead of REF, i.e. an
+# event in REF is heard that much earlier in OTHER.
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import wave
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+RATE = 8000             # Hz; plenty for speech/crowd envelopes, keeps the FFT small
+SECONDS = 12
+MAX_LAG = 60.0          # audioDelay range is -10..60 s
+MAX_LAG_SHARE = 0.6     # searched lag as a share of the capture length
+CAPTURE_GRACE = 20      # extra seconds for connecting before a capture is killed
+
+
+def emit(event, **fields):
+    fields["event"] = event
+    sys.stdout.write(json.dumps(fields) + "\n")
+    sys.stdout.flush()
+
+
+def decode_command(ffmpeg, source, seconds, rate, out_path):
+    return [
+        ffmpeg, "-nostdin", "-hide_banner", "-v", "error",
+        "-i", source, "-map", "0:a:0", "-vn", "-t", str(seconds),
+        "-ac", "1", "-ar", str(rate), "-f", "s16le", "-y", out_path,
+    ]
+
+
+def capture(sources, seconds, rate, ffmpeg="ffmpeg"):
+    """Decode all sources at the same time; returns one int16 array per source."""
+    workdir = tempfile.mkdtemp(prefix="ipstreamer-cal-")
+    try:
+        paths = [os.path.join(workdir, "{}.pcm".format(i)) for i in range(len(sources))]
+        processes = [
+            subprocess.Popen(decode_command(ffmpeg, source, seconds, rate, path),
+                             stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            for source, path in zip(sources, paths)
+        ]
+        errors = [b""] * len(processes)
+
+        def wait(index, process):
+            try:
+                errors[index] = process.communicate(timeout=seconds + CAPTURE_GRACE)[1]
+            except subprocess.TimeoutExpired:
+                process.kill()
+                errors[index] = process.communicate()[1]
+
+        threads = [threading.Thread(target=wait, args=(i, p)) for i, p in enumerate(processes)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        signals = []
+        for source, path, process, error in zip(sources, paths, processes, errors):
+            data = b""
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    data = f.read()
+            if len(data) < rate * 2:
+                message = error.decode("utf-8", "ignore").strip().splitlines()
+                raise RuntimeError("no audio from {}: {}".format(source, message[-1] if message else process.returncode))
+            signals.append(np.frombuffer(data[:len(data) // 2 * 2], dtype="<i2"))
+        return signals
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def read_wav(path, rate):
+    """16-bit WAV as mono int16 at rate (linear resampling if needed)."""
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != 2:
+            raise RuntimeError("{}: only 16-bit WAV is supported".format(path))
+        channels = w.getnchannels()
+        source_rate = w.getframerate()
+        samples = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2")
+    if channels > 1:
+        samples = samples[:len(samples) // channels * channels].reshape(-1, channels).mean(axis=1)
+    if source_rate != rate:
+        count = int(len(samples) * rate / float(source_rate))
+        samples = np.interp(np.arange(count) * (source_rate / float(rate)), np.arange(len(samples)), samples)
+    return np.asarray(samples, dtype=np.int16)
+
+
+def write_wav(path, samples, rate):
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(np.asarray(samples, dtype="<i2").tobytes())
+
+
+def estimate_offset(ref, other, rate, max_lag=MAX_LAG):
+    """
+    (offset, confidence) of other against ref, offset in seconds.
+    GCC-PHAT: the cross spectrum is whitened so the peak depends on shared
+    timing rather than on loudness or the different commentary on top.
+    confidence is the peak height over the correlation's noise floor.
+    """
+    ref = np.asarray(ref, dtype=np.float64)
+    other = np.asarray(other, dtype=np.float64)
+    ref -= ref.mean()
+    other -= other.mean()
+    size = len(ref) + len(other)
+    n = 1 << (size - 1).bit_length()
+    spectrum = np.fft.rfft(ref, n) * np.conj(np.fft.rfft(other, n))
+    spectrum /= np.abs(spectrum) + 1e-12
+    corr = np.fft.irfft(spectrum, n)
+
+    # corr[k] = sum ref[t + k] * other[t]; negative lags wrap to the end.
+    # Larger lags leave too little overlap to be trusted.
+    max_k = min(int(max_lag * rate), int(min(len(ref), len(other)) * MAX_LAG_SHARE))
+    window = np.concatenate((corr[-max_k:], corr[:max_k + 1])) if max_k > 0 else corr[:1]
+    peak = int(np.argmax(window))
+    lag = peak - max_k
+
+    # Parabolic interpolation for a sub-sample peak
+    shift = 0.0
+    if 0 < peak < len(window) - 1:
+        a, b, c = window[peak - 1], window[peak], window[peak + 1]
+        denom = a - 2 * b + c
+        if denom:
+            shift = 0.5 * (a - c) / denom
+
+    floor = np.std(window)
+    confidence = float((window[peak] - np.median(window)) / floor) if floor > 0 else 0.0
+    return (lag + shift) / float(rate), confidence
+
+
+def synth_pair(offset, seconds, rate, seed=1):
+    """Two noisy recordings of the same random 'crowd' signal, other ahead by offset."""
+    rng = np.random.RandomState(seed)
+    lead = int(abs(offset) * rate)
+    total = int(seconds * rate) + lead
+    # Bursty band-limited noise: loudness varies like a crowd, not like a tone
+    base = np.convolve(rng.randn(total), np.ones(8) / 8.0, mode="same")
+    base *= np.repeat(rng.rand(total // 800 + 1) ** 2, 800)[:total]
+    count = int(seconds * rate)
+    if offset >= 0:
+        ref, other = base[:count], base[lead:lead + count]
+    else:
+        ref, other = base[lead:lead + count], base[:count]
+    # Independent "commentary" on each side
+    ref = ref + 0.3 * rng.randn(count) * ref.std()
+    other = other + 0.3 * rng.randn(count) * other.std()
+    scale = 12000.0 / max(np.abs(ref).max(), np.abs(other).max())
+    return (ref * scale).astype(np.int16), (other * scale).astype(np.int16)
+
+
+def load(sources, seconds, rate, ffmpeg):
+    if all(s.lower().endswith(".wav") and os.path.isfile(s) for s in sources):
+        return [read_wav(s, rate) for s in sources]
+    return capture(sources, seconds, rate, ffmpeg)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate the delay between two audio sources.")
+    parser.add_argument("ref", help="reference source (DVB stream URL or file)")
+    parser.add_argument("other", help="source to align (IP stream URL or file)")
+    parser.add_argument("--seconds", type=float, default=SECONDS, help="capture length")
+    parser.add_argument("--rate", type=int, default=RATE, help="analysis sample rate")
+    parser.add_argument("--max-lag", type=float, default=MAX_LAG, help="largest offset searched, seconds")
+    parser.add_argument("--ffmpeg", default="ffmpeg", help="ffmpeg binary used to decode")
+    parser.add_argument("--synth", type=float, metavar="OFFSET",
+                        help="write a synthetic WAV pair to REF and OTHER, OTHER ahead by OFFSET seconds")
+    args = parser.parse_args()
+
+    if np is None:
+        emit("error", message="python numpy is not installed")
+        return 1
+    try:
+        if args.synth is not None:
+            ref, other = synth_pair(args.synth, args.seconds, args.rate)
+            write_wav(args.ref, ref, args.rate)
+            write_wav(args.other, other, args.rate)
+            emit("written", ref=args.ref, other=args.other, offset=args.synth)
+            return 0
+        emit("capturing", seconds=args.seconds)
+        ref, other = load([args.ref, args.other], args.seconds, args.rate, args.ffmpeg)
+        offset, confidence = estimate_offset(ref, other, args.rate, args.max_lag)
+        emit("result", offset=round(offset, 3), confidence=round(confidence, 1))
+    except Exception as e:
+        emit("error", message=str(e))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,11 +2,11 @@
 import json, os
 from datetime import datetime, timedelta, timezone
 from Components.config import config
-import urllib.request
 import json
 import os
 import xml.etree.ElementTree as ET
 from .plugin import getPlaylistDir  # you already have this helper
+from .net import fetch
 
 TMP_JSON = "/var/volatile/tmp/beinepg.json"
 
@@ -92,16 +92,15 @@ def fetch_and_build_simple_epg():
     url = build_url()
     log_debug("[beIN] Fetching URL: {}".format(url))
 
-    req = urllib.request.Request(
+    body = fetch(
         url,
         headers={
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36",
             "Accept": "application/json, text/plain, */*",
-        }
+        },
+        timeout=10,
     )
-
-    with urllib.request.urlopen(req, timeout=10) as r:
-        data = json.loads(r.read().decode("utf-8"))
+    data = json.loads(body.decode("utf-8"))
 
     with open(TMP_JSON, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False)
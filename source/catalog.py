@@ -0,0 +1,212 @@
+# catalog.py
+#
+# Process-wide cache of the parsed playlist files.
+#
+# hosts.json, the ipstreamer_*.json categories and the custom playlist are
+# parsed once and kept with the (mtime, size, inode) they were read at.
+# Every lookup costs one os.stat(); a file is parsed again only when that
+# changed (an atomic tmp + rename write changes the inode even within one
+# mtime tick). The category list is re-globbed only when the playlist
+# directory's own mtime changes (a file was added, removed or renamed).
+# The list view, grid view, custom playlist screen and web interface all
+# read through here. Returned objects are shared: treat them as read-only
+# and write the file instead.
+#
+# The channel index maps every URL and normalized channel name of hosts.json
+# and the categories to (category, position), so restoring the last channel
+# is one lookup instead of rendering every category to search it. It is
+# saved next to the playlists (channel_index.json) with the keys of the files
+# it was built from, so a restart reuses it without parsing any playlist, and
+# it is rebuilt when any of those keys changes.
+
+import glob
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+REDC = "**"
+ENDC = "**"
+
+def cprint(text):
+    print(REDC + text + ENDC)
+
+
+def file_key(path):
+    """What identifies one version of a file on disk, None if it is missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns if hasattr(st, "st_mtime_ns") else st.st_mtime, st.st_size, st.st_ino
+
+
+def category_name(path):
+    """ipstreamer_sport.json -> Sport"""
+    return os.path.basename(path).replace("ipstreamer_", "").replace(".json", "").capitalize()
+
+
+INDEX_FILE = "channel_index.json"
+
+
+def normalize_name(name):
+    """'beIN Sports 1 HD' -> 'beinsports1hd': case, spaces and punctuation ignored."""
+    return re.sub(r"[^0-9a-z]+", "", (name or "").lower().replace("+", "plus"))
+
+
+def host_channels(host):
+    """[name, url] of the 'name|url' cmds of one hosts.json entry."""
+    channels = []
+    for cmd in host.get("cmds", []):
+        if "|" in cmd:
+            parts = cmd.split("|")
+            channels.append([parts[0], parts[1]])
+    return channels
+
+
+class PlaylistCatalog(object):
+    """Parsed playlist files, reloaded when their stat changes."""
+
+    def __init__(self):
+        self.lock = threading.Lock()    # the health scanner reads from a thread
+        self.files = {}                 # path -> (key, data, channels)
+        self.dirs = {}                  # directory -> (mtime, [{'name', 'file'}])
+        self.index = None               # (signature, urls, names) of the channel index
+
+    def entry(self, path, ordered=False):
+        key = file_key(path)
+        if key is None:
+            with self.lock:
+                self.files.pop(path, None)
+            return None
+        with self.lock:
+            cached = self.files.get(path)
+        if cached is not None and cached[0] == key:
+            return cached
+        try:
+            with open(path, "r") as f:
+                data = json.load(f, object_pairs_hook=OrderedDict if ordered else None)
+        except (IOError, OSError, ValueError) as e:
+            cprint("[IPStreamer] Cannot parse {}: {}".format(path, str(e)))
+            return None
+        channels = []
+        if isinstance(data, dict):
+            for channel in data.get("playlist", []):
+                try:
+                    channels.append([str(channel["channel"]), str(channel["url"])])
+                except (KeyError, TypeError):
+                    pass
+        cached = (key, data, channels)
+        with self.lock:
+            self.files[path] = cached
+        return cached
+
+    def playlist(self, path):
+        """Parsed playlist JSON of path, None if missing or broken."""
+        cached = self.entry(path)
+        return cached[1] if cached is not None else None
+
+    def channels(self, path):
+        """[name, url] of every usable entry of path ([] if none)."""
+        cached = self.entry(path)
+        return cached[2] if cached is not None else []
+
+    def hosts(self, path):
+        """hosts.json in file order, None if missing or broken."""
+        cached = self.entry(path, ordered=True)
+        return cached[1] if cached is not None else None
+
+    def categories(self, directory):
+        """[{'name', 'file'}] of the ipstreamer_*.json files in directory, sorted."""
+        try:
+            mtime = os.stat(directory).st_mtime
+        except OSError:
+            return []
+        with self.lock:
+            cached = self.dirs.get(directory)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        files = sorted(glob.glob(os.path.join(directory, "ipstreamer_*.json")))
+        categories = [{"name": category_name(path), "file": path} for path in files]
+        with self.lock:
+            self.dirs[directory] = (mtime, categories)
+        return categories
+
+    def sources(self, hosts_path, directory):
+        """[(category, channels)] in the order the screens list them."""
+        sources = []
+        for host, data in (self.hosts(hosts_path) or {}).items():
+            if isinstance(data, dict):
+                sources.append((host, host_channels(data)))
+        for category in self.categories(directory):
+            sources.append((category["name"], self.channels(category["file"])))
+        return sources
+
+    def channelIndex(self, hosts_path, directory):
+        """(urls, names): url / normalized name -> [(category, position)]."""
+        files = [hosts_path] + [category["file"] for category in self.categories(directory)]
+        signature = tuple((path, file_key(path)) for path in files)
+        with self.lock:
+            index = self.index
+        if index is None or index[0] != signature:
+            index = self.loadIndex(directory, signature)
+        if index is not None and index[0] == signature:
+            with self.lock:
+                self.index = index
+            return index[1], index[2]
+        urls = {}
+        names = {}
+        for category, channels in self.sources(hosts_path, directory):
+            for position, (name, url) in enumerate(channels):
+                urls.setdefault(url, []).append((category, position))
+                names.setdefault(normalize_name(name), []).append((category, position))
+        with self.lock:
+            self.index = (signature, urls, names)
+        cprint("[IPStreamer] Channel index: {} urls in {} files".format(len(urls), len(files)))
+        self.saveIndex(directory, signature, urls, names)
+        return urls, names
+
+    def loadIndex(self, directory, signature):
+        """The saved index if it was built from exactly these file keys, else None."""
+        try:
+            with open(os.path.join(directory, INDEX_FILE), "r") as f:
+                data = json.load(f)
+            saved = tuple((path, tuple(key) if key is not None else None) for path, key in data["signature"])
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            return None
+        if saved != signature:
+            return None
+        return signature, data.get("urls", {}), data.get("names", {})
+
+    def saveIndex(self, directory, signature, urls, names):
+        path = os.path.join(directory, INDEX_FILE)
+        try:
+            with open(path + ".tmp", "w") as f:
+                json.dump({"signature": signature, "urls": urls, "names": names}, f)
+            os.rename(path + ".tmp", path)
+        except (IOError, OSError) as e:
+            cprint("[IPStreamer] Cannot save {}: {}".format(path, str(e)))
+
+    def locate(self, hosts_path, directory, url, name="", prefer=None):
+        """(category, position) of url, else of the channel called name; None if unknown.
+
+        With several matches the one in category prefer wins, else the first listed.
+        """
+        urls, names = self.channelIndex(hosts_path, directory)
+        matches = urls.get(url) or (names.get(normalize_name(name)) if name else None)
+        if not matches:
+            return None
+        for match in matches:
+            if match[0] == prefer:
+                return match
+        return matches[0]
+
+
+_catalog = None
+
+def getCatalog():
+    global _catalog
+    if _catalog is None:
+        _catalog = PlaylistCatalog()
+    return _catalog
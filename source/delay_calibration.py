@@ -0,0 +1,126 @@
+# delay_calibration.py
+#
+# Runs av_calibrate.py as a worker process and turns its result into
+# audio/video delay settings.
+#
+# The worker captures the DVB service audio (enigma2 stream server) and
+# the IP stream at the same time and reports their offset. Its stdout is
+# read through the reactor like the player pipes, so the UI never waits
+# on the capture or the FFT.
+
+import json
+import math
+import os
+import subprocess
+from sys import version_info
+
+from twisted.internet import reactor
+
+from Plugins.Extensions.IPStreamer.lifecycle import getProcessManager
+from Plugins.Extensions.IPStreamer.player_cmd import PlayerCommand, launch, resolve_binary
+from Plugins.Extensions.IPStreamer.player_control import DELAY_MAX
+from Plugins.Extensions.IPStreamer.stream_stats import PipeReader
+
+REDC = "**"
+ENDC = "**"
+
+def cprint(text):
+    print(REDC + text + ENDC)
+
+
+CALIBRATE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "av_calibrate.py")
+CAPTURE_MIN = 20            # seconds captured from each source
+CAPTURE_MAX = 90
+WORKER_GRACE = 40           # seconds on top of the capture before the worker is killed
+MIN_CONFIDENCE = 6.0        # below this the correlation peak is not trusted
+
+
+def capture_seconds(expected_offset=0):
+    """Capture long enough that expected_offset is well inside the searched lag."""
+    return int(min(CAPTURE_MAX, max(CAPTURE_MIN, abs(expected_offset) * 2 + 10)))
+
+
+def build_calibration_cmd(dvb_url, ip_url, seconds=CAPTURE_MIN):
+    python = "python3" if version_info[0] == 3 else "python"
+    ffmpeg = resolve_binary("ffmpeg") or "ffmpeg"
+    return PlayerCommand([python, "-u", CALIBRATE_SCRIPT, "--ffmpeg", ffmpeg, "--seconds", seconds, dvb_url, ip_url])
+
+
+def suggest_delays(offset, video_delay=0):
+    """
+    (audio_delay, video_delay) for a measured offset (positive = IP audio
+    ahead of the DVB picture) with video_delay seconds of timeshift active.
+    IP audio that runs behind the picture needs more video delay (whole
+    seconds); the audio delay takes up the rest.
+    """
+    audio = offset + video_delay
+    if audio < 0:
+        video_delay = int(math.ceil(-offset))
+        audio = offset + video_delay
+    return round(min(DELAY_MAX, audio), 2), video_delay
+
+
+class DelayCalibration(object):
+    """One calibration run; callback(offset, confidence, error)."""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.process = None
+        self.reader = None
+        self.timeout = None
+        self.done = False
+
+    def running(self):
+        return self.process is not None and not self.done
+
+    def start(self, dvb_url, ip_url, seconds=CAPTURE_MIN):
+        cmd = build_calibration_cmd(dvb_url, ip_url, seconds)
+        cprint("[IPStreamer] Delay calibration: {}".format(cmd))
+        self.process = launch(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self.reader = PipeReader(self.process.stdout, self.onLine, self.onClose)
+        reactor.addReader(self.reader)
+        self.timeout = reactor.callLater(seconds + WORKER_GRACE, self.finish, None, 0, "calibration timed out")
+
+    def onLine(self, line):
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return
+        name = event.get("event")
+        if name == "result":
+            confidence = event.get("confidence") or 0
+            if confidence < MIN_CONFIDENCE:
+                self.finish(None, confidence, "no clear match between the two streams")
+            else:
+                self.finish(event.get("offset"), confidence, None)
+        elif name == "error":
+            self.finish(None, 0, event.get("message"))
+
+    def onClose(self):
+        self.finish(None, 0, "calibration worker exited")
+
+    def finish(self, offset, confidence, error):
+        if self.done:
+            return
+        self.done = True
+        self.cancel()
+        if error:
+            cprint("[IPStreamer] Delay calibration failed: {}".format(error))
+        else:
+            cprint("[IPStreamer] Delay calibration: offset {:+.3f}s (confidence {})".format(offset, confidence))
+        self.callback(offset, confidence, error)
+
+    def cancel(self):
+        """Stop the worker; no callback unless it already finished."""
+        self.done = True
+        if self.timeout is not None and self.timeout.active():
+            self.timeout.cancel()
+        self.timeout = None
+        if self.reader is not None:
+            reader, self.reader = self.reader, None
+            reader.onClose = None
+            reader.close()
+        if self.process is not None:
+            # The whole group: the worker's ffmpeg captures too; reaped by the reactor
+            process, self.process = self.process, None
+            getProcessManager().stop(process)
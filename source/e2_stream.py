@@ -0,0 +1,149 @@
+# e2_stream.py
+#
+# Audio-only requests to the enigma2 stream server for long-press OK.
+#
+# A plain http://127.0.0.1:8001/<ref> sends the whole transport stream,
+# video included, only for the player to drop all but one audio PID. The
+# long-press path asks for the PMT, the PCR and the selected audio PID
+# instead: <ref>?pids=<pmt>,<pcr>,<audio> (hex, as in the service info).
+# A stream server that does not filter sends the full TS anyway; the
+# player banner then lists a video stream and the next long-press uses
+# the plain URL. A server that rejects the request produces no audio and
+# the reconnect falls back to the full TS.
+#
+# The saving shown in the status line compares the player's own input
+# rate with the full TS rate, measured once per service in a short
+# background read (or taken from a full TS play).
+
+import threading
+
+from twisted.internet import reactor
+
+from Plugins.Extensions.IPStreamer.variant_select import measure_throughput
+
+try:
+    from enigma import iServiceInformation
+except ImportError:
+    iServiceInformation = None
+
+REDC = "**"
+ENDC = "**"
+
+def cprint(text):
+    print(REDC + text + ENDC)
+
+
+E2_STREAM = "http://127.0.0.1:8001/"
+FULL_SAMPLE_SECONDS = 3
+
+
+def is_e2_url(url):
+    return bool(url) and url.startswith(E2_STREAM)
+
+
+def full_url(url):
+    """Plain full TS URL of an E2 stream URL."""
+    return url.split("?", 1)[0]
+
+
+def service_pids(service):
+    """(pmt, pcr, selected audio PID) of a playing DVB service, None if unknown."""
+    if service is None or iServiceInformation is None:
+        return None
+    try:
+        if service.streamed():
+            return None
+        info = service.info()
+        tracks = service.audioTracks()
+        audio = tracks.getTrackInfo(tracks.getCurrentTrack()).getPID()
+        pmt = info.getInfo(iServiceInformation.sPMTPID)
+        pcr = info.getInfo(iServiceInformation.sPCRPID)
+    except Exception as e:
+        cprint("[IPStreamer] Service PIDs unavailable: {}".format(str(e)))
+        return None
+    if min(pmt, pcr, audio) < 0:
+        return None
+    return pmt, pcr, audio
+
+
+class E2Streams(object):
+    """Audio-only E2 stream requests and what they saved."""
+
+    def __init__(self):
+        self.filtering = True       # False once the stream server sent video anyway
+        self.fullRates = {}         # plain url -> full TS rate, kb/s
+        self.tracks = {}            # audio-only url -> audio track of the full TS
+        self.measuring = set()
+
+    def url(self, service, ref_str, track=0):
+        """(url, track) to play for the service: audio-only when possible."""
+        plain = E2_STREAM + ref_str
+        pids = service_pids(service) if self.filtering else None
+        if pids is None:
+            return plain, track
+        url = "{}?pids={}".format(plain, ",".join("{:x}".format(pid) for pid in pids))
+        self.tracks[url] = track
+        self.measureFull(plain)
+        # The only audio PID in the stream
+        return url, 0
+
+    def isAudioOnly(self, url):
+        return is_e2_url(url) and url in self.tracks
+
+    def failed(self, url):
+        """An audio-only request gave no audio: (plain url, track) to play instead."""
+        cprint("[IPStreamer] Audio-only E2 stream failed, using the full TS")
+        self.filtering = False
+        return full_url(url), self.tracks.get(url, 0)
+
+    def check(self, url, stats):
+        """Called while an E2 stream plays with its StreamStats."""
+        if not is_e2_url(url):
+            return
+        if url not in self.tracks:
+            if stats.throughput:
+                self.fullRates[url] = stats.throughput
+        elif stats.videoStreams and self.filtering:
+            cprint("[IPStreamer] Stream server ignores the PID filter, full TS from now on")
+            self.filtering = False
+
+    def statusText(self, url, stats):
+        """Saving of an audio-only stream for the status line, '' otherwise."""
+        if not self.isAudioOnly(url) or not self.filtering:
+            return ""
+        full = self.fullRates.get(full_url(url))
+        if not full or stats is None or stats.throughput is None:
+            return "audio PID only"
+        saved = max(0, 100 - int(stats.throughput * 100.0 / full))
+        return "audio PID only, -{}% of {}kb/s".format(saved, full)
+
+    def measureFull(self, plain):
+        if plain in self.fullRates or plain in self.measuring:
+            return
+        self.measuring.add(plain)
+        thread = threading.Thread(target=self.measure, args=(plain,))
+        thread.daemon = True
+        thread.start()
+
+    def measure(self, plain):
+        try:
+            rate = measure_throughput(plain, FULL_SAMPLE_SECONDS)[0]
+        except Exception as e:
+            cprint("[IPStreamer] Full TS rate unknown: {}".format(str(e)))
+            rate = None
+        reactor.callFromThread(self.measured, plain, rate)
+
+    def measured(self, plain, rate):
+        self.measuring.discard(plain)
+        if rate:
+            self.fullRates[plain] = rate
+            cprint("[IPStreamer] Full TS rate {} kb/s: {}".format(rate, plain))
+
+
+_streams = None
+
+def getE2Streams():
+    global _streams
+    if _streams is None:
+        _streams = E2Streams()
+    return _streams
@@ -1,8 +1,13 @@
 # ffmpeg_wrapper.py
 
+import subprocess
+
+from twisted.internet.threads import deferToThread
+
 from Tools.Directories import fileExists
 from Components.config import config
 from Plugins.Extensions.IPStreamer.alsa_helper import detect_alsa_device
+from Plugins.Extensions.IPStreamer.player_cmd import PlayerCommand, resolve_binary
 
 REDC = "**"
 ENDC = "**"
@@ -11,26 +16,49 @@ def cprint(text):
     print(REDC + text + ENDC)
 
 
+# Plain stderr so log lines can be parsed without colour escapes.
+FFMPEG_ENV = {"AV_LOG_FORCE_NOCOLOR": "1"}
+
+
 def clamp(value, minv, maxv):
     return max(minv, min(maxv, value))
 
 
+FFMPEG_EQ_PRESETS = {
+    "bass_boost": (-6.0, -3.0,  6.0),
+    "treble_boost": ( 6.0, -3.0, -6.0),
+    "vocal":       (-3.0,  6.0, -3.0),
+    "rock":        ( 5.0,  3.0, -2.0),
+    "pop":         (-2.0,  5.0,  3.0),
+    "classical":   ( 4.0,  0.0, -4.0),
+    "jazz":        ( 3.0,  2.0,  4.0),
+}
+EQ_BANDS = (100, 1000, 8000)
+
+# Filter instance names addressed by the runtime command channel
+FF_DELAY = "adelay@delay"
+FF_VOLUME = "volume@vol"
+FF_EQ = ("equalizer@eq0", "equalizer@eq1", "equalizer@eq2")
+
+# Silence on the input for this long is reported (mirror failover)
+SILENCE_DB = -50
+SILENCE_SECONDS = 8
+
+
+def get_ffmpeg_eq_gains(eq=None):
+    """Return the three band gains of the preset; flat for "off"."""
+    if eq is None:
+        eq = config.plugins.IPStreamer.equalizer.value
+    return FFMPEG_EQ_PRESETS.get(eq, (0.0, 0.0, 0.0))
+
+
 def get_ffmpeg_eq_filter():
     """Return FFmpeg equalizer filter string or None."""
     eq = config.plugins.IPStreamer.equalizer.value
     if eq == "off":
         return None
 
-    presets = {
-        "bass_boost": (-6.0, -3.0,  6.0),
-        "treble_boost": ( 6.0, -3.0, -6.0),
-        "vocal":       (-3.0,  6.0, -3.0),
-        "rock":        ( 5.0,  3.0, -2.0),
-        "pop":         (-2.0,  5.0,  3.0),
-        "classical":   ( 4.0,  0.0, -4.0),
-        "jazz":        ( 3.0,  2.0,  4.0),
-    }
-    gains = presets.get(eq)
+    gains = FFMPEG_EQ_PRESETS.get(eq)
     if not gains:
         return None
 
@@ -42,6 +70,68 @@ def get_ffmpeg_eq_filter():
     ).format(g0=g0, g1=g1, g2=g2)
 
 
+def volume_factor(volume_level):
+    """Map 1–100 to the 0.2–2.0 volume filter factor."""
+    vol_norm = clamp(int(volume_level), 1, 100)
+    return 0.2 + (vol_norm - 1) * (1.8 / 99.0)
+
+
+RUNTIME_FILTERS = {"adelay": "delays", "volume": "volume", "equalizer": "gain"}
+
+_runtime_support = None
+_runtime_probe = None
+
+def get_runtime_filter_support():
+    """
+    Which filters of the installed ffmpeg accept runtime commands; none
+    until the probe started at sessionstart has finished. Never blocks.
+    """
+    if _runtime_support is None:
+        start_runtime_filter_probe()
+        return dict((name, False) for name in RUNTIME_FILTERS)
+    return _runtime_support
+
+
+def start_runtime_filter_probe():
+    """Run probe_runtime_filter_support once in a reactor thread."""
+    global _runtime_probe
+    if _runtime_probe is None:
+        _runtime_probe = deferToThread(probe_runtime_filter_support)
+        _runtime_probe.addErrback(lambda failure: cprint(
+            "IPStreamer FFmpeg filter probe failed: {}".format(failure.getErrorMessage())))
+
+
+def probe_runtime_filter_support():
+    """
+    Check the 'T' (runtime param) flag that `ffmpeg -h filter=NAME` prints
+    next to each option. Blocking (up to three ffmpeg runs): worker thread only.
+    """
+    global _runtime_support
+    wanted = RUNTIME_FILTERS
+    support = dict((name, False) for name in wanted)
+    ffmpeg = resolve_binary("ffmpeg")
+    for name, option in wanted.items():
+        if not ffmpeg:
+            break
+        try:
+            result = subprocess.run(
+                [ffmpeg, "-hide_banner", "-h", "filter={}".format(name)],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                timeout=5
+            )
+            for line in result.stdout.decode("utf-8", "ignore").splitlines():
+                parts = line.split()
+                if len(parts) >= 3 and parts[0] == option and parts[1].startswith("<"):
+                    support[name] = "T" in parts[2]
+                    break
+        except Exception as e:
+            cprint("IPStreamer FFmpeg filter check failed for {}: {}".format(name, str(e)))
+    _runtime_support = support
+    cprint("IPStreamer FFmpeg runtime filter commands: {}".format(support))
+    return support
+
+
 def get_boxtype():
     try:
         with open("/proc/stb/info/boxtype", "r") as f:
@@ -56,69 +146,158 @@ def use_new_adelay_syntax():
     return bt in ("novaler4kse", "novaler4kpro")
 
 
-def build_ffmpeg_cmd(url, delay_sec=0, volume_level=None, track_index=None):
-    """
-    Build a complete ffmpeg command string for ALSA playback.
+def adelay_args(delay_ms):
+    if use_new_adelay_syntax():
+        return "delays={0}|{0}:all=1".format(delay_ms)
+    return "{0}|{0}".format(delay_ms)
 
-    delay_sec: float/int, negative (trim start), zero, or positive (adelay).
-    volume_level: 1–100 from config.plugins.IPStreamer.volLevel; mapped to 0.2–2.0.
-    track_index: None or int (0-based) for specific audio track.
-    """
-    if not url:
-        raise ValueError("Empty URL passed to build_ffmpeg_cmd")
 
-    alsa_device = detect_alsa_device()
-
-    # Input
-    input_part = "-i '{}'".format(url)
-
-    # Filters: delay, volume, equalizer
+def build_ffmpeg_filters(delay_sec=0, volume_level=None):
+    """Return the -af chain (delay, volume, equalizer) as a list of filters."""
     filters = []
 
     if delay_sec is not None and delay_sec > 0:
         delay_sec = clamp(delay_sec, 0, 60)
         delay_ms = int(delay_sec * 1000)
-        if use_new_adelay_syntax():
-            filters.append("adelay=delays={0}|{0}:all=1".format(delay_ms))
-        else:
-            filters.append("adelay={0}|{0}".format(delay_ms))
+        filters.append("adelay={}".format(adelay_args(delay_ms)))
 
     if volume_level is not None:
-        vol_norm = clamp(int(volume_level), 1, 100)
-        vol_factor = 0.2 + (vol_norm - 1) * (1.8 / 99.0)
-        filters.append("volume={:.2f}".format(vol_factor))
+        filters.append("volume={:.2f}".format(volume_factor(volume_level)))
 
     eq_ff = get_ffmpeg_eq_filter()
     if eq_ff:
         filters.append(eq_ff)
 
-    if filters:
-        filter_str = ",".join(filters)
-        af_part = '-af "{}"'.format(filter_str)
+    return filters
+
+
+def build_ffmpeg_live_filters(delay_sec=0, volume_level=None, support=None):
+    """
+    Like build_ffmpeg_filters, but with named instances (FF_DELAY, FF_VOLUME,
+    FF_EQ) kept in the chain even at their neutral value, so the running
+    process can be retuned through its command channel. Filters the
+    installed ffmpeg cannot change at runtime are built as usual.
+    """
+    if support is None:
+        support = get_runtime_filter_support()
+    filters = []
+
+    delay_ms = int(clamp(delay_sec, 0, 60) * 1000) if delay_sec else 0
+    if support.get("adelay"):
+        filters.append("{}={}".format(FF_DELAY, adelay_args(delay_ms)))
+    elif delay_ms > 0:
+        filters.append("adelay={}".format(adelay_args(delay_ms)))
+
+    factor = volume_factor(volume_level) if volume_level is not None else 1.0
+    filters.append("{}=volume={:.2f}".format(FF_VOLUME, factor))
+
+    if support.get("equalizer"):
+        for name, freq, gain in zip(FF_EQ, EQ_BANDS, get_ffmpeg_eq_gains()):
+            filters.append("{}=f={}:t=h:width_type=o:width=1:g={}".format(name, freq, gain))
     else:
-        af_part = ""
+        eq_ff = get_ffmpeg_eq_filter()
+        if eq_ff:
+            filters.append(eq_ff)
+
+    return filters
+
+
+def build_ffmpeg_decoder_cmd(url, rate=48000, channels=2):
+    """
+    Build an ffmpeg command that decodes url to raw s16le PCM on stdout.
+    Used by the warm pool: the decoder stays connected while parked and
+    never touches ALSA itself.
+    """
+    if not url:
+        raise ValueError("Empty URL passed to build_ffmpeg_decoder_cmd")
+
+    cmd = PlayerCommand(
+        ["ffmpeg", "-nostdin", "-loglevel", "error",
+         "-i", url,
+         "-vn", "-f", "s16le", "-ac", channels, "-ar", rate, "pipe:1"],
+        FFMPEG_ENV
+    )
+    cprint("IPStreamer FFmpeg decoder cmd: {}".format(cmd))
+    return cmd
+
+
+def build_ffmpeg_sink_cmd(delay_sec=0, volume_level=None, rate=48000, channels=2):
+    """
+    Build an ffmpeg command that plays raw s16le PCM from stdin to ALSA,
+    applying the same delay/volume/equalizer chain as build_ffmpeg_cmd.
+    """
+    alsa_device = detect_alsa_device()
+
+    argv = ["ffmpeg", "-nostdin", "-loglevel", "error",
+            "-f", "s16le", "-ar", rate, "-ac", channels, "-i", "pipe:0"]
+
+    filters = build_ffmpeg_filters(delay_sec, volume_level)
+    if filters:
+        argv += ["-af", ",".join(filters)]
+
+    argv += ["-f", "alsa", alsa_device]
+
+    cmd = PlayerCommand(argv, FFMPEG_ENV)
+    cprint("IPStreamer FFmpeg sink cmd: {}".format(cmd))
+    return cmd
+
+
+def build_ffmpeg_cmd(url, delay_sec=0, volume_level=None, track_index=None, live=False, input_args=None,
+                     silence_detect=False, tempo=None):
+    """
+    Build the ffmpeg PlayerCommand (argv, no shell) for ALSA playback.
+
+    delay_sec: float/int, negative (trim start), zero, or positive (adelay).
+    volume_level: 1–100 from config.plugins.IPStreamer.volLevel; mapped to 0.2–2.0.
+    track_index: None or int (0-based) for specific audio track.
+    live: keep stdin as the command channel and use named filters
+          (see player_control.FFmpegFilterControl).
+    input_args: extra input options before -i (probe_cache hints).
+    silence_detect: report silence on stderr, so a silent mirror can be
+          replaced (see stream_stats).
+    tempo: playback speed above 1 to catch up with live after a pause.
+    """
+    if not url:
+        raise ValueError("Empty URL passed to build_ffmpeg_cmd")
+
+    alsa_device = detect_alsa_device()
+
+    argv = ["ffmpeg"] if live else ["ffmpeg", "-nostdin"]
+    # Machine readable progress on stdout for stream_stats instead of the
+    # \r status line on stderr
+    argv += ["-nostats", "-progress", "pipe:1"]
 
     # Negative delay via -ss
-    ss_part = ""
     if delay_sec is not None and delay_sec < 0:
         trim_sec = clamp(abs(delay_sec), 0, 60)
-        ss_part = "-ss {}".format(trim_sec)
+        argv += ["-ss", trim_sec]
+
+    # Known format from an earlier play: skip most of the probing
+    if input_args:
+        argv += list(input_args)
+
+    # Input: passed as one argument, no quoting needed
+    argv += ["-i", url]
+
+    # Filters: delay, volume, equalizer
+    if live:
+        filters = build_ffmpeg_live_filters(delay_sec, volume_level)
+    else:
+        filters = build_ffmpeg_filters(delay_sec, volume_level)
+    if silence_detect:
+        # Ahead of the delay, which starts with silence of its own
+        filters.insert(0, "silencedetect=n={}dB:d={}".format(SILENCE_DB, SILENCE_SECONDS))
+    if tempo:
+        filters.append("atempo={:.2f}".format(tempo))
+    if filters:
+        argv += ["-af", ",".join(filters)]
 
     # Track selection
-    map_part = ""
     if track_index is not None and track_index >= 0:
-        map_part = "-map 0:a:{}".format(int(track_index))
-
-    parts = [
-        "ffmpeg",
-        ss_part,
-        input_part,
-        af_part,
-        map_part,
-        "-vn",
-        "-f alsa",
-        alsa_device,
-    ]
-    cmd = " ".join(p for p in parts if p.strip())
+        argv += ["-map", "0:a:{}".format(int(track_index))]
+
+    argv += ["-vn", "-f", "alsa", alsa_device]
+
+    cmd = PlayerCommand(argv, FFMPEG_ENV)
     cprint("IPStreamer FFmpeg cmd: {}".format(cmd))
     return cmd
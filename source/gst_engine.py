@@ -0,0 +1,252 @@
+# gst_engine.py
+#
+# Stand-alone GStreamer player for IPStreamer ("Gstreamer (live control)").
+#
+# Runs as its own process (python3 -u gst_engine.py) so a crashing pipeline
+# never takes enigma2 down; it must not import any enigma2 module.
+# The pipeline is built through the Python bindings:
+#
+#   uridecodebin -> audioconvert -> audioresample -> volume
+#                -> equalizer-3bands -> queue -> sink (ts-offset = delay)
+#
+# Volume, band gains and delay are plain element properties, so they are
+# changed on the running pipeline without reconnecting.
+#
+# Control: one JSON object per line on stdin
+#   {"cmd": "play", "url": ..., "sink": "alsasink", "device": "hw:0,0",
+#    "volume": 4.0, "eq": [g0, g1, g2], "delay_ms": 2000}
+#   {"cmd": "set", "volume": ..., "eq": [...], "delay_ms": ...}
+#   {"cmd": "stop"} / {"cmd": "quit"}
+# Events: one JSON object per line on stdout
+#   ready, playing, first_audio, eos, error (message), stopped,
+#   tags (codec, bitrate kb/s), caps (rate, channels),
+#   position (seconds, once per second while it advances)
+
+import json
+import os
+import sys
+
+import gi
+gi.require_version("Gst", "1.0")
+from gi.repository import GLib, Gst
+
+# Delay range accepted from the plugin (audioDelay is -10..60 s)
+MIN_DELAY_MS = -10000
+MAX_DELAY_MS = 60000
+# The queue must be able to hold the whole positive delay
+QUEUE_TIME_NS = (MAX_DELAY_MS + 5000) * Gst.MSECOND
+
+
+class Engine(object):
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.pipeline = None
+        self.convert = None
+        self.volume = None
+        self.eq = None
+        self.sink = None
+        self.firstAudio = False
+        self.pending = b""
+        self.lastPosition = None
+        GLib.timeout_add_seconds(1, self.reportPosition)
+
+    def emit(self, event, **fields):
+        fields["event"] = event
+        try:
+            sys.stdout.write(json.dumps(fields) + "\n")
+            sys.stdout.flush()
+        except Exception:
+            # Parent went away
+            self.loop.quit()
+        return False
+
+    def make(self, factory, name=None):
+        element = Gst.ElementFactory.make(factory, name)
+        if element is None:
+            raise RuntimeError("GStreamer element missing: {}".format(factory))
+        return element
+
+    def play(self, msg):
+        self.stop()
+        url = msg.get("url")
+        if not url:
+            self.emit("error", message="no url")
+            return
+
+        pipeline = Gst.Pipeline.new("ipstreamer")
+        src = self.make("uridecodebin", "src")
+        convert = self.make("audioconvert")
+        resample = self.make("audioresample")
+        volume = self.make("volume", "vol")
+        eq = self.make("equalizer-3bands", "eq")
+        queue = self.make("queue")
+        sink = self.make(msg.get("sink") or "alsasink", "sink")
+
+        src.set_property("uri", url)
+        queue.set_property("max-size-time", QUEUE_TIME_NS)
+        queue.set_property("max-size-buffers", 0)
+        queue.set_property("max-size-bytes", 0)
+        # ts-offset only works with a synchronised sink
+        sink.set_property("sync", True)
+        if sink.find_property("provide-clock") is not None:
+            sink.set_property("provide-clock", False)
+        if msg.get("device") and sink.find_property("device") is not None:
+            sink.set_property("device", msg["device"])
+
+        for element in (src, convert, resample, volume, eq, queue, sink):
+            pipeline.add(element)
+        convert.link(resample)
+        resample.link(volume)
+        volume.link(eq)
+        eq.link(queue)
+        queue.link(sink)
+        src.connect("pad-added", self.onPadAdded)
+
+        queue_pad = queue.get_static_pad("src")
+        queue_pad.add_probe(Gst.PadProbeType.BUFFER, self.onBuffer)
+
+        bus = pipeline.get_bus()
+        bus.add_signal_watch()
+        bus.connect("message::error", self.onError)
+        bus.connect("message::eos", self.onEos)
+        bus.connect("message::tag", self.onTag)
+
+        self.pipeline = pipeline
+        self.convert = convert
+        self.volume = volume
+        self.eq = eq
+        self.sink = sink
+        self.firstAudio = False
+        self.apply(msg)
+
+        if pipeline.set_state(Gst.State.PLAYING) == Gst.StateChangeReturn.FAILURE:
+            self.emit("error", message="cannot start pipeline")
+            self.stop()
+            return
+        self.emit("playing", url=url)
+
+    def onPadAdded(self, src, pad):
+        caps = pad.get_current_caps() or pad.query_caps(None)
+        if caps is None or not caps.to_string().startswith("audio/"):
+            return
+        target = self.convert.get_static_pad("sink")
+        if not target.is_linked():
+            pad.link(target)
+            structure = caps.get_structure(0)
+            ok_rate, rate = structure.get_int("rate")
+            ok_channels, channels = structure.get_int("channels")
+            GLib.idle_add(self.emit, "caps", rate=rate if ok_rate else None, channels=channels if ok_channels else None)
+
+    def onBuffer(self, pad, info):
+        if not self.firstAudio:
+            self.firstAudio = True
+            GLib.idle_add(self.emit, "first_audio")
+        return Gst.PadProbeReturn.REMOVE
+
+    def onTag(self, bus, message):
+        taglist = message.parse_tag()
+        ok_codec, codec = taglist.get_string("audio-codec")
+        ok_bitrate, bitrate = taglist.get_uint("bitrate")
+        if not ok_bitrate:
+            ok_bitrate, bitrate = taglist.get_uint("nominal-bitrate")
+        if ok_codec or ok_bitrate:
+            self.emit("tags", codec=codec if ok_codec else None, bitrate=bitrate // 1000 if ok_bitrate else None)
+
+    def reportPosition(self):
+        if self.pipeline is not None:
+            ok, position = self.pipeline.query_position(Gst.Format.TIME)
+            if ok and position != self.lastPosition:
+                self.lastPosition = position
+                self.emit("position", seconds=position / float(Gst.SECOND))
+        return True
+
+    def onError(self, bus, message):
+        err, debug = message.parse_error()
+        self.emit("error", message=str(err))
+        self.stop()
+
+    def onEos(self, bus, message):
+        self.emit("eos")
+        self.stop()
+
+    def apply(self, msg):
+        """Set live properties; every key is optional."""
+        if self.pipeline is None:
+            return
+        if "volume" in msg:
+            self.volume.set_property("volume", max(0.0, min(10.0, float(msg["volume"]))))
+        if "eq" in msg:
+            for band, gain in enumerate(msg["eq"][:3]):
+                self.eq.set_property("band{}".format(band), max(-24.0, min(12.0, float(gain))))
+        if "delay_ms" in msg:
+            delay_ms = max(MIN_DELAY_MS, min(MAX_DELAY_MS, int(msg["delay_ms"])))
+            self.sink.set_property("ts-offset", delay_ms * Gst.MSECOND)
+
+    def stop(self):
+        if self.pipeline is not None:
+            self.pipeline.get_bus().remove_signal_watch()
+            self.pipeline.set_state(Gst.State.NULL)
+            self.pipeline = None
+            self.lastPosition = None
+            self.emit("stopped")
+
+    def onStdin(self, source, condition):
+        # os.read, not sys.stdin: a buffered reader could swallow a second
+        # line that the IO watch would then never report.
+        try:
+            data = os.read(sys.stdin.fileno(), 4096)
+        except OSError:
+            data = b""
+        if not data:
+            # Plugin closed the pipe or died: never outlive it
+            self.stop()
+            self.loop.quit()
+            return False
+        self.pending += data
+        while b"\n" in self.pending:
+            line, self.pending = self.pending.split(b"\n", 1)
+            if line.strip() and not self.handle(line):
+                return False
+        return True
+
+    def handle(self, line):
+        """Run one command line; False when the engine should exit."""
+        try:
+            msg = json.loads(line.decode("utf-8"))
+        except ValueError:
+            self.emit("error", message="bad command")
+            return True
+        cmd = msg.get("cmd")
+        try:
+            if cmd == "play":
+                self.play(msg)
+            elif cmd == "set":
+                self.apply(msg)
+            elif cmd == "stop":
+                self.stop()
+            elif cmd == "quit":
+                self.stop()
+                self.loop.quit()
+                return False
+        except Exception as e:
+            self.emit("error", message=str(e))
+        return True
+
+
+def main():
+    Gst.init(None)
+    loop = GLib.MainLoop()
+    engine = Engine(loop)
+    channel = GLib.IOChannel.unix_new(sys.stdin.fileno())
+    GLib.io_add_watch(channel, GLib.PRIORITY_DEFAULT, GLib.IO_IN | GLib.IO_HUP, engine.onStdin)
+    engine.emit("ready")
+    try:
+        loop.run()
+    except KeyboardInterrupt:
+        pass
+    engine.stop()
+
+
+if __name__ == "__main__":
+    main()
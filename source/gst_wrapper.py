@@ -1,8 +1,15 @@
 # gst_wrapper.py
 
+import os
+import subprocess
+from sys import version_info
+
+from twisted.internet.threads import deferToThread
+
 from Tools.Directories import fileExists
 from Components.config import config
 from Plugins.Extensions.IPStreamer.alsa_helper import detect_alsa_device
+from Plugins.Extensions.IPStreamer.player_cmd import PlayerCommand, resolve_binary
 
 REDC = "**"
 ENDC = "**"
@@ -11,27 +18,83 @@ def cprint(text):
     print(REDC + text + ENDC)
 
 
+# The plugin registry is already up to date on a receiver; do not fork
+# gst-plugin-scanner on every zap.
+GST_ENV = {"GST_REGISTRY_FORK": "no"}
+
+GST_ENGINE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gst_engine.py")
+# What gst_engine.py needs; the gi / Gst bindings are often not installed
+GST_ENGINE_CHECK = "import gi; gi.require_version('Gst', '1.0'); from gi.repository import Gst"
+
+_engine_available = None
+_engine_check = None
+
+
+def gst_engine_available():
+    """Whether gst_engine.py can run; False until the sessionstart check has finished."""
+    if _engine_available is None:
+        start_gst_engine_check()
+    return bool(_engine_available)
+
+
+def start_gst_engine_check(callback=None):
+    """Run check_gst_engine once in a reactor thread; callback(available) when done."""
+    global _engine_check
+    if _engine_check is None:
+        _engine_check = deferToThread(check_gst_engine)
+        _engine_check.addErrback(lambda failure: False)
+    if callback is not None:
+        _engine_check.addCallback(lambda available: callback(available) or available)
+
+
+def check_gst_engine():
+    """Blocking (one python start): worker thread only."""
+    global _engine_available
+    python = resolve_binary("python3" if version_info[0] == 3 else "python")
+    available = False
+    if python:
+        try:
+            available = subprocess.run(
+                [python, "-c", GST_ENGINE_CHECK],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=15
+            ).returncode == 0
+        except Exception as e:
+            cprint("[IPStreamer] GStreamer bindings check failed: {}".format(str(e)))
+    _engine_available = available
+    cprint("[IPStreamer] GStreamer python bindings: {}".format("available" if available else "missing"))
+    return available
+
+
 def clamp(value, minv, maxv):
     return max(minv, min(maxv, value))
 
 
+GST_EQ_PRESETS = {
+    "bass_boost":   (-6.0, -3.0,  6.0),
+    "treble_boost": ( 6.0, -3.0, -6.0),
+    "vocal":        (-3.0,  6.0, -3.0),
+    "rock":         ( 5.0,  3.0, -2.0),
+    "pop":          (-2.0,  5.0,  3.0),
+    "classical":    ( 4.0,  0.0, -4.0),
+    "jazz":         ( 3.0,  2.0,  4.0),
+}
+
+
+def get_gst_eq_gains(eq=None):
+    """Return (band0, band1, band2) gains for the preset; flat for "off"."""
+    if eq is None:
+        eq = config.plugins.IPStreamer.equalizer.value
+    return GST_EQ_PRESETS.get(eq, (0.0, 0.0, 0.0))
+
+
 def get_gst_eq_filter():
     """Return GStreamer equalizer filter string or None."""
     eq = config.plugins.IPStreamer.equalizer.value
-
-    presets_3band = {
-        "bass_boost":  "equalizer-3bands band0=-6.0 band1=-3.0 band2=6.0",
-        "treble_boost":"equalizer-3bands band0=6.0 band1=-3.0 band2=-6.0",
-        "vocal":       "equalizer-3bands band0=-3.0 band1=6.0 band2=-3.0",
-        "rock":        "equalizer-3bands band0=5.0 band1=3.0 band2=-2.0",
-        "pop":         "equalizer-3bands band0=-2.0 band1=5.0 band2=3.0",
-        "classical":   "equalizer-3bands band0=4.0 band1=0.0 band2=-4.0",
-        "jazz":        "equalizer-3bands band0=3.0 band1=2.0 band2=4.0",
-    }
-
-    if eq == "off":
+    if eq == "off" or eq not in GST_EQ_PRESETS:
         return None
-    return presets_3band.get(eq)
+    return "equalizer-3bands band0={} band1={} band2={}".format(*GST_EQ_PRESETS[eq])
 
 
 def get_gst_sink():
@@ -52,39 +115,138 @@ def get_gst_sink():
         return "autoaudiosink"
 
 
+def get_gst_engine_sink():
+    """(element name, device or None) of the sink for the gst_engine helper."""
+    val = config.plugins.IPStreamer.sync.value
+    if val == "alsasink":
+        dev = detect_alsa_device()
+        return "alsasink", (None if dev == "default" else dev)
+    elif val == "osssink":
+        return "osssink", None
+    return "autoaudiosink", None
+
+
+def build_gst_engine_cmd():
+    """
+    Command for the gst_engine helper process (Python GStreamer bindings).
+    The stream URL and audio settings are sent over its stdin, see
+    player_control.GstEngineControl.
+    """
+    python = "python3" if version_info[0] == 3 else "python"
+    cmd = PlayerCommand([python, "-u", GST_ENGINE_SCRIPT], GST_ENV)
+    cprint("[IPStreamer] GStreamer engine command: {}".format(cmd))
+    return cmd
+
+
+def gst_uri(url):
+    """uri= property token; the gst parser (not a shell) handles the quotes."""
+    return 'uri="{}"'.format(url.replace('\\', '\\\\').replace('"', '\\"'))
+
+
+def gst_argv(options, elements):
+    """
+    gst-launch-1.0 argv from a list of elements joined with "!".
+    A string element is split on whitespace; a list element is already
+    tokenised (used for uri=, which may contain spaces).
+    """
+    argv = ["gst-launch-1.0"] + list(options)
+    for i, element in enumerate(elements):
+        if i:
+            argv.append("!")
+        if isinstance(element, list):
+            argv += element
+        else:
+            argv += element.split()
+    return argv
+
+
+def build_gst_decoder_cmd(url, rate=48000, channels=2):
+    """
+    Build gst-launch-1.0 pipeline that decodes url to raw S16LE PCM on stdout.
+    -q keeps gst-launch status lines out of the audio pipe.
+    """
+    if not url:
+        raise ValueError("Empty URL passed to build_gst_decoder_cmd")
+
+    argv = gst_argv(["-q"], [
+        ["uridecodebin", gst_uri(url)],
+        "audioconvert",
+        "audioresample",
+        "audio/x-raw,format=S16LE,rate={},channels={}".format(rate, channels),
+        "fdsink fd=1",
+    ])
+    cmd = PlayerCommand(argv, GST_ENV)
+    cprint("[IPStreamer] GStreamer decoder command: {}".format(cmd))
+    return cmd
+
+
+def build_gst_sink_cmd(delay_sec=0, volume_level=None, rate=48000, channels=2):
+    """
+    Build gst-launch-1.0 pipeline that plays raw S16LE PCM from stdin:
+      fdsrc -> rawaudioparse -> audioconvert -> volume -> [eq] -> [delay] -> sink.
+    """
+    elements = [
+        "fdsrc fd=0",
+        "rawaudioparse use-sink-caps=false format=pcm pcm-format=s16le "
+        "sample-rate={} num-channels={}".format(rate, channels),
+        "audioconvert",
+    ]
+
+    vol_raw = volume_level if volume_level is not None else config.plugins.IPStreamer.volLevel.value
+    elements.append("volume volume={}".format(vol_raw / 10.0))
+
+    eq_filter = get_gst_eq_filter()
+    if eq_filter:
+        elements.append(eq_filter)
+
+    delay_ms = int(delay_sec * 1000) if delay_sec is not None else 0
+    if delay_ms > 0:
+        delay_ns = clamp(delay_ms, 0, 60000) * 1000000
+        elements.append("queue max-size-time={}".format(delay_ns))
+
+    elements.append("{} sync=false provide-clock=false".format(get_gst_sink()))
+
+    cmd = PlayerCommand(gst_argv(["-q"], elements), GST_ENV)
+    cprint("[IPStreamer] GStreamer sink command: {}".format(cmd))
+    return cmd
+
+
 def build_gst_cmd(url, delay_sec=0, volume_level=None):
     """
-    Build gst-launch-1.0 pipeline for IPStreamer:
+    Build gst-launch-1.0 PlayerCommand (argv, no shell) for IPStreamer:
       uridecodebin -> audioconvert -> audioresample -> volume -> [eq] -> [delay] -> sink.
     """
     if not url:
         raise ValueError("Empty URL passed to build_gst_cmd")
 
-    cmd = (
-        'gst-launch-1.0 -e '
-        'uridecodebin uri="{url}" ! '
-        'audioconvert ! audioresample ! audio/x-raw,rate=48000 ! '
-    ).format(url=url)
+    elements = [
+        ["uridecodebin", gst_uri(url)],
+        "audioconvert",
+        "audioresample",
+        "audio/x-raw,rate=48000",
+    ]
 
     vol_raw = volume_level if volume_level is not None else config.plugins.IPStreamer.volLevel.value
     volume = vol_raw / 10.0
-    cmd += 'volume volume={} ! '.format(volume)
+    elements.append("volume volume={}".format(volume))
 
     eq_filter = get_gst_eq_filter()
     if eq_filter:
-        cmd += '{} ! '.format(eq_filter)
+        elements.append(eq_filter)
 
     # Delay using queue max-size-time (positive only)
     delay_ms = int(delay_sec * 1000) if delay_sec is not None else 0
     if delay_ms > 0:
         delay_ms = clamp(delay_ms, 0, 60000)  # safety: max 60s
         delay_ns = delay_ms * 1000000
-        cmd += 'queue max-size-time={} ! '.format(delay_ns)
+        elements.append("queue max-size-time={}".format(delay_ns))
 
     sink = get_gst_sink()
     # match your working cmd: sync=false provide-clock=false
-    cmd += '{} sync=false provide-clock=false'.format(sink)
+    elements.append("{} sync=false provide-clock=false".format(sink))
 
+    # -t prints stream tags (codec, bitrate) for stream_stats
+    cmd = PlayerCommand(gst_argv(["-e", "-t"], elements), GST_ENV)
     cprint("[IPStreamer] GStreamer command: {}".format(cmd))
     cprint("[IPStreamer] Volume level: {} = {}x".format(vol_raw, volume))
     return cmd
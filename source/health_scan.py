@@ -0,0 +1,310 @@
+# health_scan.py
+#
+# Background liveness check of every playlist URL.
+#
+# A scan runs in its own thread with a small thread pool. For each URL it
+# opens a plain socket (http.client refuses the "ICY 200 OK" status line of
+# Shoutcast servers), sends one GET with Icy-MetaData, reads the headers
+# and a few KB of body and records: state (ok/slow/dead), time to first
+# byte, HTTP code, content type and ICY bitrate. Results go into a compact
+# JSON table keyed by URL (stream_health.json in the settings folder).
+# The list and grid views only look the URL up in that table in memory,
+# they never touch the network.
+
+import base64
+import json
+import os
+import socket
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from urllib.parse import urljoin, urlsplit
+except ImportError:
+    from urlparse import urljoin, urlsplit
+
+from twisted.internet import reactor
+
+from Components.config import config
+from Plugins.Extensions.IPStreamer.net import resolve
+
+REDC = "**"
+ENDC = "**"
+
+def cprint(text):
+    print(REDC + text + ENDC)
+
+
+HEALTH_FILE = "stream_health.json"
+SCAN_WORKERS = 8
+SCAN_INTERVAL = 6 * 3600        # seconds between automatic scans
+CONNECT_TIMEOUT = 4.0
+READ_BYTES = 4096
+HEADER_MAX = 16384
+MAX_REDIRECTS = 3
+SLOW_MS = 2000                  # time to first byte above this marks a link slow
+USER_AGENT = "Mozilla/5.0 IPStreamer"
+
+STATE_OK = "ok"
+STATE_SLOW = "slow"
+STATE_DEAD = "dead"
+
+# Row layout in the table: [checked, state, ttfb_ms, http_code, content_type, icy_br]
+ROW_CHECKED, ROW_STATE, ROW_TTFB, ROW_CODE, ROW_TYPE, ROW_ICY_BR = range(6)
+
+
+def is_scan_enabled():
+    try:
+        return bool(config.plugins.IPStreamer.healthScan.value)
+    except Exception:
+        return False
+
+
+def get_health_file():
+    return os.path.join(config.plugins.IPStreamer.settingsPath.value, HEALTH_FILE)
+
+
+def open_stream(url, redirects=MAX_REDIRECTS, started=None):
+    """
+    GET url and read the response head, following redirects.
+    Returns (sock, code, headers, body, ttfb_ms) with body the bytes that
+    came with the head; the caller closes sock. Raises on network errors.
+    """
+    parts = urlsplit(url)
+    secure = parts.scheme == "https"
+    port = parts.port or (443 if secure else 80)
+    path = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+    host = parts.hostname if parts.port is None else "{}:{}".format(parts.hostname, parts.port)
+    lines = [
+        "GET {} HTTP/1.0".format(path),
+        "Host: {}".format(host),
+        "User-Agent: {}".format(USER_AGENT),
+        "Icy-MetaData: 1",
+        "Accept: */*",
+        "Connection: close",
+    ]
+    if parts.username:
+        token = "{}:{}".format(parts.username, parts.password or "").encode("utf-8")
+        lines.append("Authorization: Basic {}".format(base64.b64encode(token).decode("ascii")))
+
+    if started is None:
+        started = time.time()
+    sock = socket.create_connection((resolve(parts.hostname), port), timeout=CONNECT_TIMEOUT)
+    try:
+        if secure:
+            # Liveness only: accept any certificate
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+            sock = context.wrap_socket(sock, server_hostname=parts.hostname)
+        sock.sendall(("\r\n".join(lines) + "\r\n\r\n").encode("utf-8"))
+
+        data = b""
+        ttfb_ms = None
+        while b"\r\n\r\n" not in data and b"\n\n" not in data and len(data) < HEADER_MAX:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            if ttfb_ms is None:
+                ttfb_ms = int((time.time() - started) * 1000)
+            data += chunk
+        separator = b"\r\n\r\n" if b"\r\n\r\n" in data else b"\n\n"
+        head, _, body = data.partition(separator)
+        head_lines = head.decode("latin-1").splitlines()
+        if not head_lines:
+            raise IOError("empty response")
+        status = head_lines[0].split()
+        # "HTTP/1.1 200 OK" or Shoutcast's "ICY 200 OK"
+        code = int(status[1]) if len(status) > 1 and status[1].isdigit() else 0
+        headers = {}
+        for line in head_lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+
+        if code in (301, 302, 303, 307, 308) and headers.get("location") and redirects > 0:
+            sock.close()
+            return open_stream(urljoin(url, headers["location"]), redirects - 1, started)
+        return sock, code, headers, body, ttfb_ms
+    except Exception:
+        sock.close()
+        raise
+
+
+def http_probe(url, redirects=MAX_REDIRECTS):
+    """
+    GET url and read headers plus up to READ_BYTES of body.
+    Returns (code, headers, body_len, ttfb_ms); raises on network errors.
+    """
+    sock, code, headers, body, ttfb_ms = open_stream(url, redirects)
+    try:
+        body_len = len(body)
+        while code == 200 and body_len < READ_BYTES:
+            chunk = sock.recv(READ_BYTES - body_len)
+            if not chunk:
+                break
+            body_len += len(chunk)
+        return code, headers, body_len, ttfb_ms
+    finally:
+        try:
+            sock.close()
+        except Exception:
+            pass
+
+
+def check_url(url):
+    """One table row for url."""
+    now = int(time.time())
+    if not (url.startswith("http://") or url.startswith("https://")):
+        return [now, STATE_OK, None, None, None, None]
+    try:
+        code, headers, body_len, ttfb_ms = http_probe(url)
+    except Exception:
+        return [now, STATE_DEAD, None, None, None, None]
+    content_type = headers.get("content-type", "").split(";")[0] or None
+    icy_br = headers.get("icy-br", "").split(",")[0]
+    icy_br = int(icy_br) if icy_br.isdigit() else None
+    if code != 200 or not body_len:
+        state = STATE_DEAD
+    elif ttfb_ms is not None and ttfb_ms > SLOW_MS:
+        state = STATE_SLOW
+    else:
+        state = STATE_OK
+    return [now, state, ttfb_ms, code, content_type, icy_br]
+
+
+class HealthTable(object):
+    """URL -> row table, shared between the scan thread and the UI."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.rows = {}
+        self.scanned = 0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self.rows = data.get("urls", {})
+            self.scanned = data.get("scanned", 0)
+        except (IOError, OSError, ValueError):
+            self.rows = {}
+            self.scanned = 0
+
+    def save(self):
+        with self.lock:
+            data = {"scanned": self.scanned, "urls": dict(self.rows)}
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.rename(tmp, self.path)
+        except (IOError, OSError) as e:
+            cprint("[IPStreamer] Cannot save health table: {}".format(str(e)))
+
+    def update(self, url, row):
+        with self.lock:
+            self.rows[url] = row
+
+    def get(self, url):
+        return self.rows.get(url)
+
+    def state(self, url):
+        row = self.rows.get(url)
+        return row[ROW_STATE] if row else None
+
+
+class HealthScanner(object):
+    """Runs scans in the background; listeners are called on the reactor when one ends."""
+
+    def __init__(self):
+        self.table = None
+        self.thread = None
+        self.listeners = []
+
+    def getTable(self):
+        path = get_health_file()
+        if self.table is None or self.table.path != path:
+            self.table = HealthTable(path)
+        return self.table
+
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def addListener(self, callback):
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+
+    def removeListener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def scan(self, collect, force=False):
+        """
+        Start a scan unless one runs or the last is recent; True if started.
+        collect returns the links; it is called in the scan thread, as
+        reading every playlist is too slow for the UI thread.
+        """
+        if self.running():
+            return False
+        table = self.getTable()
+        if not force and time.time() - table.scanned < SCAN_INTERVAL:
+            return False
+        self.thread = threading.Thread(target=self.run, args=(table, collect))
+        self.thread.daemon = True
+        self.thread.start()
+        return True
+
+    def run(self, table, collect):
+        try:
+            urls = list(dict.fromkeys(u for u in collect() if u))
+        except Exception as e:
+            cprint("[IPStreamer] Health scan could not read the playlists: {}".format(str(e)))
+            return
+        if not urls:
+            return
+        cprint("[IPStreamer] Health scan of {} links started".format(len(urls)))
+        started = time.time()
+        with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as pool:
+            for url, row in zip(urls, pool.map(check_url, urls)):
+                table.update(url, row)
+        # Drop links that are in no playlist any more
+        with table.lock:
+            wanted = set(urls)
+            for url in [u for u in table.rows if u not in wanted]:
+                del table.rows[url]
+        table.scanned = int(time.time())
+        table.save()
+        dead = sum(1 for u in urls if table.state(u) == STATE_DEAD)
+        cprint("[IPStreamer] Health scan done in {:.1f}s: {} links, {} dead".format(time.time() - started, len(urls), dead))
+        reactor.callFromThread(self.notify)
+
+    def notify(self):
+        for callback in list(self.listeners):
+            try:
+                callback()
+            except Exception as e:
+                cprint("[IPStreamer] Health listener error: {}".format(str(e)))
+
+
+def health_mark(url):
+    """Prefix for a channel name from the last scan: dead or slow links are marked."""
+    state = getHealthScanner().getTable().state(url)
+    if state == STATE_DEAD:
+        return "✗ "
+    if state == STATE_SLOW:
+        return "⚠ "
+    return ""
+
+
+_scanner = None
+
+def getHealthScanner():
+    global _scanner
+    if _scanner is None:
+        _scanner = HealthScanner()
+    return _scanner
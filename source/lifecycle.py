@@ -0,0 +1,109 @@
+# lifecycle.py
+#
+# Shutdown of the player processes this plugin started.
+#
+# launch() (player_cmd.py) starts every player in its own session, so the
+# player and whatever it forks share one process group, and registers it
+# here. Stopping a player sends SIGTERM to that group and returns at once;
+# a reactor timer reaps it and sends SIGKILL to the group if it is still
+# alive after TERM_GRACE. The UI never waits on a dying player, the next
+# stream can start while the old one shuts down, and ffmpeg jobs of other
+# plugins are left alone (no more killall).
+
+import os
+import signal
+import time
+
+from twisted.internet import reactor
+
+REDC = "**"
+ENDC = "**"
+
+def cprint(text):
+    print(REDC + text + ENDC)
+
+
+TERM_GRACE = 2.0            # seconds between SIGTERM and SIGKILL
+REAP_INTERVAL = 0.1         # seconds between reap passes while players are stopping
+
+
+def signal_group(process, sig):
+    """Send sig to the process group of process; False if nothing is left to signal."""
+    try:
+        os.killpg(process.pid, sig)
+        return True
+    except (OSError, ValueError):
+        # Not a group leader (started elsewhere): the process alone
+        try:
+            if process.poll() is None:
+                process.send_signal(sig)
+                return True
+        except (OSError, ValueError):
+            pass
+    return False
+
+
+class ProcessManager(object):
+    """Players started by launch() and the ones still shutting down."""
+
+    def __init__(self):
+        self.processes = {}         # pid -> process
+        self.stopping = {}          # pid -> (process, kill deadline or None once killed)
+        self.reapCall = None
+
+    def track(self, process):
+        self.processes[process.pid] = process
+
+    def running(self):
+        return [p for p in self.processes.values() if p.poll() is None]
+
+    def stop(self, process, grace=TERM_GRACE):
+        """TERM the group of process now, KILL it after grace seconds; never blocks."""
+        if process is None:
+            return
+        self.processes.pop(process.pid, None)
+        if process.pid in self.stopping:
+            return
+        if process.poll() is not None:
+            # Leader gone; children it left in the group still go
+            signal_group(process, signal.SIGKILL)
+            return
+        cprint("[IPStreamer] Stopping player PID {}".format(process.pid))
+        signal_group(process, signal.SIGTERM if grace > 0 else signal.SIGKILL)
+        self.stopping[process.pid] = (process, time.time() + grace if grace > 0 else None)
+        self.scheduleReap()
+
+    def stopAll(self, grace=TERM_GRACE):
+        for process in list(self.processes.values()):
+            self.stop(process, grace)
+
+    def scheduleReap(self):
+        if self.reapCall is None or not self.reapCall.active():
+            self.reapCall = reactor.callLater(REAP_INTERVAL, self.reap)
+
+    def reap(self):
+        self.reapCall = None
+        now = time.time()
+        for pid, (process, deadline) in list(self.stopping.items()):
+            if process.poll() is not None:
+                signal_group(process, signal.SIGKILL)
+                del self.stopping[pid]
+            elif deadline is not None and now >= deadline:
+                cprint("[IPStreamer] Player PID {} ignored SIGTERM, killing".format(pid))
+                signal_group(process, signal.SIGKILL)
+                self.stopping[pid] = (process, None)
+        # Players that exited by themselves are reaped here too
+        for pid, process in list(self.processes.items()):
+            if process.poll() is not None:
+                del self.processes[pid]
+        if self.stopping:
+            self.scheduleReap()
+
+
+_manager = None
+
+def getProcessManager():
+    global _manager
+    if _manager is None:
+        _manager = ProcessManager()
+    return _manager
@@ -0,0 +1,362 @@
+# m3u_import.py
+#
+# Streaming M3U / M3U8 import.
+#
+# The provider list is read from the HTTP response in chunks and parsed line
+# by line (m3u_parse.py); entries are yielded as soon as their URL line arrives, so neither
+# the whole text nor a splitlines() copy of it is ever held. #EXTINF
+# attributes (tvg-id, tvg-name, tvg-logo, group-title) are kept on the
+# entries, and any URL scheme is accepted (http, rtmp, rtsp, udp ...).
+# write_playlists() streams entries straight into ipstreamer_*.json files,
+# one per group-title when asked: ipstreamer_<provider>_<group>.json, so a
+# provider group never replaces a user category or another provider's
+# group. Each file is written to a temporary file and renamed into place so
+# the catalog never sees half a list.
+#
+# Provider lists need two passes (a variant set is only known once every
+# entry has been seen): ProviderImport renames and spools the entries to a
+# JSON-lines file while they download, then tags variants, adds token
+# mirrors and writes the playlists from the spool. Memory stays flat; only
+# a quality bit mask per variant group is kept between the passes.
+#
+# M3UDownload asks for gzip and sends If-None-Match / If-Modified-Since from
+# the validators of the previous download; a 304 raises NotModified so the
+# caller keeps its files. Validators live in a small state file (see
+# load_state), never one of the ipstreamer_*.json categories.
+#
+# race() opens several candidate URLs of one list at once (the token forms
+# of a provider account): the first whose body starts like an M3U wins and
+# the others are closed, so a wrong form no longer costs a full timeout.
+#
+# Benchmark (flat memory at 100k entries), on the box:
+#   cd /usr/lib/enigma2/python && python3 -m Plugins.Extensions.IPStreamer.m3u_import
+
+import json
+import os
+import threading
+import zlib
+
+from Plugins.Extensions.IPStreamer.m3u_parse import iter_entries, iter_lines, write_playlists
+from Plugins.Extensions.IPStreamer.mirrors import add_token_mirror
+from Plugins.Extensions.IPStreamer.net import CHUNK, NetError, TIMEOUT, open_url
+from Plugins.Extensions.IPStreamer.variant_select import note_variant, tag_variant
+
+REDC = "**"
+ENDC = "**"
+
+def cprint(text):
+    print(REDC + text + ENDC)
+
+
+class NotModified(NetError):
+    """The list did not change since the validators sent with the request."""
+
+
+class M3UDownload(object):
+    """One conditional, gzip-accepting, chunked download of an M3U list."""
+
+    def __init__(self, url, validators=None, timeout=TIMEOUT, progress=None):
+        self.url = url
+        self.sent = validators or {}
+        self.timeout = timeout
+        self.progress = progress    # progress(received, total or None), from the download thread
+        self.etag = None
+        self.modified = None
+        self.received = 0           # bytes on the wire, compressed or not
+        self.total = None
+        self.response = None
+        self.decoder = None
+        self.first = b""
+        self.cancelled = False
+
+    def headers(self):
+        headers = {"Accept-Encoding": "gzip"}
+        if self.sent.get("etag"):
+            headers["If-None-Match"] = self.sent["etag"]
+        if self.sent.get("modified"):
+            headers["If-Modified-Since"] = self.sent["modified"]
+        return headers
+
+    def validators(self):
+        """What to send next time, {} if the server gave none."""
+        validators = {}
+        if self.etag:
+            validators["etag"] = self.etag
+        if self.modified:
+            validators["modified"] = self.modified
+        return validators
+
+    def open(self):
+        """Send the request and read until the body shows it is an M3U list.
+
+        NotModified on a 304, NetError on an error status, an empty body,
+        anything that is not a list, or when cancelled meanwhile.
+        """
+        response = open_url(self.url, self.headers(), self.timeout)
+        try:
+            if response.status == 304:
+                raise NotModified("Not modified", 304)
+            if response.status >= 400:
+                response.read()
+                raise NetError("HTTP error {}: {}".format(response.status, response.reason), response.status)
+            self.etag = response.headers.get("ETag")
+            self.modified = response.headers.get("Last-Modified")
+            length = response.headers.get("Content-Length", "")
+            self.total = int(length) if length.isdigit() else None
+            encoding = (response.headers.get("Content-Encoding") or "").lower()
+            self.decoder = zlib.decompressobj(zlib.MAX_WBITS | 16) if "gzip" in encoding else None
+            self.response = response
+            first = self.read()
+            if not first:
+                raise NetError("Empty response from server")
+            head = first.lstrip(b"\xef\xbb\xbf \t\r\n")
+            if not head.startswith(b"#EXTM3U") and b"#EXTINF" not in head:
+                raise NetError("Not an M3U list: {!r}".format(head[:60]))
+            if self.cancelled:
+                raise NetError("Cancelled")
+            self.first = first
+        except BaseException:
+            self.response = None
+            response.close()
+            raise
+
+    def read(self):
+        """Next decoded piece of the body, b"" at the end."""
+        while True:
+            chunk = self.response.read(CHUNK)
+            if not chunk:
+                return self.decoder.flush() if self.decoder is not None else b""
+            self.received += len(chunk)
+            if self.decoder is not None:
+                chunk = self.decoder.decompress(chunk)
+            if chunk:
+                return chunk
+
+    def cancel(self):
+        """Drop the download, from any thread."""
+        self.cancelled = True
+        response = self.response
+        if response is not None:
+            response.close()
+
+    def chunks(self):
+        """Decoded body in pieces, opening the request first if race() did not."""
+        if self.response is None:
+            self.open()
+        try:
+            chunk = self.first
+            self.first = b""
+            while chunk:
+                if self.progress is not None:
+                    self.progress(self.received, self.total)
+                yield chunk
+                chunk = self.read()
+        finally:
+            self.response.close()
+
+    def entries(self):
+        """Entries of the list, parsed while it downloads."""
+        return iter_entries(iter_lines(self.chunks()))
+
+
+def race(downloads):
+    """Open downloads in parallel and return the first valid one, cancelling the rest.
+
+    A NotModified answer ends the race at once. Raises the last error when
+    none of them is a list.
+    """
+    finished = threading.Condition()
+    results = []
+
+    def run(download):
+        try:
+            download.open()
+            error = None
+        except Exception as e:
+            error = e
+        with finished:
+            results.append((download, error))
+            finished.notify()
+
+    for download in downloads:
+        thread = threading.Thread(target=run, args=(download,))
+        thread.daemon = True
+        thread.start()
+
+    winner = None
+    last_error = None
+    seen = 0
+    with finished:
+        while winner is None and seen < len(downloads):
+            while seen == len(results):
+                finished.wait()
+            download, error = results[seen]
+            seen += 1
+            if error is None or isinstance(error, NotModified):
+                winner = download
+                last_error = error
+            else:
+                cprint("[IPStreamer] {} failed: {}".format(download.url, str(error)))
+                last_error = error
+    for download in downloads:
+        if download is not winner:
+            download.cancel()
+    if winner is None or isinstance(last_error, NotModified):
+        raise last_error
+    return winner
+
+
+def stream_m3u(url, timeout=TIMEOUT):
+    """Entries of the M3U at url, parsed while it downloads."""
+    return M3UDownload(url, timeout=timeout).entries()
+
+
+def load_state(path):
+    """Download state (validators, written files) by list key; {} if none."""
+    try:
+        with open(path, "r") as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def save_state(path, state):
+    try:
+        with open(path + ".tmp", "w") as f:
+            json.dump(state, f, indent=4)
+        os.rename(path + ".tmp", path)
+    except (IOError, OSError) as e:
+        cprint("[IPStreamer] Cannot save {}: {}".format(path, str(e)))
+
+
+class ProviderImport(object):
+    """A provider list converted in two streaming passes through a spool file."""
+
+    def __init__(self, out_dir, base_name, rename=None):
+        self.out_dir = out_dir
+        self.base_name = base_name
+        self.rename = rename        # rename(entry) in place, provider naming rules
+        self.spool = os.path.join(out_dir, ".ipstreamer_{}.spool".format(base_name))
+        self.variants = {}
+        self.count = 0
+
+    def receive(self, entries):
+        """First pass, while downloading: rename, note variant groups, spool; returns the count."""
+        self.variants = {}
+        self.count = 0
+        with open(self.spool, "w") as f:
+            for entry in entries:
+                if self.rename is not None:
+                    self.rename(entry)
+                note_variant(entry, self.variants)
+                f.write(json.dumps(entry))
+                f.write("\n")
+                self.count += 1
+        return self.count
+
+    def entries(self, token=None, alternatives=()):
+        """Second pass: spooled entries with variant tags and token mirrors."""
+        others = [t for t in dict.fromkeys(alternatives) if t and t != token] if token else []
+        with open(self.spool, "r") as f:
+            for line in f:
+                entry = json.loads(line)
+                # LOW/VIP/4k copies of one channel become a variant set
+                tag_variant(entry, self.variants)
+                # The account's other token forms serve the same channels
+                if others:
+                    add_token_mirror(entry, token, others)
+                yield entry
+
+    def write(self, split_groups=False, token=None, alternatives=()):
+        """Write the playlists from the spool; {path: count}."""
+        return write_playlists(self.entries(token, alternatives), self.out_dir, self.base_name, split_groups)
+
+    def discard(self):
+        try:
+            os.remove(self.spool)
+        except OSError:
+            pass
+
+
+def benchmark(sizes=(1000, 10000, 100000), groups=20):
+    """Peak Python memory of the old whole-text parse and of the provider import
+    (parse, rename, variants, token mirrors, split write) the download runs.
+
+    Times are taken under tracemalloc and run several times slower than normal.
+    """
+    import shutil
+    import tempfile
+    import time
+    import tracemalloc
+
+    def file_chunks(path):
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK)
+                if not chunk:
+                    break
+                yield chunk
+
+    def whole_text(path):
+        # What the importer replaced: the full text, splitlines() and a list,
+        # before any of the provider passes
+        with open(path, "rb") as f:
+            text = f.read().decode("utf-8")
+        playlist = []
+        last_name = None
+        for line in text.splitlines():
+            line = line.strip()
+            if line.startswith("#EXTINF"):
+                last_name = line.split(",", 1)[1].strip()
+            elif line.startswith("http") and last_name:
+                playlist.append({"channel": last_name, "url": line})
+                last_name = None
+        return len(playlist)
+
+    def streamed(path, out_dir):
+        job = ProviderImport(out_dir, "bench", rename=lambda entry: entry.update(channel=entry["channel"].upper()))
+        try:
+            job.receive(iter_entries(iter_lines(file_chunks(path))))
+            return sum(job.write(True, "user_pass", ["user_pass", "pass", "user"]).values())
+        finally:
+            job.discard()
+
+    def measure(func, *args):
+        tracemalloc.start()
+        started = time.time()
+        count = func(*args)
+        elapsed = time.time() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return count, elapsed, peak
+
+    # Provider lists repeat a few hundred channels under many names and qualities
+    names = ["{} SPORTS {}".format(quality, n) for n in range(200) for quality in ("LOW", "VIP", "4k")]
+    names += ["Channel {} HD".format(n) for n in range(400)]
+
+    work = tempfile.mkdtemp(prefix="m3u_bench_")
+    try:
+        print("{:>8} {:>10} {:>14} {:>14}".format("entries", "size", "whole text", "streaming"))
+        for size in sizes:
+            path = os.path.join(work, "list.m3u")
+            with open(path, "w") as f:
+                f.write("#EXTM3U\n")
+                for i in range(size):
+                    f.write('#EXTINF:-1 tvg-id="ch{0}.tv" tvg-logo="http://logo.example/{0}.png" '
+                            'group-title="Group {1}",{2}\n'.format(i, i % groups, names[i % len(names)]))
+                    f.write("http://provider.example:8080/live/{}?token=user_pass&type=mpegts\n".format(i))
+            out_dir = os.path.join(work, "out")
+            os.mkdir(out_dir)
+            old = measure(whole_text, path)
+            new = measure(streamed, path, out_dir)
+            print("{:>8} {:>9}K {:>9.1f}MB {:>4.1f}s {:>9.1f}MB {:>4.1f}s".format(
+                size, os.path.getsize(path) // 1024,
+                old[2] / 1048576.0, old[1], new[2] / 1048576.0, new[1]))
+            shutil.rmtree(out_dir)
+    finally:
+        shutil.rmtree(work)
+
+
+if __name__ == "__main__":
+    benchmark()
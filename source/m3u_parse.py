@@ -0,0 +1,169 @@
+# m3u_parse.py
+#
+# M3U / M3U8 parsing and playlist writing for the streaming import
+# (m3u_import.py).
+#
+# Lines are cut from byte chunks as they arrive (BOM, \n, \r\n or \r
+# endings) and entries are yielded as soon as their URL line is read.
+# #EXTINF attributes (tvg-id, tvg-name, tvg-logo, group-title) and #EXTGRP
+# are kept on the entries, and any URL scheme is accepted (http, rtmp,
+# rtsp, udp ...). write_playlists() streams entries straight into
+# ipstreamer_*.json files. Like ring.py it must not import any enigma2
+# module, so it can be tested offline.
+
+import hashlib
+import json
+import os
+import re
+
+REDC = "**"
+ENDC = "**"
+
+def cprint(text):
+    print(REDC + text + ENDC)
+
+
+KEPT_ATTRS = ("tvg-id", "tvg-name", "tvg-logo", "group-title")
+RE_ATTR = re.compile(r'([A-Za-z0-9_-]+)="([^"]*)"')
+RE_EXTINF = re.compile(r'([^,"]*(?:"[^"]*"[^,"]*)*),(.*)')
+
+
+def decode_line(raw):
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("latin-1", "ignore")
+
+
+def iter_lines(chunks):
+    """Text lines of an iterable of byte chunks (\\n, \\r\\n or \\r endings)."""
+    pending = b""
+    bom = b"\xef\xbb\xbf"        # UTF-8 BOM some panels send
+    for chunk in chunks:
+        pending += chunk
+        if bom:
+            if len(pending) < len(bom) and bom.startswith(pending):
+                continue
+            pending = pending[len(bom):] if pending.startswith(bom) else pending
+            bom = b""
+        # A \r at the very end may still be followed by its \n
+        hold = b"\r" if pending.endswith(b"\r") else b""
+        if hold:
+            pending = pending[:-1]
+        lines = pending.replace(b"\r\n", b"\n").replace(b"\r", b"\n").split(b"\n")
+        pending = lines.pop() + hold
+        for raw in lines:
+            yield decode_line(raw)
+    if pending.strip(b"\r"):
+        yield decode_line(pending.strip(b"\r"))
+
+
+def parse_extinf(line):
+    """(attributes, name) of an #EXTINF line; the name follows the first comma outside quotes."""
+    match = RE_EXTINF.match(line)
+    head, name = (match.group(1), match.group(2).strip()) if match else (line, "")
+    attrs = dict((k.lower(), v.strip()) for k, v in RE_ATTR.findall(head))
+    return attrs, name or attrs.get("tvg-name", "")
+
+
+def iter_entries(lines):
+    """Playlist entries ({'channel', 'url', tvg-*/group-title}) of M3U text lines."""
+    info = None
+    group = None
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#EXTM3U"):
+            continue
+        if line.startswith("#EXTINF"):
+            info = parse_extinf(line)
+            group = None
+        elif line.startswith("#EXTGRP:"):
+            group = line[8:].strip()
+        elif line.startswith("#"):
+            continue
+        elif "://" in line:
+            if info is None or not info[1]:
+                info = None
+                continue
+            attrs, name = info
+            entry = {"channel": name, "url": line}
+            for key in KEPT_ATTRS:
+                if attrs.get(key):
+                    entry[key] = attrs[key]
+            if group and "group-title" not in entry:
+                entry["group-title"] = group
+            yield entry
+            info = None
+            group = None
+
+
+def short_hash(text):
+    return hashlib.md5(text.encode("utf-8")).hexdigest()[:8]
+
+
+def group_key(group):
+    """'Sports | HD' -> 'sports_hd'; letters of any script are kept, a title
+    without any ('★★★') becomes a short hash. '' for no group."""
+    group = (group or "").strip()
+    if not group:
+        return ""
+    return re.sub(r"\W+", "_", group.lower(), flags=re.UNICODE).strip("_") or short_hash(group)
+
+
+class PlaylistWriter(object):
+    """One ipstreamer_*.json file written entry by entry."""
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp = path + ".tmp"
+        self.f = open(self.tmp, "w")
+        self.f.write('{\n    "playlist": [')
+        self.count = 0
+
+    def add(self, entry):
+        self.f.write(",\n        " if self.count else "\n        ")
+        self.f.write(json.dumps(entry))
+        self.count += 1
+
+    def close(self):
+        self.f.write('\n    ]\n}\n')
+        self.f.close()
+        os.rename(self.tmp, self.path)
+
+    def abort(self):
+        self.f.close()
+        try:
+            os.remove(self.tmp)
+        except OSError:
+            pass
+
+
+def write_playlists(entries, out_dir, base_name, split_groups=False):
+    """Write entries to ipstreamer_<base_name>.json, or one ipstreamer_<base_name>_<group>.json
+    per group-title (ungrouped entries stay in the base file); returns {path: count}."""
+    writers = {}                    # group-title -> writer
+    keys = set()
+    try:
+        for entry in entries:
+            title = (entry.get("group-title") or "").strip() if split_groups else ""
+            writer = writers.get(title)
+            if writer is None:
+                key = group_key(title)
+                if key in keys:
+                    # 'Sport' and 'SPORT!' must not share a file
+                    key = "{}_{}".format(key, short_hash(title))
+                keys.add(key)
+                name = "{}_{}".format(base_name, key) if key else base_name
+                path = os.path.join(out_dir, "ipstreamer_{}.json".format(name))
+                writer = writers[title] = PlaylistWriter(path)
+            writer.add(entry)
+    except BaseException:
+        for writer in writers.values():
+            writer.abort()
+        raise
+    counts = {}
+    for writer in writers.values():
+        writer.close()
+        counts[writer.path] = writer.count
+    cprint("[IPStreamer] Imported {} channels into {} playlist(s)".format(sum(counts.values()), len(counts)))
+    return counts
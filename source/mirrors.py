@@ -0,0 +1,100 @@
+# mirrors.py
+#
+# Alternative URLs of playlist channels.
+#
+# A playlist entry may list further URLs of the same channel:
+#   {"channel": "...", "url": "<primary>", "mirrors": ["<url2>", "<url3>"]}
+# The primary url stays the channel's identity (last played, EPG, health
+# marks, probe cache). Relayed streams race the mirrors inside the relay
+# (see relay.py). Streams the relay does not take are played from one
+# mirror at a time, and a failed or silent one is swapped for the next.
+
+try:
+    from urllib.parse import parse_qs, quote, urlsplit, urlunsplit
+except ImportError:
+    from urllib import quote
+    from urlparse import parse_qs, urlsplit, urlunsplit
+
+REDC = "**"
+ENDC = "**"
+
+def cprint(text):
+    print(REDC + text + ENDC)
+
+
+def url_token(url):
+    """token= query value of a provider URL, None if it has none."""
+    values = parse_qs(urlsplit(url).query).get("token")
+    return values[0] if values else None
+
+
+def with_token(url, token):
+    """url with its token= query value replaced; host, port and path are left alone."""
+    parts = urlsplit(url)
+    # token is decoded (url_token); a password may hold & + # or %
+    token = quote(token, safe="")
+    query = "&".join("token=" + token if param.split("=", 1)[0] == "token" else param
+                     for param in parts.query.split("&"))
+    return urlunsplit(parts._replace(query=query))
+
+
+def add_token_mirror(ch, token, others):
+    """
+    Give ch, if its URL carries token, mirrors with the other token forms
+    of the same account (build_provider_url), in place; others must not
+    contain token.
+    """
+    url = ch.get("url", "")
+    # Only the token parameter: a short user or password may also occur in the host or path
+    if url_token(url) == token:
+        mirrors = ch.setdefault("mirrors", [])
+        for other in others:
+            mirror = with_token(url, other)
+            if mirror not in mirrors:
+                mirrors.append(mirror)
+
+
+class MirrorTable(object):
+    """Primary URL -> mirror URLs of the loaded playlists."""
+
+    def __init__(self):
+        self.mirrors = {}
+        self.current = {}           # primary url -> index played when not relayed
+
+    def load(self, entries):
+        for ch in entries:
+            url, mirrors = ch.get("url"), ch.get("mirrors")
+            if url and isinstance(mirrors, list):
+                mirrors = [str(m) for m in mirrors if m and m != url]
+                if mirrors != self.mirrors.get(str(url)):
+                    self.mirrors[str(url)] = mirrors
+                    self.current.pop(str(url), None)
+
+    def get(self, url):
+        return self.mirrors.get(url, [])
+
+    def urls(self, url):
+        return [url] + self.get(url)
+
+    def preferred(self, url):
+        """URL to play directly (without the relay) for the channel at url."""
+        urls = self.urls(url)
+        return urls[self.current.get(url, 0) % len(urls)]
+
+    def rotate(self, url):
+        """Move the direct play of url's channel to its next mirror; False if it has none."""
+        urls = self.urls(url)
+        if len(urls) < 2:
+            return False
+        self.current[url] = (self.current.get(url, 0) + 1) % len(urls)
+        cprint("[IPStreamer] Next mirror {}/{}: {}".format(self.current[url] + 1, len(urls), self.preferred(url)))
+        return True
+
+
+_table = None
+
+def getMirrorTable():
+    global _table
+    if _table is None:
+        _table = MirrorTable()
+    return _table
@@ -0,0 +1,398 @@
+# net.py
+#
+# Shared HTTP client for the plugin's own downloads (provider playlists,
+# picon archives, EPG, the Online list, the update check) and host lookups
+# for the stream relay.
+#
+#   - DNS: A records are asked from the nameservers in /etc/resolv.conf
+#     and cached for their TTL (clamped to DNS_TTL_MIN..DNS_TTL_MAX).
+#     /etc/hosts comes first; getaddrinfo is the fallback, cached for
+#     DNS_TTL_DEFAULT.
+#   - Keep-alive: idle http.client connections are pooled per
+#     scheme/host/port and reused by the next request to that host.
+#   - TLS: one SSLContext per verify mode, and the last session per host
+#     is offered again so a reconnect skips the full handshake.
+# Everything here blocks; call it from a thread (fetch_deferred does).
+
+import http.client
+import random
+import socket
+import ssl
+import struct
+import threading
+import time
+
+try:
+    from urllib.parse import urljoin, urlsplit
+except ImportError:
+    from urlparse import urljoin, urlsplit
+
+from twisted.internet.threads import deferToThread
+
+REDC = "**"
+ENDC = "**"
+
+def cprint(text):
+    print(REDC + text + ENDC)
+
+
+TIMEOUT = 10
+DNS_TIMEOUT = 2.0
+DNS_TTL_MIN = 30
+DNS_TTL_MAX = 3600
+DNS_TTL_DEFAULT = 300
+POOL_PER_HOST = 2
+IDLE_MAX = 30                   # seconds an idle connection is kept
+MAX_REDIRECTS = 5
+CHUNK = 65536
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+
+class NetError(IOError):
+    """HTTP error status; code is the status."""
+
+    def __init__(self, message, code=None):
+        IOError.__init__(self, message)
+        self.code = code
+
+
+# --- DNS ---------------------------------------------------------------
+
+_dns_lock = threading.Lock()
+_dns_cache = {}                 # host -> (addresses, expires)
+_hosts = None
+_nameservers = None
+
+
+def is_ip(host):
+    try:
+        socket.inet_aton(host)
+        return host.count(".") == 3
+    except (socket.error, OSError):
+        return False
+
+
+def _load_hosts():
+    hosts = {}
+    try:
+        with open("/etc/hosts") as f:
+            for line in f:
+                fields = line.split("#")[0].split()
+                if len(fields) > 1 and is_ip(fields[0]):
+                    for name in fields[1:]:
+                        hosts.setdefault(name.lower(), fields[0])
+    except (IOError, OSError):
+        pass
+    return hosts
+
+
+def _load_nameservers():
+    servers = []
+    try:
+        with open("/etc/resolv.conf") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 1 and fields[0] == "nameserver" and is_ip(fields[1]):
+                    servers.append(fields[1])
+    except (IOError, OSError):
+        pass
+    return servers
+
+
+def _skip_name(data, offset):
+    while True:
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            return offset + 2
+        if length == 0:
+            return offset + 1
+        offset += length + 1
+
+
+def dns_query(host, server, timeout=DNS_TIMEOUT):
+    """(addresses, ttl) of host's A records from one nameserver."""
+    qid = random.randint(0, 0xFFFF)
+    query = struct.pack(">HHHHHH", qid, 0x0100, 1, 0, 0, 0)
+    for label in host.rstrip(".").split("."):
+        label = label.encode("idna")
+        query += struct.pack("B", len(label)) + label
+    query += b"\0" + struct.pack(">HH", 1, 1)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.settimeout(timeout)
+        sock.sendto(query, (server, 53))
+        while True:
+            data = sock.recv(2048)
+            if len(data) >= 12 and struct.unpack(">H", data[:2])[0] == qid:
+                break
+    finally:
+        sock.close()
+    flags, qdcount, ancount = struct.unpack(">HHH", data[2:8])
+    if flags & 0x000F:
+        raise socket.gaierror("DNS error {} for {}".format(flags & 0x000F, host))
+    offset = 12
+    for _ in range(qdcount):
+        offset = _skip_name(data, offset) + 4
+    addresses, ttls = [], []
+    for _ in range(ancount):
+        offset = _skip_name(data, offset)
+        rtype, rclass, ttl, length = struct.unpack(">HHIH", data[offset:offset + 10])
+        offset += 10
+        # CNAME chains come with their A records in the same answer
+        if rtype == 1 and rclass == 1 and length == 4:
+            addresses.append(socket.inet_ntoa(data[offset:offset + 4]))
+            ttls.append(ttl)
+        offset += length
+    if not addresses:
+        raise socket.gaierror("no A record for {}".format(host))
+    return addresses, min(ttls)
+
+
+def _lookup(host):
+    global _hosts, _nameservers
+    if _hosts is None:
+        _hosts = _load_hosts()
+        _nameservers = _load_nameservers()
+    if host.lower() in _hosts:
+        return [_hosts[host.lower()]], DNS_TTL_MAX
+    for server in _nameservers:
+        try:
+            addresses, ttl = dns_query(host, server)
+            return addresses, max(DNS_TTL_MIN, min(DNS_TTL_MAX, ttl))
+        except (socket.error, OSError, struct.error, IndexError):
+            continue
+    infos = socket.getaddrinfo(host, None, socket.AF_INET, socket.SOCK_STREAM)
+    return list(dict.fromkeys(info[4][0] for info in infos)), DNS_TTL_DEFAULT
+
+
+def resolve(host):
+    """IPv4 address for host from the cache, looked up when stale; host itself if that fails."""
+    if not host or is_ip(host):
+        return host
+    now = time.time()
+    with _dns_lock:
+        entry = _dns_cache.get(host)
+    if entry is not None and entry[1] > now:
+        return entry[0][0]
+    try:
+        addresses, ttl = _lookup(host)
+    except Exception as e:
+        cprint("[IPStreamer] DNS lookup failed for {}: {}".format(host, str(e)))
+        return entry[0][0] if entry is not None else host
+    with _dns_lock:
+        _dns_cache[host] = (addresses, now + ttl)
+    return addresses[0]
+
+
+def cached_address(host):
+    """Fresh cached address of host or None; never blocks (reactor thread)."""
+    if is_ip(host):
+        return host
+    with _dns_lock:
+        entry = _dns_cache.get(host)
+    if entry is not None and entry[1] > time.time():
+        return entry[0][0]
+    return None
+
+
+def prefetch_hosts(urls):
+    """Resolve the hosts of urls in the background, so a later connect finds them cached."""
+    hosts = []
+    for url in urls:
+        try:
+            host = urlsplit(url).hostname
+        except Exception:
+            continue
+        if host and not cached_address(host) and host not in hosts:
+            hosts.append(host)
+    if not hosts:
+        return
+
+    def run():
+        for host in hosts:
+            resolve(host)
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+
+
+# --- HTTP --------------------------------------------------------------
+
+_pool_lock = threading.Lock()
+_idle = {}                      # (scheme, host, port, verify) -> [(connection, since)]
+_tls_sessions = {}              # (host, port) -> ssl.SSLSession
+_contexts = {}
+
+
+def _context(verify):
+    if verify not in _contexts:
+        context = ssl.create_default_context()
+        if not verify:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        _contexts[verify] = context
+    return _contexts[verify]
+
+
+class _Connection(http.client.HTTPConnection):
+
+    def connect(self):
+        self.sock = socket.create_connection((resolve(self.host), self.port), self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class _TLSConnection(http.client.HTTPSConnection):
+
+    def __init__(self, host, port, timeout, verify):
+        http.client.HTTPSConnection.__init__(self, host, port, timeout=timeout, context=_context(verify))
+        self.verify = verify
+
+    def connect(self):
+        sock = socket.create_connection((resolve(self.host), self.port), self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        key = (self.host, self.port)
+        session = _tls_sessions.get(key)
+        try:
+            self.sock = self._context.wrap_socket(sock, server_hostname=self.host, session=session)
+        except ssl.SSLError:
+            if session is None:
+                raise
+            # Stale session: full handshake
+            _tls_sessions.pop(key, None)
+            sock = socket.create_connection((resolve(self.host), self.port), self.timeout)
+            self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+        remember_tls_session(self)
+
+
+def remember_tls_session(conn):
+    session = getattr(conn.sock, "session", None)
+    if session is not None:
+        _tls_sessions[(conn.host, conn.port)] = session
+
+
+def _take(key, timeout, pooled=True):
+    """(connection, reused) for key: an idle pooled one or a new one."""
+    now = time.time()
+    with _pool_lock:
+        idle = _idle.get(key, []) if pooled else []
+        while idle:
+            conn, since = idle.pop()
+            if now - since < IDLE_MAX:
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+            conn.close()
+    scheme, host, port, verify = key
+    if scheme == "https":
+        return _TLSConnection(host, port, timeout, verify), False
+    return _Connection(host, port, timeout=timeout), False
+
+
+def _release(key, conn):
+    if conn.sock is None:
+        return
+    if key[0] == "https":
+        # TLS 1.3 tickets arrive after the handshake
+        remember_tls_session(conn)
+    with _pool_lock:
+        idle = _idle.setdefault(key, [])
+        if len(idle) < POOL_PER_HOST:
+            idle.append((conn, time.time()))
+            return
+    conn.close()
+
+
+class Response(object):
+    """Response of open_url; close() hands the connection back to the pool."""
+
+    def __init__(self, url, key, conn, response):
+        self.url = url
+        self.key = key
+        self.conn = conn
+        self.response = response
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.msg
+
+    def read(self, size=-1):
+        return self.response.read() if size is None or size < 0 else self.response.read(size)
+
+    def close(self):
+        if self.conn is None:
+            return
+        conn, self.conn = self.conn, None
+        if self.response.isclosed() and not self.response.will_close:
+            _release(self.key, conn)
+        else:
+            conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def open_url(url, headers=None, timeout=TIMEOUT, verify=True, redirects=MAX_REDIRECTS):
+    """GET url over a pooled connection, following redirects; returns a Response."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        raise NetError("unsupported URL: {}".format(url))
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    key = (parts.scheme, parts.hostname, port, bool(verify))
+    path = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+    request_headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "identity"}
+    request_headers.update(headers or {})
+
+    for pooled in (True, False):
+        conn, reused = _take(key, timeout, pooled)
+        try:
+            conn.request("GET", path, headers=request_headers)
+            response = conn.getresponse()
+            break
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            # A pooled connection the server already closed: once more on a new one
+            if not reused:
+                raise
+
+    result = Response(url, key, conn, response)
+    location = response.getheader("location")
+    if response.status in (301, 302, 303, 307, 308) and location and redirects > 0:
+        response.read()
+        result.close()
+        return open_url(urljoin(url, location), headers, timeout, verify, redirects - 1)
+    return result
+
+
+def fetch(url, headers=None, timeout=TIMEOUT, verify=True):
+    """Body of url as bytes; NetError on an HTTP error status."""
+    with open_url(url, headers, timeout, verify) as response:
+        if response.status >= 400:
+            response.read()
+            raise NetError("HTTP error {}: {}".format(response.status, response.reason), response.status)
+        return response.read()
+
+
+def fetch_to_file(url, path, headers=None, timeout=TIMEOUT * 3, verify=True):
+    """Stream url into path; returns the byte count."""
+    size = 0
+    with open_url(url, headers, timeout, verify) as response:
+        if response.status >= 400:
+            response.read()
+            raise NetError("HTTP error {}: {}".format(response.status, response.reason), response.status)
+        with open(path, "wb") as f:
+            while True:
+                chunk = response.read(CHUNK)
+                if not chunk:
+                    break
+                f.write(chunk)
+                size += len(chunk)
+    return size
+
+
+def fetch_deferred(url, headers=None, timeout=TIMEOUT, verify=True):
+    """fetch() in a reactor thread pool thread; returns a Deferred firing with the body."""
+    return deferToThread(fetch, url, headers, timeout, verify)
@@ -0,0 +1,154 @@
+# player_cmd.py
+#
+# Structured player command and shell-free process launch.
+#
+# The wrappers return a PlayerCommand (argv list + extra environment) instead
+# of one joined string, so URLs with quotes, ';' or '&' are passed verbatim
+# and no /bin/sh is forked per zap. Binary paths are resolved once per
+# session. Launch hooks let callers measure fork -> first audio. Each player
+# gets its own process group and is registered with the lifecycle manager,
+# which stops it (see lifecycle.py).
+
+import os
+import subprocess
+import time
+
+from Plugins.Extensions.IPStreamer.lifecycle import getProcessManager
+
+REDC = "**"
+ENDC = "**"
+
+def cprint(text):
+    print(REDC + text + ENDC)
+
+
+BINARY_DIRS = ("/usr/bin", "/usr/local/bin", "/bin")
+
+_binary_cache = {}
+_hooks = {"spawn": [], "first_audio": []}
+
+
+def resolve_binary(name):
+    """Return absolute path of name (searched once per session) or None."""
+    if name in _binary_cache:
+        return _binary_cache[name]
+    path = None
+    if os.path.isabs(name):
+        if os.access(name, os.X_OK):
+            path = name
+    else:
+        dirs = os.environ.get("PATH", "").split(os.pathsep) + list(BINARY_DIRS)
+        for d in dirs:
+            candidate = os.path.join(d, name)
+            if d and os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+                path = candidate
+                break
+    _binary_cache[name] = path
+    cprint("[IPStreamer] Resolved {} -> {}".format(name, path))
+    return path
+
+
+def reset_binary_cache():
+    _binary_cache.clear()
+
+
+class PlayerCommand(object):
+    """argv list plus extra environment for one player process."""
+
+    def __init__(self, argv, env=None):
+        self.argv = [str(a) for a in argv]
+        self.env = dict(env or {})
+
+    @property
+    def binary(self):
+        return self.argv[0] if self.argv else None
+
+    def resolved_argv(self):
+        path = resolve_binary(self.binary)
+        if path is None:
+            raise OSError("Player binary not found: {}".format(self.binary))
+        return [path] + self.argv[1:]
+
+    def environ(self):
+        if not self.env:
+            return None
+        env = os.environ.copy()
+        env.update(self.env)
+        return env
+
+    def __str__(self):
+        # Only for logging; the command is never passed through a shell.
+        def quote(a):
+            if a and all(c.isalnum() or c in "-_=:/.,@%+" for c in a):
+                return a
+            return "'" + a.replace("'", "'\\''") + "'"
+        prefix = " ".join("{}={}".format(k, v) for k, v in sorted(self.env.items()))
+        line = " ".join(quote(a) for a in self.argv)
+        return (prefix + " " + line) if prefix else line
+
+
+class LaunchTiming(object):
+    """Fork / first audio timestamps of one launched player."""
+
+    def __init__(self, command):
+        self.command = command
+        self.spawned = time.time()
+        self.first_audio = None
+
+    def restart(self):
+        """Measure again from now, e.g. when a warm process becomes audible."""
+        self.spawned = time.time()
+        self.first_audio = None
+
+    def elapsed_ms(self):
+        if self.first_audio is None:
+            return None
+        return int((self.first_audio - self.spawned) * 1000)
+
+
+def add_launch_hook(event, callback):
+    """event: "spawn" -> callback(process) or "first_audio" -> callback(process, ms)."""
+    if callback not in _hooks[event]:
+        _hooks[event].append(callback)
+
+
+def remove_launch_hook(event, callback):
+    if callback in _hooks[event]:
+        _hooks[event].remove(callback)
+
+
+def _run_hooks(event, *args):
+    for callback in list(_hooks[event]):
+        try:
+            callback(*args)
+        except Exception as e:
+            cprint("[IPStreamer] Launch hook error: {}".format(str(e)))
+
+
+def launch(command, stdin=None, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=-1):
+    """Start command directly (no shell) in its own process group and attach a LaunchTiming to it."""
+    process = subprocess.Popen(
+        command.resolved_argv(),
+        env=command.environ(),
+        stdin=stdin,
+        stdout=stdout,
+        stderr=stderr,
+        bufsize=bufsize,
+        close_fds=True,
+        start_new_session=True
+    )
+    process.launch_timing = LaunchTiming(command)
+    getProcessManager().track(process)
+    _run_hooks("spawn", process)
+    return process
+
+
+def mark_first_audio(process):
+    """Record first audio for process once; returns elapsed ms or None."""
+    timing = getattr(process, "launch_timing", None)
+    if timing is None or timing.first_audio is not None:
+        return None
+    timing.first_audio = time.time()
+    ms = timing.elapsed_ms()
+    _run_hooks("first_audio", process, ms)
+    return ms
@@ -0,0 +1,257 @@
+# player_control.py
+#
+# Live control of the running player.
+#
+# A control object is attached to the process started by runCmd when the
+# backend can take changes at runtime. Volume, equalizer and delay changes
+# made in the UI or web interface are pushed to it with apply_live_settings()
+# instead of restarting (and reconnecting) the stream.
+
+import json
+
+from Components.config import config
+from Plugins.Extensions.IPStreamer.ffmpeg_wrapper import FF_DELAY, FF_EQ, FF_VOLUME, get_ffmpeg_eq_gains, volume_factor
+from Plugins.Extensions.IPStreamer.gst_wrapper import get_gst_eq_gains, get_gst_engine_sink
+from Plugins.Extensions.IPStreamer.player_cmd import mark_first_audio
+
+REDC = "**"
+ENDC = "**"
+
+def cprint(text):
+    print(REDC + text + ENDC)
+
+
+DELAY_MIN = -10
+DELAY_MAX = 60
+DELAY_FINE_STEP = 0.05      # seconds per fine step (keys 4/6)
+
+
+def get_audio_delay():
+    """Audio delay in seconds: whole seconds (audioDelay) plus audioDelayFine ms."""
+    seconds = config.plugins.IPStreamer.audioDelay.value or 0
+    fine = config.plugins.IPStreamer.audioDelayFine.value or 0
+    return seconds + fine / 1000.0
+
+
+def set_audio_delay(seconds):
+    """Store a delay in seconds, split into audioDelay and audioDelayFine."""
+    total_ms = int(round(max(DELAY_MIN, min(DELAY_MAX, seconds)) * 1000))
+    whole = int(total_ms / 1000)
+    config.plugins.IPStreamer.audioDelay.value = whole
+    config.plugins.IPStreamer.audioDelay.save()
+    config.plugins.IPStreamer.audioDelayFine.value = total_ms - whole * 1000
+    config.plugins.IPStreamer.audioDelayFine.save()
+
+
+def format_audio_delay(seconds):
+    """2 -> '2s', 1.5 -> '1.5s', 1.001 -> '1.001s' (millisecond steps)."""
+    return "{:.3f}".format(seconds).rstrip("0").rstrip(".") + "s"
+
+
+def current_settings():
+    """Audio settings a live control can apply, read from config."""
+    return {
+        "delay_sec": get_audio_delay(),
+        "volume_level": config.plugins.IPStreamer.volLevel.value,
+        "equalizer": config.plugins.IPStreamer.equalizer.value,
+    }
+
+
+class LiveControl(object):
+    """Base class: a running player that accepts settings over its stdin."""
+
+    # Set by controls whose player reports back on stdout: called by the
+    # PlayerMonitor with (line, stats) for every stdout line.
+    handleLine = None
+
+    def __init__(self, url, delayBase=0):
+        self.url = url
+        # Part of the delay already applied before the player (relay start
+        # position); the player itself only adds delay_sec - delayBase.
+        self.delayBase = delayBase
+        self.process = None
+        self.applied = {}
+
+    def attach(self, process):
+        self.process = process
+        self.applied = current_settings()
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def write(self, data):
+        if not self.alive() or self.process.stdin is None:
+            return False
+        try:
+            self.process.stdin.write(data)
+            self.process.stdin.flush()
+            return True
+        except Exception as e:
+            cprint("[IPStreamer] Live control write failed: {}".format(str(e)))
+            return False
+
+    def canApply(self, settings):
+        """False when a change needs a restart with this backend."""
+        return True
+
+    def apply(self, settings):
+        """Push changed settings; returns False when a restart is needed."""
+        changed = dict((k, v) for k, v in settings.items() if self.applied.get(k) != v)
+        if not changed:
+            return True
+        if not self.canApply(settings) or not self.send(changed):
+            return False
+        self.applied.update(changed)
+        return True
+
+    def send(self, changed):
+        """
+        Write the changed settings to the player; False when it cannot take
+        them, so apply() asks for a restart. The base control takes none:
+        GstEngineControl and FFmpegFilterControl override this.
+        """
+        return False
+
+    def detach(self):
+        self.process = None
+
+
+class GstEngineControl(LiveControl):
+    """Talks JSON lines to the gst_engine helper process."""
+
+    def attach(self, process):
+        LiveControl.attach(self, process)
+        sink, device = get_gst_engine_sink()
+        msg = self.message(self.applied)
+        msg.update({"cmd": "play", "url": self.url, "sink": sink, "device": device})
+        self.sendMessage(msg)
+
+    def message(self, changed):
+        msg = {}
+        if "volume_level" in changed:
+            msg["volume"] = changed["volume_level"] / 10.0
+        if "equalizer" in changed:
+            msg["eq"] = list(get_gst_eq_gains(changed["equalizer"]))
+        if "delay_sec" in changed:
+            msg["delay_ms"] = int((changed["delay_sec"] - self.delayBase) * 1000)
+        return msg
+
+    def sendMessage(self, msg):
+        return self.write((json.dumps(msg) + "\n").encode("utf-8"))
+
+    def send(self, changed):
+        msg = self.message(changed)
+        msg["cmd"] = "set"
+        cprint("[IPStreamer] GStreamer engine live update: {}".format(msg))
+        return self.sendMessage(msg)
+
+    def handleLine(self, line, stats):
+        """One JSON event from the engine's stdout (see gst_engine.py)."""
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return
+        name = event.get("event")
+        if name == "first_audio":
+            stats.progress()
+            if self.process is not None:
+                mark_first_audio(self.process)
+        elif name == "tags":
+            stats.update(codec=event.get("codec"), bitrate=event.get("bitrate"))
+        elif name == "caps":
+            stats.update(sampleRate=event.get("rate"), channels=event.get("channels"))
+        elif name == "position":
+            stats.progress()
+            stats.outTime = event.get("seconds")
+        elif name == "error":
+            cprint("[IPStreamer] GStreamer engine error: {}".format(event.get("message")))
+        elif name in ("eos", "stopped"):
+            cprint("[IPStreamer] GStreamer engine {}".format(name))
+
+    def detach(self):
+        self.sendMessage({"cmd": "quit"})
+        LiveControl.detach(self)
+
+
+class FFmpegFilterControl(LiveControl):
+    """
+    Sends runtime filter commands to ffmpeg over its stdin: the 'c' key
+    followed by "<target> <time> <command> <arg>" (time -1 = now), which
+    ffmpeg passes to avfilter_graph_send_command. Targets are the named
+    filter instances built by build_ffmpeg_live_filters.
+    """
+
+    def __init__(self, url, support, delayBase=0):
+        LiveControl.__init__(self, url, delayBase)
+        self.support = support
+
+    def canApply(self, settings):
+        old_delay = (self.applied.get("delay_sec") or 0) - self.delayBase
+        new_delay = (settings.get("delay_sec") or 0) - self.delayBase
+        if old_delay != new_delay:
+            # Negative delay is an input seek (-ss) or an earlier start in
+            # the relay buffer; only a restart can change it
+            if old_delay < 0 or new_delay < 0 or not self.support.get("adelay"):
+                return False
+        if self.applied.get("equalizer") != settings.get("equalizer") and not self.support.get("equalizer"):
+            return False
+        if self.applied.get("volume_level") != settings.get("volume_level") and not self.support.get("volume"):
+            return False
+        return True
+
+    def command(self, target, command, arg):
+        line = "c{} -1 {} {}\n".format(target, command, arg)
+        cprint("[IPStreamer] FFmpeg filter command: {}".format(line.strip()))
+        return self.write(line.encode("utf-8"))
+
+    def send(self, changed):
+        ok = True
+        if "volume_level" in changed:
+            ok = self.command(FF_VOLUME, "volume", "{:.2f}".format(volume_factor(changed["volume_level"]))) and ok
+        if "equalizer" in changed:
+            for target, gain in zip(FF_EQ, get_ffmpeg_eq_gains(changed["equalizer"])):
+                ok = self.command(target, "gain", gain) and ok
+        if "delay_sec" in changed:
+            delay_ms = int(max(0, min(60, changed["delay_sec"] - self.delayBase)) * 1000)
+            ok = self.command(FF_DELAY, "delays", "{0}|{0}".format(delay_ms)) and ok
+        return ok
+
+    def detach(self):
+        # 'q' lets ffmpeg close ALSA cleanly before the terminate() that follows
+        self.write(b"q")
+        LiveControl.detach(self)
+
+
+_active = None
+
+def set_live_control(control):
+    global _active
+    _active = control
+
+
+def get_live_control():
+    if _active is not None and not _active.alive():
+        return None
+    return _active
+
+
+def clear_live_control():
+    global _active
+    if _active is not None:
+        try:
+            _active.detach()
+        except Exception:
+            pass
+    _active = None
+
+
+def apply_live_settings():
+    """
+    Push the current config to the running player. Returns True when the
+    player took the change live, False when there is no live control or
+    the change needs a restart.
+    """
+    control = get_live_control()
+    if control is None:
+        return False
+    return control.apply(current_settings())
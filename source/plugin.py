@@ -34,6 +34,8 @@ from Tools.Directories import fileExists, resolveFilename, SCOPE_PLUGINS
 
 # Utilities and keymaps
 from Tools.BoundFunction import boundFunction
+from twisted.internet import reactor
+from twisted.internet.threads import deferToThread
 from GlobalActions import globalActionMap
 try:
     from keymapparser import readKeymap
@@ -46,9 +48,6 @@ import os
 import re
 import signal
 import subprocess
-import urllib.error
-import urllib.request
-from collections import OrderedDict
 from datetime import datetime
 from sys import version_info
 
@@ -66,8 +65,27 @@ except ImportError:
 
 # IPStreamer-specific imports (keep at bottom)
 from Plugins.Extensions.IPStreamer.Console2 import Console2
-from Plugins.Extensions.IPStreamer.ffmpeg_wrapper import build_ffmpeg_cmd
-from Plugins.Extensions.IPStreamer.gst_wrapper import build_gst_cmd
+from Plugins.Extensions.IPStreamer.catalog import getCatalog
+from Plugins.Extensions.IPStreamer.delay_calibration import DelayCalibration, capture_seconds, suggest_delays
+from Plugins.Extensions.IPStreamer.e2_stream import getE2Streams
+from Plugins.Extensions.IPStreamer.ffmpeg_wrapper import build_ffmpeg_cmd, get_runtime_filter_support, start_runtime_filter_probe
+from Plugins.Extensions.IPStreamer.gst_wrapper import build_gst_cmd, build_gst_engine_cmd, gst_engine_available, start_gst_engine_check
+from Plugins.Extensions.IPStreamer.mirrors import getMirrorTable, url_token
+from Plugins.Extensions.IPStreamer.net import fetch_deferred, fetch_to_file, prefetch_hosts
+from Plugins.Extensions.IPStreamer.health_scan import getHealthScanner, health_mark, is_scan_enabled
+from Plugins.Extensions.IPStreamer.lifecycle import getProcessManager
+from Plugins.Extensions.IPStreamer.m3u_import import load_state, M3UDownload, NotModified, ProviderImport, race, save_state
+from Plugins.Extensions.IPStreamer.player_control import (
+    DELAY_FINE_STEP, FFmpegFilterControl, GstEngineControl, apply_live_settings, clear_live_control,
+    format_audio_delay, get_audio_delay, set_audio_delay, set_live_control
+)
+from Plugins.Extensions.IPStreamer.player_cmd import add_launch_hook, launch, resolve_binary
+from Plugins.Extensions.IPStreamer.probe_cache import ffmpeg_input_args, getProbeCache
+from Plugins.Extensions.IPStreamer.relay import getRelay, pause_status_text, relay_status_text
+from Plugins.Extensions.IPStreamer.variant_select import getVariantSelector
+from Plugins.Extensions.IPStreamer.stream_stats import PlayerMonitor, parser_for
+from Plugins.Extensions.IPStreamer.stream_supervisor import getSupervisor
+from Plugins.Extensions.IPStreamer.warm_pool import getWarmPool, is_pool_enabled, neighbour_urls
 from .skin import *
 
 WEBIF_PORT = 9898
@@ -76,10 +94,12 @@ PY3 = version_info[0] == 3
 
 config.plugins.IPStreamer = ConfigSubsection()
 config.plugins.IPStreamer.currentService = ConfigText()
-config.plugins.IPStreamer.player = ConfigSelection(default="gst1.0-ipstreamer", choices=[
+PLAYER_CHOICES = [
                 ("gst1.0-ipstreamer", _("Gstreamer")),
+                ("gst1.0-engine", _("Gstreamer (live control)")),
                 ("ff-ipstreamer", _("FFmpeg")),
-            ])
+            ]
+config.plugins.IPStreamer.player = ConfigSelection(default="gst1.0-ipstreamer", choices=PLAYER_CHOICES)
 config.plugins.IPStreamer.sync = ConfigSelection(default="alsasink", choices=[
                 ("alsasink", _("alsasink")),
                 ("osssink", _("osssink")),
@@ -98,7 +118,21 @@ config.plugins.IPStreamer.update = ConfigYesNo(default=True)
 config.plugins.IPStreamer.mainmenu = ConfigYesNo(default=False)
 config.plugins.IPStreamer.keepaudio = ConfigYesNo(default=False)
 config.plugins.IPStreamer.volLevel = ConfigSelectionNumber(default=40, stepwidth=1, min=1, max=100, wraparound=True)
+config.plugins.IPStreamer.warmPoolSize = ConfigSelectionNumber(default=0, stepwidth=1, min=0, max=4, wraparound=False)  # 0 = off
+config.plugins.IPStreamer.stallTimeout = ConfigSelectionNumber(default=15, stepwidth=5, min=0, max=60, wraparound=False)  # 0 = no auto reconnect
+config.plugins.IPStreamer.healthScan = ConfigYesNo(default=True)  # background link check
+config.plugins.IPStreamer.relayEnabled = ConfigYesNo(default=False)  # opt-in: streams go through a proxy on the main loop
+config.plugins.IPStreamer.autoVariant = ConfigYesNo(default=True)  # pick LOW/VIP/4k variant by throughput
+config.plugins.IPStreamer.variantProbe = ConfigYesNo(default=False)  # test the variant up with a second connection
+config.plugins.IPStreamer.relayBuffer = ConfigSelectionNumber(default=60, stepwidth=10, min=10, max=300, wraparound=False)  # seconds kept by the local relay
+config.plugins.IPStreamer.pauseBuffer = ConfigSelectionNumber(default=32, stepwidth=32, min=32, max=1024, wraparound=False)  # MB kept while paused
+config.plugins.IPStreamer.pauseStorage = ConfigSelection(default="memory", choices=[
+    ("memory", _("Memory")),
+    ("/media/hdd", "/media/hdd"),
+    ("/media/usb", "/media/usb"),
+])
 config.plugins.IPStreamer.audioDelay = ConfigInteger(default=0, limits=(-10, 60))  # -10s to 60s
+config.plugins.IPStreamer.audioDelayFine = ConfigInteger(default=0, limits=(-999, 999))  # ms added to audioDelay
 config.plugins.IPStreamer.tsDelay = ConfigInteger(default=5, limits=(0, 300))  # 0s to 300s (5 minutes)
 config.plugins.IPStreamer.delay = NoSave(ConfigInteger(default=5, limits=(0, 300)))
 config.plugins.IPStreamer.playlist = ConfigSelection(choices=[("1", _("Press OK"))], default="1")
@@ -106,6 +140,7 @@ config.plugins.IPStreamer.running = ConfigYesNo(default=False)
 config.plugins.IPStreamer.lastidx = ConfigText()
 config.plugins.IPStreamer.lastplayed = NoSave(ConfigText())
 config.plugins.IPStreamer.lastAudioChannel = ConfigText(default="")  # Store last selected audio URL
+config.plugins.IPStreamer.lastAudioName = ConfigText(default="")  # Its channel name, for restore after a URL change
 config.plugins.IPStreamer.equalizer = ConfigSelection(default="off", choices=[
     ("off", _("Off")),
     ("bass_boost", _("Bass Boost")),
@@ -187,6 +222,7 @@ config.plugins.IPStreamer.orange_user = ConfigText(default="", fixed_size=False)
 config.plugins.IPStreamer.orange_pass = ConfigText(default="", fixed_size=False)
 config.plugins.IPStreamer.satfamily_user = ConfigText(default="", fixed_size=False)
 config.plugins.IPStreamer.satfamily_pass = ConfigText(default="", fixed_size=False)
+config.plugins.IPStreamer.m3uSplitGroups = ConfigYesNo(default=False)  # one category per group-title on list download
 
 # After config definitions, add migration code:
 
@@ -247,6 +283,66 @@ def trace_error():
     except:
         pass
 
+def logFirstAudio(process, ms):
+    cprint("[IPStreamer] First audio from PID {} after {} ms".format(process.pid, ms))
+
+add_launch_hook("first_audio", logFirstAudio)
+
+def buildPlayerCmd(url, track=0):
+    """
+    (PlayerCommand, live control or None) for the configured player,
+    built from the current delay/volume/equalizer settings.
+    """
+    player = config.plugins.IPStreamer.player.value
+    delaysec = get_audio_delay()
+    vol_level = config.plugins.IPStreamer.volLevel.value  # 1–100 from config
+    # Play through the local relay so restarts reuse the upstream connection.
+    # The relay starts the player delaysec behind the live edge, so the
+    # player runs without delay and later changes are relative to that.
+    delaybase = 0
+    source = url
+    # Mirrors of the channel: raced by the relay, else played one at a time
+    mirrors = getMirrorTable().get(url)
+    local = getRelay().localUrl(url, delaysec, mirrors)
+    tempo = None
+    if local != url:
+        url, delaybase, delaysec = local, delaysec, 0
+        # Behind live after a pause and catching up
+        tempo = getRelay().tempo(source)
+    elif mirrors:
+        url = getMirrorTable().preferred(url)
+
+    if player == "gst1.0-engine" and gst_engine_available():
+        # GStreamer helper process with live volume/EQ/delay
+        return build_gst_engine_cmd(), GstEngineControl(url, delaybase)
+
+    # Also the live control player while python cannot load GStreamer
+    if player in ("gst1.0-ipstreamer", "gst1.0-engine"):
+        cmd = build_gst_cmd(
+            url=url,
+            delay_sec=delaysec,
+            volume_level=vol_level,
+        )
+        return cmd, None
+
+    # FFmpeg with runtime filter commands on stdin. Format and track from
+    # an earlier play of this stream skip most of the probing.
+    probe = getProbeCache().get(source)
+    input_args = ffmpeg_input_args(probe)
+    if track <= 0 and input_args:
+        track = probe.get("track") or 0
+    cmd = build_ffmpeg_cmd(
+        url=url,
+        delay_sec=delaysec,
+        volume_level=vol_level,
+        track_index=track if track > 0 or input_args else None,
+        live=True,
+        input_args=input_args,
+        silence_detect=bool(mirrors),
+        tempo=tempo,
+    )
+    return cmd, FFmpegFilterControl(url, get_runtime_filter_support(), delaybase)
+
 def build_provider_url(provider, username, password):
     """
     Return a list of (url, format_tag) to try in order.
@@ -290,27 +386,86 @@ def build_provider_url(provider, username, password):
 
     return urls
 
-def simpleDownloadM3U(url, timeout=10):
-    headers = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-    req = urllib.request.Request(url, headers=headers)
-    try:
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            data = resp.read()
-    except urllib.error.HTTPError as e:
-        raise Exception("HTTP error %s: %s" % (e.code, e.reason))
-    except urllib.error.URLError as e:
-        raise Exception("URL error: %s" % e.reason)
-    except Exception as e:
-        raise Exception("Network error: %s" % e)
+def getListStateFile():
+    """Validators and written files of the provider list downloads"""
+    return os.path.join(config.plugins.IPStreamer.settingsPath.value, 'm3u_state.json')
 
-    if not data:
-        raise Exception("Empty response from server")
+def downloadProviderList(provider, account, base_name, m3u_urls, rename, progress=None):
+    """
+    Download, convert and save one provider list; runs in a worker thread.
+    Returns (channel count, saved to, format), count None when the list is unchanged.
+    Raises an Exception carrying the message for the user.
+    """
+    split = config.plugins.IPStreamer.m3uSplitGroups.value
+    state_file = getListStateFile()
+    states = load_state(state_file)
+    key = '%s:%s' % (provider, account)
+    state = states.get(key, {})
+    remembered = state.get('format')
+    previous = state.get('files') or []
+    # Conditional request only while the files of the last download are still there
+    if state.get('split') != split or not state.get('files') or not all(os.path.exists(p) for p in state['files']):
+        state = {}
+
+    out_dir = config.plugins.IPStreamer.settingsPath.value
+    try:
+        if not os.path.exists(out_dir):
+            os.makedirs(out_dir)
+    except OSError as e:
+        raise Exception(_("Save failed:\n%s") % str(e))
+    # Renamed and spooled while it downloads, so the list is never held in memory
+    job = ProviderImport(out_dir, base_name, lambda ch: rename({"playlist": [ch]}, base_name))
+
+    # The token form that worked for this account alone first, then the others raced
+    rounds = [[c for c in m3u_urls if c[1] == remembered], [c for c in m3u_urls if c[1] != remembered]]
+    formats = dict(m3u_urls)
+    last_error = None
+    for candidates in rounds:
+        if not candidates:
+            continue
+        for url, fmt in candidates:
+            cprint("[IPStreamer] Trying %s URL (%s): %s" % (provider, fmt, url))
+        downloads = [M3UDownload(url, state if state.get('url') == url else None, progress=progress)
+                     for url, fmt in candidates]
+        try:
+            download = race(downloads)
+            url, fmt = download.url, formats[download.url]
+            count = job.receive(download.entries())
+            cprint("[IPStreamer] %s M3U download OK using %s" % (provider, fmt))
+            break
+        except NotModified:
+            cprint("[IPStreamer] %s list not modified, keeping %s" % (provider, ", ".join(state['files'])))
+            return None, "\n".join(state['files']), state.get('format')
+        except Exception as e:
+            last_error = str(e)
+            cprint("[IPStreamer] %s M3U download failed: %s" % (provider, last_error))
+    else:
+        job.discard()
+        raise Exception(_("Download failed.\nLast error:\n%s") % (last_error or _("Unknown error")))
 
+    if not count:
+        job.discard()
+        raise Exception(_("No channels found in downloaded list."))
     try:
-        text = data.decode("utf-8")
-    except Exception:
-        text = data.decode("latin-1", "ignore")
-    return text
+        # One ipstreamer_<group>.json per group-title when splitting
+        counts = job.write(split, url_token(url), [url_token(u) for u, f in m3u_urls])
+    except Exception as e:
+        raise Exception(_("Save failed:\n%s") % str(e))
+    finally:
+        job.discard()
+    # Files of the last download this one did not write again (other groups, split toggled)
+    for path in previous:
+        if path not in counts and os.path.exists(path):
+            try:
+                os.remove(path)
+                cprint("[IPStreamer] Removed old playlist %s" % path)
+            except OSError as e:
+                cprint("[IPStreamer] Could not remove old playlist %s: %s" % (path, str(e)))
+
+    states[key] = dict(download.validators(), url=url, files=sorted(counts), split=split, format=fmt)
+    save_state(state_file, states)
+    out_path = list(counts)[0] if len(counts) == 1 else "%s (%d playlists)" % (out_dir, len(counts))
+    return count, out_path, fmt
 
 def getPlaylistDir():
     """Get the configured playlist directory"""
@@ -324,8 +479,6 @@ def getPlaylistDir():
 
 def getPlaylistFiles():
     """Get all playlist JSON files from the ipstreamer directory"""
-    import glob
-    
     # Use configurable directory
     playlist_dir = getPlaylistDir()
     
@@ -336,16 +489,35 @@ def getPlaylistFiles():
         except:
             pass
     
-    playlist_files = glob.glob(playlist_dir + 'ipstreamer_*.json')
-    playlists = []
-    for filepath in sorted(playlist_files):
-        # Extract category name from filename: ipstreamer_sport.json -> Sport
-        filename = os.path.basename(filepath)
-        category = filename.replace('ipstreamer_', '').replace('.json', '')
-        category = category.capitalize()  # Sport, Quran, etc.
-        playlists.append({'name': category, 'file': filepath})
-    
-    return playlists
+    # Category names from the file names: ipstreamer_sport.json -> Sport
+    return getCatalog().categories(playlist_dir)
+
+def collectPlaylistUrls():
+    """All channel URLs from hosts.json and the ipstreamer_*.json categories"""
+    urls = []
+    hosts = resolveFilename(SCOPE_PLUGINS, "Extensions/IPStreamer/hosts.json")
+    for host in (getCatalog().hosts(hosts) or {}).values():
+        for cmd in host.get('cmds', []):
+            if '|' in cmd:
+                urls.append(cmd.split('|')[1])
+    for category in getPlaylistFiles():
+        urls.extend(url for name, url in getCatalog().channels(category['file']))
+    return urls
+
+def startHealthScan(force=False):
+    """Check all playlist links in the background (at most every few hours unless forced)"""
+    if not is_scan_enabled():
+        return False
+    try:
+        return getHealthScanner().scan(collectPlaylistUrls, force)
+    except:
+        trace_error()
+    return False
+
+def nowPlayingTitle(url):
+    """Live stream title (ICY StreamTitle) if url is the stream playing now"""
+    playing, title = getRelay().nowPlaying()
+    return title if playing and playing == url else None
 
 def getPlaylist(category_file=None):
     """Load playlist from specific file or default"""
@@ -353,13 +525,8 @@ def getPlaylist(category_file=None):
         # Use configurable path for default
         category_file = os.path.join(config.plugins.IPStreamer.settingsPath.value, 'ipstreamer.json')
     
-    if fileExists(category_file):
-        with open(category_file, 'r') as f:
-            try:
-                return json.loads(f.read())
-            except ValueError:
-                trace_error()
-    return None
+    # Parsed once, reloaded when the file changes
+    return getCatalog().playlist(category_file)
 
 
 def getversioninfo():
@@ -616,9 +783,13 @@ def getVideoDelayFile():
     """Get the configured video delay file path"""
     return os.path.join(config.plugins.IPStreamer.settingsPath.value, 'video_delay_channels.json')
 
-def loadVideoDelayData():
+def getAudioDelayFile():
+    """Get the per channel (calibrated) audio delay file path"""
+    return os.path.join(config.plugins.IPStreamer.settingsPath.value, 'audio_delay_channels.json')
+
+def loadVideoDelayData(videodelayfile=None):
     """Load video delay data from JSON file"""
-    videodelayfile = getVideoDelayFile()
+    videodelayfile = videodelayfile or getVideoDelayFile()
     settings_dir = config.plugins.IPStreamer.settingsPath.value
     
     if not os.path.exists(settings_dir):
@@ -635,9 +806,9 @@ def loadVideoDelayData():
             trace_error()
     return {}
 
-def saveVideoDelayData(data):
+def saveVideoDelayData(data, videodelayfile=None):
     """Save video delay data to JSON file"""
-    videodelayfile = getVideoDelayFile()
+    videodelayfile = videodelayfile or getVideoDelayFile()
     settings_dir = config.plugins.IPStreamer.settingsPath.value
     
     try:
@@ -688,6 +859,55 @@ def saveVideoDelayForChannel(service_ref, delay_value):
     
     return False
 
+def getAudioDelayForChannel(service_ref):
+    """Get the calibrated audio delay (seconds) for a channel, None if there is none"""
+    if not service_ref:
+        return None
+    delay_value = loadVideoDelayData(getAudioDelayFile()).get(service_ref.toString())
+    if isinstance(delay_value, (int, float)):
+        return float(delay_value)
+    return None
+
+def saveAudioDelayForChannel(service_ref, delay_value):
+    """Save the calibrated audio delay for a channel"""
+    if not service_ref:
+        return False
+    ref_str = service_ref.toString()
+    data = loadVideoDelayData(getAudioDelayFile())
+    data[ref_str] = delay_value
+    if saveVideoDelayData(data, getAudioDelayFile()):
+        cprint("[IPStreamer] Saved audio delay for channel: {} = {}".format(ref_str, delay_value))
+        return True
+    return False
+
+def getCommentaryFile():
+    """Get the channel -> commentary stream bindings file path"""
+    return os.path.join(config.plugins.IPStreamer.settingsPath.value, 'commentary_channels.json')
+
+def getCommentaryForChannel(service_ref):
+    """Commentary stream bound to a channel ({'url', 'channel'}), None if there is none"""
+    if not service_ref:
+        return None
+    binding = loadVideoDelayData(getCommentaryFile()).get(service_ref.toString())
+    if isinstance(binding, dict) and binding.get('url'):
+        return binding
+    return None
+
+def saveCommentaryForChannel(service_ref, url, name=''):
+    """Bind a commentary stream to a channel; url None removes the binding"""
+    if not service_ref:
+        return False
+    ref_str = service_ref.toString()
+    data = loadVideoDelayData(getCommentaryFile())
+    if url:
+        data[ref_str] = {'url': url, 'channel': name}
+    else:
+        data.pop(ref_str, None)
+    if saveVideoDelayData(data, getCommentaryFile()):
+        cprint("[IPStreamer] Commentary for channel: {} = {}".format(ref_str, url))
+        return True
+    return False
+
 def getAudioBitrate(url):
     """Get audio bitrate from stream URL using ffprobe"""
     try:
@@ -742,6 +962,27 @@ def getAudioBitrate(url):
     
     return None  # Unknown bitrate
 
+# ffprobe results per URL; every probe is an extra upstream connection
+bitrateCache = {}
+
+def probeAudioBitrate(url, callback):
+    """
+    Run getAudioBitrate in a worker thread, cached per URL.
+    callback(kbps or None) is called on the main thread.
+    """
+    if url in bitrateCache:
+        callback(bitrateCache[url])
+        return
+
+    def done(bitrate):
+        if bitrate:
+            bitrateCache[url] = bitrate
+        callback(bitrate)
+
+    d = deferToThread(getAudioBitrate, url)
+    d.addCallback(done)
+    d.addErrback(lambda failure: callback(None))
+
 def getGridPositions(resolution="FHD"):
     """Get grid positions for picons - 5 columns x 3 rows = 15 items"""
     if resolution == "FHD":
@@ -1179,15 +1420,27 @@ class IPStreamerSetup(Screen, ConfigListScreen):
         """Create settings menu with dynamic picon path based on view mode"""
         self.list = [getConfigListEntry(_("Player"), config.plugins.IPStreamer.player)]
         
-        if config.plugins.IPStreamer.player.value == "gst1.0-ipstreamer":
+        if config.plugins.IPStreamer.player.value.startswith("gst"):
             self.list.append(getConfigListEntry(_("Sync Audio using"), config.plugins.IPStreamer.sync))
         
         self.list.append(getConfigListEntry(_("Audio Equalizer"), config.plugins.IPStreamer.equalizer))
         self.list.append(getConfigListEntry(_("External links volume level"), config.plugins.IPStreamer.volLevel))
+        self.list.append(getConfigListEntry(_("Warm decoder pool (0 = off)"), config.plugins.IPStreamer.warmPoolSize))
+        self.list.append(getConfigListEntry(_("Reconnect after stall, seconds (0 = off)"), config.plugins.IPStreamer.stallTimeout))
+        self.list.append(getConfigListEntry(_("Check playlist links in background"), config.plugins.IPStreamer.healthScan))
+        self.list.append(getConfigListEntry(_("Auto-select stream quality (LOW/VIP/4k)"), config.plugins.IPStreamer.autoVariant))
+        if config.plugins.IPStreamer.autoVariant.value:
+            self.list.append(getConfigListEntry(_("Test higher quality on a second connection"), config.plugins.IPStreamer.variantProbe))
+        self.list.append(getConfigListEntry(_("Local stream relay"), config.plugins.IPStreamer.relayEnabled))
+        if config.plugins.IPStreamer.relayEnabled.value:
+            self.list.append(getConfigListEntry(_("Relay buffer, seconds"), config.plugins.IPStreamer.relayBuffer))
+            self.list.append(getConfigListEntry(_("Pause buffer, MB"), config.plugins.IPStreamer.pauseBuffer))
+            self.list.append(getConfigListEntry(_("Pause buffer storage"), config.plugins.IPStreamer.pauseStorage))
         self.list.append(getConfigListEntry(_("Keep original channel audio"), config.plugins.IPStreamer.keepaudio))
         self.list.append(getConfigListEntry(_("Force DVB audio mute hack"), config.plugins.IPStreamer.forceMuteHack))
         self.list.append(getConfigListEntry(_("Video Delay"), config.plugins.IPStreamer.tsDelay))
         self.list.append(getConfigListEntry(_("Audio Delay"), config.plugins.IPStreamer.audioDelay))
+        self.list.append(getConfigListEntry(_("Audio Delay fine, ms"), config.plugins.IPStreamer.audioDelayFine))
         
         # View mode selection
         self.list.append(getConfigListEntry(_("View Mode"), config.plugins.IPStreamer.viewMode))
@@ -1212,6 +1465,7 @@ class IPStreamerSetup(Screen, ConfigListScreen):
         self.list.append(getConfigListEntry(_("Orange password"), config.plugins.IPStreamer.orange_pass))
         self.list.append(getConfigListEntry(_("SatFamily username"), config.plugins.IPStreamer.satfamily_user))
         self.list.append(getConfigListEntry(_("SatFamily password"), config.plugins.IPStreamer.satfamily_pass))
+        self.list.append(getConfigListEntry(_("Split downloaded lists by group"), config.plugins.IPStreamer.m3uSplitGroups))
         
         self["config"].list = self.list
         self["config"].setList(self.list)
@@ -1231,6 +1485,8 @@ class IPStreamerSetup(Screen, ConfigListScreen):
                 if len(x) > 1:
                     x[1].save()
             configfile.save()
+            # Volume / equalizer / delay go straight to a live-controlled player
+            apply_live_settings()
             
             # Create directories if they don't exist
             new_settings_path = config.plugins.IPStreamer.settingsPath.value
@@ -1306,6 +1562,12 @@ class IPStreamerSetup(Screen, ConfigListScreen):
             elif current[1] == config.plugins.IPStreamer.viewMode:
                 # View mode changed - rebuild to show correct picon path
                 self.createSetup()
+            elif current[1] == config.plugins.IPStreamer.relayEnabled:
+                # Relay toggled - show/hide buffer size
+                self.createSetup()
+            elif current[1] == config.plugins.IPStreamer.autoVariant:
+                # Auto quality toggled - show/hide the probe option
+                self.createSetup()
 
 class IPStreamerScreen(Screen):
 
@@ -1367,10 +1629,15 @@ class IPStreamerScreen(Screen):
         if config.plugins.IPStreamer.audioDelay.value is None:
             config.plugins.IPStreamer.audioDelay.value = 0
             config.plugins.IPStreamer.audioDelay.save()        
+        # Calibrated audio delay for this channel, if any
+        saved_audio = getAudioDelayForChannel(self.session.nav.getCurrentlyPlayingServiceReference())
+        if saved_audio is not None:
+            set_audio_delay(saved_audio)
         self['audio_delay'] = Label()
         # Display audio delay in seconds
-        self['audio_delay'].setText('Audio Delay: {}s'.format(config.plugins.IPStreamer.audioDelay.value))
+        self['audio_delay'].setText('Audio Delay: {}'.format(format_audio_delay(get_audio_delay())))
         self['network_status'] = Label()  # For network status
+        self.listDownload = None  # provider list download in progress
         self['network_status'].setText('')
         # ADD COUNTDOWN WIDGET
         self['countdown'] = Label()
@@ -1414,6 +1681,10 @@ class IPStreamerScreen(Screen):
                 "audioDelayDown": self.audioDelayDown,
                 "audioDelayReset": self.audioDelayReset,
                 "audioDelayUp": self.audioDelayUp,
+                "audioDelayFineDown": self.audioDelayFineDown,
+                "audioDelayFineUp": self.audioDelayFineUp,
+                "calibrateDelay": self.calibrateDelay,
+                "bindCommentary": self.bindCommentary,
                 "clearVideoDelay": self.clearVideoDelay,
                 "nextBouquet": self.nextPlaylist,
                 "prevBouquet": self.prevPlaylist,
@@ -1423,6 +1694,17 @@ class IPStreamerScreen(Screen):
         self.alsa = None
         self.audioPaused = False
         self.audio_process = None
+        self.playerMonitor = None
+        self.audioTrack = 0
+        self.calibration = None
+        self.onClose.append(self.cancelCalibration)
+        # Mark dead/slow links once a background scan finishes
+        getHealthScanner().addListener(self.healthUpdated)
+        self.onClose.append(self.stopHealthUpdates)
+        startHealthScan()
+        # Now-playing title from the stream's ICY metadata
+        getRelay().addTitleListener(self.titleChanged)
+        self.onClose.append(self.stopTitleUpdates)
         self.radioList = []
 
         # ADD COUNTDOWN TRACKING
@@ -1443,15 +1725,18 @@ class IPStreamerScreen(Screen):
         # Initialize all timers
         self.timeShiftTimer = eTimer()
         self.statusTimer = eTimer()
+        self.applyTimer = eTimer()
         self.countdownTimer = eTimer()  # ADD THIS
         
         try:
             self.timeShiftTimer.callback.append(self.unpauseService)
             self.statusTimer.callback.append(self.checkNetworkStatus)
+            self.applyTimer.callback.append(self.restartPlayer)
             self.countdownTimer.callback.append(self.updateCountdown)  # ADD THIS
         except:
             self.timeShiftTimer_conn = self.timeShiftTimer.timeout.connect(self.unpauseService)
             self.statusTimer_conn = self.statusTimer.timeout.connect(self.checkNetworkStatus)
+            self.applyTimer_conn = self.applyTimer.timeout.connect(self.restartPlayer)
             self.countdownTimer_conn = self.countdownTimer.timeout.connect(self.updateCountdown)  # ADD THIS
         
         self.lastservice = self.session.nav.getCurrentlyPlayingServiceReference()
@@ -1506,8 +1791,7 @@ class IPStreamerScreen(Screen):
         
         try:
             # Download tar.gz to /tmp/
-            import urllib.request
-            urllib.request.urlretrieve(download_url, tmp_file)
+            fetch_to_file(download_url, tmp_file)
             
             # Ensure target directory exists
             if not os.path.exists(target_path):
@@ -1597,81 +1881,45 @@ class IPStreamerScreen(Screen):
                 )
                 return
 
-        last_error = None
-        m3u_text = None
-
-        for url, fmt in m3u_urls:
-            cprint("[IPStreamer] Trying %s URL (%s): %s" % (provider, fmt, url))
-            try:
-                m3u_text = simpleDownloadM3U(url)
-                cprint("[IPStreamer] %s M3U download OK using %s" % (provider, fmt))
-                break
-            except Exception as e:
-                last_error = str(e)
-                cprint("[IPStreamer] %s M3U download failed (%s): %s" % (provider, fmt, last_error))
-                m3u_text = None
-
-        if not m3u_text:
-            self.session.open(
-                MessageBox,
-                _("Download failed.\nLast error:\n%s") % (last_error or _("Unknown error")),
-                MessageBox.TYPE_ERROR, timeout=5
-            )
+        if self.listDownload is not None:
+            self.session.open(MessageBox, _("A list download is already running."), MessageBox.TYPE_INFO, timeout=5)
             return
 
-        # Rest of your code unchanged
-        json_data, count = self.m3uToIPStreamerJson(m3u_text, base_name)
-        if count == 0:
-            self.session.open(
-                MessageBox,
-                _("No channels found in downloaded list."),
-                MessageBox.TYPE_INFO, timeout=5
-            )
-            return
+        # Off the UI thread; progress and result come back through the reactor
+        self['network_status'].setText(_("Downloading %s list...") % choice[0])
+        progress = lambda received, total: reactor.callFromThread(self.listProgress, choice[0], received, total)
+        self.listDownload = deferToThread(downloadProviderList, provider, username, base_name,
+                                          m3u_urls, self.applyProviderRenames, progress)
+        self.listDownload.addCallbacks(self.listDownloaded, self.listDownloadFailed, callbackArgs=(choice[0],))
 
-        json_data = self.applyProviderRenames(json_data, base_name)
-        out_dir = config.plugins.IPStreamer.settingsPath.value
-        try:
-            if not os.path.exists(out_dir):
-                os.makedirs(out_dir)
-            out_path = os.path.join(out_dir, "ipstreamer_%s.json" % base_name)
-            with open(out_path, "w") as f:
-                json.dump(json_data, f, indent=4)
-        except Exception as e:
-            self.session.open(
-                MessageBox,
-                _("Save failed:\n%s") % str(e),
-                MessageBox.TYPE_ERROR, timeout=5
-            )
+    def listProgress(self, name, received, total):
+        if self.listDownload is None:
             return
+        if total:
+            text = _("Downloading %s list: %.1f MB (%d%%)") % (name, received / 1048576.0, received * 100 // total)
+        else:
+            text = _("Downloading %s list: %.1f MB") % (name, received / 1048576.0)
+        self['network_status'].setText(text)
 
-        msg = _("Download and conversion successful!\n\n"
-                "Provider: %s\n"
-                "Channels: %d\n"
-                "Saved to:\n%s") % (choice[0], count, out_path)
+    def listDownloaded(self, result, name):
+        self.listDownload = None
+        self['network_status'].setText('')
+        count, out_path, fmt = result
+        if count is None:
+            msg = _("List unchanged since the last download.\n\n"
+                    "Provider: %s\n"
+                    "Kept:\n%s") % (name, out_path)
+        else:
+            msg = _("Download and conversion successful!\n\n"
+                    "Provider: %s\n"
+                    "Channels: %d\n"
+                    "Saved to:\n%s") % (name, count, out_path)
         self.session.open(MessageBox, msg, MessageBox.TYPE_INFO, timeout=7)
 
-    def m3uToIPStreamerJson(self, m3u_text, base_name):
-        lines = m3u_text.splitlines()
-        playlist = []
-        last_name = None
-
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith("#EXTM3U"):
-                continue
-            if line.startswith("#EXTINF"):
-                parts = line.split(",", 1)
-                if len(parts) == 2:
-                    last_name = parts[1].strip()
-            elif line.startswith("http://") or line.startswith("https://"):
-                url = line
-                if not last_name:
-                    continue
-                playlist.append({"channel": last_name, "url": url})
-                last_name = None
-
-        return {"playlist": playlist}, len(playlist)
+    def listDownloadFailed(self, failure):
+        self.listDownload = None
+        self['network_status'].setText('')
+        self.session.open(MessageBox, failure.getErrorMessage(), MessageBox.TYPE_ERROR, timeout=5)
 
     def applyProviderRenames(self, json_data, base_name):
         """
@@ -1792,57 +2040,153 @@ class IPStreamerScreen(Screen):
 
     def checkNetworkStatus(self):
         """Check if audio stream is still playing with bitrate info"""
+        if self.audioPaused:
+            # Paused into the relay buffer; nothing is playing
+            self['network_status'].setText(pause_status_text(self.url))
+            return
+        reconnecting = getSupervisor().statusText()
+        if reconnecting:
+            # Supervisor is between attempts (or waiting for the network)
+            self['network_status'].setText(reconnecting)
+            return
         if self.audio_process:
             # Check if process is still running
             if self.audio_process.poll() is None:
-                # Process is running
-                if self.currentBitrate is not None:
+                # Process is running: show what the player itself reports
+                stats = self.playerMonitor.sample() if self.playerMonitor else None
+                status = stats.statusText() if stats else ''
+                if getRelay().caughtUp(self.url):
+                    # Back at live: normal tempo again
+                    self.restartPlayer()
+                    return
+                if stats and stats.outTime:
+                    # Playing: keep its format for a faster probe next time
+                    getProbeCache().remember(self.url, stats)
+                    getE2Streams().check(self.url, stats)
+                    if stats.silent:
+                        # Silent for a while: the next mirror, if the channel has one
+                        stats.silent = False
+                        if not getRelay().failover(self.url, "silent") and getMirrorTable().rotate(self.url):
+                            self.restartPlayer()
+                            return
+                    higher = getVariantSelector().poll(self.url, stats)
+                    if higher:
+                        self.switchVariant(higher)
+                        return
+                variant = getVariantSelector().label(self.url)
+                if variant:
+                    status = '{} · {}'.format(variant, status) if status else variant
+                relayed = relay_status_text(self.url)
+                if relayed:
+                    status = '{} · {}'.format(status, relayed) if status else relayed
+                saving = getE2Streams().statusText(self.url, stats)
+                if saving:
+                    status = '{} · {}'.format(status, saving) if status else saving
+                if status:
+                    self['network_status'].setText('● Playing {}'.format(status))
+                elif self.currentBitrate is not None:
                     self['network_status'].setText('● Playing {}kb/s'.format(self.currentBitrate))
                 else:
                     self['network_status'].setText('● Playing')
             else:
                 self['network_status'].setText('✗ Stopped')
+                if self.playerMonitor:
+                    # Last player output explains why it exited
+                    self.playerMonitor.dumpTail()
+                    if not self.playerMonitor.stats.outTime:
+                        # Exited before any audio: cached probe hints may be stale
+                        getProbeCache().forget(self.url)
                 self.audio_process = None
                 self.currentBitrate = None
+        elif getWarmPool().active is not None:
+            # Warm pool playback has no single tracked process
+            if getWarmPool().isPlaying():
+                # Byte counter of the active decoder plus the probed bitrate
+                stats = getWarmPool().activeStats()
+                if stats is not None and self.currentBitrate is not None:
+                    stats.bitrate = self.currentBitrate
+                status = stats.statusText() if stats else ''
+                if status:
+                    self['network_status'].setText('● Playing {}'.format(status))
+                else:
+                    self['network_status'].setText('● Playing')
+            else:
+                self['network_status'].setText('✗ Stopped')
+                self.currentBitrate = None
         else:
             self['network_status'].setText('')
             self.currentBitrate = None
 
     def checkAudioBitrate(self):
-        """Check audio bitrate of current stream"""
-        if hasattr(self, 'url') and self.url and config.plugins.IPStreamer.running.value:
-            cprint("[IPStreamer] Checking bitrate for: {}".format(self.url))
-            
-            # Get bitrate in background thread to avoid blocking
-            bitrate = getAudioBitrate(self.url)
-            
-            if bitrate:
-                self.currentBitrate = bitrate
-                cprint("[IPStreamer] Detected bitrate: {} kb/s".format(bitrate))
-                # Update display immediately
-                if self.audio_process and self.audio_process.poll() is None:
-                    self['network_status'].setText('● Playing {}kb/s'.format(self.currentBitrate))
-            else:
-                cprint("[IPStreamer] Could not detect bitrate")
-                self.currentBitrate = None
-        
+        """Fill in the bitrate when the player does not report it itself"""
         # Stop timer after first check
         self.bitrateCheckTimer.stop()
+        if not (hasattr(self, 'url') and self.url and config.plugins.IPStreamer.running.value):
+            return
+        
+        if self.playerMonitor:
+            # Direct player: bitrate/codec come passively from its own output
+            stats = self.playerMonitor.stats
+            if stats.bitrate:
+                self.currentBitrate = stats.bitrate
+            return
+        
+        # Warm pool decoders are not parsed: probe once per URL, off the UI thread
+        cprint("[IPStreamer] Probing bitrate for: {}".format(self.url))
+        probeAudioBitrate(self.url, boundFunction(self.gotAudioBitrate, self.url))
+
+    def gotAudioBitrate(self, url, bitrate):
+        if url != getattr(self, 'url', None):
+            return  # zapped while probing
+        if bitrate:
+            self.currentBitrate = bitrate
+            cprint("[IPStreamer] Detected bitrate: {} kb/s".format(bitrate))
+        else:
+            cprint("[IPStreamer] Could not detect bitrate")
+            self.currentBitrate = None
 
     def getTimeshift(self):
         service = self.session.nav.getCurrentService()
         return service and service.timeshift()
 
     def pauseAudioProcess(self):
-        if config.plugins.IPStreamer.running.value and IPStreamerHandler.container.running():
-            pid = IPStreamerHandler.container.getPID()
-            if not self.audioPaused:
-                cmd = "kill -STOP {}".format(pid)
-                self.audioPaused = True
-            else:
-                cmd = "kill -CONT {}".format(pid)
-                self.audioPaused = False
-            eConsoleAppContainer().execute(cmd)
+        """Pause the IP audio into the relay buffer, or resume it from there"""
+        if not config.plugins.IPStreamer.running.value or not getattr(self, 'url', None):
+            return
+        if self.audioPaused:
+            self.resumeAudio()
+            return
+        if not self.audio_process or not getRelay().pause(self.url):
+            self.session.open(MessageBox, _("Pause needs the local stream relay."), MessageBox.TYPE_INFO, timeout=5)
+            return
+        # Playout stops, the relay keeps receiving
+        getSupervisor().stop()
+        self.stopAudioProcess()
+        self.audioPaused = True
+        self['network_status'].setText(pause_status_text(self.url))
+
+    def resumeAudio(self):
+        """Continue from the pause point, then offer to catch up with live"""
+        behind = getRelay().resume(self.url, get_audio_delay())
+        cmd, control = buildPlayerCmd(self.url, self.audioTrack)
+        self.runCmd(cmd, control)
+        if behind < 1:
+            return
+        choices = [(_("Stay %d s behind live") % behind, "stay")]
+        if config.plugins.IPStreamer.player.value not in ("gst1.0-ipstreamer", "gst1.0-engine"):
+            choices.append((_("Catch up (play a little faster)"), "catchup"))
+        choices.append((_("Jump to live"), "live"))
+        self.session.openWithCallback(self.catchUpChoice, ChoiceBox, title=_("Audio resumed behind live"), list=choices)
+
+    def catchUpChoice(self, choice):
+        if not choice or self.audioPaused or not getattr(self, 'url', None):
+            return
+        if choice[1] == "catchup":
+            getRelay().catchUp(self.url)
+            self.restartPlayer()
+        elif choice[1] == "live":
+            getRelay().jumpLive(self.url)
+            self.restartPlayer()
 
     def pause(self):
         """Activate TimeShift with smart delay calculation"""
@@ -1955,11 +2299,9 @@ class IPStreamerScreen(Screen):
     def getHosts(self):
         """Get all available playlists including custom categories"""
         hosts = resolveFilename(SCOPE_PLUGINS, "Extensions/IPStreamer/hosts.json")
-        self.hosts = None
+        self.hosts = getCatalog().hosts(hosts)
         
-        if fileExists(hosts):
-            hosts = open(hosts, 'r').read()
-            self.hosts = json.loads(hosts, object_pairs_hook=OrderedDict)
+        if self.hosts:
             for host in self.hosts:
                 yield host
         
@@ -1968,6 +2310,27 @@ class IPStreamerScreen(Screen):
         for playlist in custom_playlists:
             yield playlist['name']
 
+    def locateLastChannel(self):
+        """(playlist index, channel index) of the last audio channel, None if gone"""
+        prefer = None
+        try:
+            prefer = self.choices[int(config.plugins.IPStreamer.lastidx.value.split(',')[0])]
+        except (ValueError, IndexError):
+            pass
+        hosts = resolveFilename(SCOPE_PLUGINS, "Extensions/IPStreamer/hosts.json")
+        found = getCatalog().locate(hosts, getPlaylistDir(),
+                                    config.plugins.IPStreamer.lastAudioChannel.value,
+                                    config.plugins.IPStreamer.lastAudioName.value, prefer)
+        if found is None or found[0] not in self.choices:
+            return None
+        plIndex = self.choices.index(found[0])
+        lastidx = '{},{}'.format(plIndex, found[1])
+        if config.plugins.IPStreamer.lastidx.value != lastidx:
+            # Update lastidx to new position
+            config.plugins.IPStreamer.lastidx.value = lastidx
+            config.plugins.IPStreamer.lastidx.save()
+        return plIndex, found[1]
+
     def onWindowShow(self):
         self.onShown.remove(self.onWindowShow)
         
@@ -1988,60 +2351,17 @@ class IPStreamerScreen(Screen):
         if config.plugins.IPStreamer.lastAudioChannel.value:
             last_url = config.plugins.IPStreamer.lastAudioChannel.value
             cprint("[IPStreamer] Attempting to restore last audio channel: {}".format(last_url))
-            
-            # First, try to restore from lastidx (playlist + channel index)
-            if config.plugins.IPStreamer.lastidx.value:
-                try:
-                    lastplaylist, lastchannel = map(int, config.plugins.IPStreamer.lastidx.value.split(','))
-                    self.plIndex = lastplaylist
-                    self.changePlaylist()
-                    
-                    # Verify the channel at this index matches the saved URL
-                    if len(self.radioList) > lastchannel:
-                        if self.radioList[lastchannel][1] == last_url:
-                            self['list'].moveToIndex(lastchannel)
-                            cprint("[IPStreamer] Restored to playlist {} channel {}".format(lastplaylist, lastchannel))
-                            restored = True
-                        else:
-                            # Index doesn't match, search for URL
-                            cprint("[IPStreamer] Index mismatch, searching for URL in current playlist")
-                            for idx, channel in enumerate(self.radioList):
-                                if channel[1] == last_url:
-                                    self['list'].moveToIndex(idx)
-                                    cprint("[IPStreamer] Found channel at index {}".format(idx))
-                                    restored = True
-                                    break
-                except Exception as e:
-                    cprint("[IPStreamer] Error restoring from lastidx: {}".format(str(e)))
-            
-            # If not restored yet, search all playlists for the URL
-            if not restored:
-                cprint("[IPStreamer] Searching all playlists for last audio channel")
-                found = False
-                
-                for playlist_idx, playlist_name in enumerate(self.choices):
-                    self.plIndex = playlist_idx
-                    self.changePlaylist()
-                    
-                    # Search in current playlist
-                    for channel_idx, channel in enumerate(self.radioList):
-                        if channel[1] == last_url:
-                            self['list'].moveToIndex(channel_idx)
-                            cprint("[IPStreamer] Found in playlist '{}' at index {}".format(playlist_name, channel_idx))
-                            
-                            # Update lastidx to new position
-                            config.plugins.IPStreamer.lastidx.value = '{},{}'.format(playlist_idx, channel_idx)
-                            config.plugins.IPStreamer.lastidx.save()
-                            
-                            found = True
-                            restored = True
-                            break
-                    
-                    if found:
-                        break
-                
-                if not restored:
-                    cprint("[IPStreamer] Could not find last audio channel, using first available")
+            found = self.locateLastChannel()
+            if found is not None:
+                # One lookup in the channel index, one render of the target category
+                self.plIndex, channel_idx = found
+                self.changePlaylist()
+                if len(self.radioList) > channel_idx:
+                    self['list'].moveToIndex(channel_idx)
+                    cprint("[IPStreamer] Restored to playlist {} channel {}".format(self.plIndex, channel_idx))
+                    restored = True
+            else:
+                cprint("[IPStreamer] Could not find last audio channel, using first available")
         
         # Fallback: If not restored, use first playlist and first channel
         if not restored:
@@ -2139,8 +2459,8 @@ class IPStreamerScreen(Screen):
 
     def callUrl(self, url, callback):
         try:
-            from twisted.web.client import getPage
-            getPage(str.encode(url), headers={b'Content-Type': b'application/x-www-form-urlencoded'}).addCallback(callback).addErrback(self.addErrback)
+            # GitHub raw files; certificates were never checked here
+            fetch_deferred(url, verify=False).addCallback(callback).addErrback(self.addErrback)
         except:
             pass
 
@@ -2259,12 +2579,11 @@ class IPStreamerScreen(Screen):
             if fileExists(playlist_file):
                 playlist = getPlaylist(playlist_file)
                 if playlist:
-                    list = []
-                    for channel in playlist['playlist']:
-                        try:
-                            list.append([str(channel['channel']), str(channel['url'])])
-                        except KeyError:
-                            pass
+                    getVariantSelector().load(playlist['playlist'])
+                    getMirrorTable().load(playlist['playlist'])
+                    # Resolve the stream hosts now, not when OK is pressed
+                    prefetch_hosts([u for ch in playlist['playlist'] for u in getMirrorTable().urls(str(ch.get('url', '')))])
+                    list = getCatalog().channels(playlist_file)
                     
                     if len(list) > 0:
                         self["list"].l.setList(self.iniMenu(list))
@@ -2289,7 +2608,7 @@ class IPStreamerScreen(Screen):
         Build simple list view entries:
         - picon (left)
         - audio name (first line)
-        - EPG event title (second line, if available)
+        - now-playing title of the playing stream, else EPG event title (second line)
         """
         res = []
         gList = []
@@ -2309,8 +2628,10 @@ class IPStreamerScreen(Screen):
             picon_path = getPiconPath(name)
             picon = loadPNG(picon_path) if picon_path else None
 
-            # Find EPG title for this audio name
-            epg_title = findEPGTitleForAudioName(name, ch_events)
+            # Live title of the playing stream, else EPG title for this audio name
+            epg_title = nowPlayingTitle(url) or findEPGTitleForAudioName(name, ch_events)
+            # Dead/slow mark from the last link scan (no network I/O here)
+            label = health_mark(url) + name
 
             # HD vs FHD layout
             if isHD():
@@ -2334,7 +2655,7 @@ class IPStreamerScreen(Screen):
                 res.append(MultiContentEntryText(
                     pos=(50, 2), size=(530, 24), font=0,
                     flags=RT_VALIGN_CENTER | RT_HALIGN_LEFT,
-                    text=name
+                    text=label
                 ))
 
                 # EPG title (second line)
@@ -2364,7 +2685,7 @@ class IPStreamerScreen(Screen):
                 res.append(MultiContentEntryText(
                     pos=(120, 0), size=(420, 60), font=0,
                     flags=RT_VALIGN_CENTER | RT_HALIGN_LEFT,
-                    text=name
+                    text=label
                 ))
 
                 # EPG title (second line)
@@ -2394,17 +2715,20 @@ class IPStreamerScreen(Screen):
         
         # Determine which player to use  
         if config.plugins.IPStreamer.player.value == "gst1.0-ipstreamer":
-            player_check = '/usr/bin/gst-launch-1.0'
+            player_check = resolve_binary('gst-launch-1.0')
+        elif config.plugins.IPStreamer.player.value == "gst1.0-engine":
+            player_check = resolve_binary('python3' if PY3 else 'python') if gst_engine_available() else resolve_binary('gst-launch-1.0')
         else:
-            player_check = '/usr/bin/ffmpeg'
+            player_check = resolve_binary('ffmpeg')
         
-        if fileExists(player_check):
+        if player_check:
             currentAudioTrack = 0
             if long:
                 service = self.session.nav.getCurrentService()
                 if not service.streamed():
                     currentAudioTrack = service.audioTracks().getCurrentTrack()
-                self.url = 'http://127.0.0.1:8001/{}'.format(self.lastservice.toString())
+                # Only the selected audio PID (plus PMT/PCR) when the stream server filters
+                self.url, currentAudioTrack = getE2Streams().url(service, self.lastservice.toString(), currentAudioTrack)
                 config.plugins.IPStreamer.lastplayed.value = "e2_service"
             else:
                 try:
@@ -2416,57 +2740,37 @@ class IPStreamerScreen(Screen):
                     # NEW: Save last audio channel URL
                     config.plugins.IPStreamer.lastAudioChannel.value = self.url
                     config.plugins.IPStreamer.lastAudioChannel.save()
+                    config.plugins.IPStreamer.lastAudioName.value = self.radioList[index][0]
+                    config.plugins.IPStreamer.lastAudioName.save()
                     cprint("[IPStreamer] Saved last audio channel: {}".format(self.url))
                 except (IndexError, KeyError) as e:
                     cprint("[IPStreamer] Error accessing radioList: {}".format(str(e)))
                     self.session.open(MessageBox, _("Error selecting channel."), MessageBox.TYPE_ERROR, timeout=5)
                     return
             
-            if config.plugins.IPStreamer.player.value == "gst1.0-ipstreamer":
-                # GStreamer path via wrapper
-                delaysec = config.plugins.IPStreamer.audioDelay.value
-                vol_level = config.plugins.IPStreamer.volLevel.value
+            if not long:
+                # Quality variant of this channel that the line is known to carry
+                self.url = getVariantSelector().choose(self.url)
 
-                try:
-                    cmd = build_gst_cmd(
-                        url=self.url,
-                        delay_sec=delaysec,
-                        volume_level=vol_level,
-                    )
-                    self.runCmd(cmd)
-                except Exception as e:
-                    cprint("IPStreamer GStreamer build error: {}".format(str(e)))
-                    self.session.open(
-                        MessageBox,
-                        _("Cannot build GStreamer command!\n{}").format(str(e)),
-                        MessageBox.TYPE_ERROR,
-                        timeout=5,
-                    )
-                    return
+            if not long and is_pool_enabled():
+                # Warm pool: switch to an already buffered decoder when possible
+                self.runPool(self.url, neighbour_urls(self.radioList, index))
 
             else:
-                # FFmpeg command with audio delay AND volume
-                delaysec = config.plugins.IPStreamer.audioDelay.value
-                vol_level = config.plugins.IPStreamer.volLevel.value  # 1–100 from config
-                track = currentAudioTrack if currentAudioTrack > 0 else None
-
+                # Direct player, built from the current delay/volume/equalizer settings
                 try:
-                    cmd = build_ffmpeg_cmd(
-                        url=self.url,
-                        delay_sec=delaysec,
-                        volume_level=vol_level,
-                        track_index=track,
-                    )
-                    self.runCmd(cmd)
+                    cmd, control = buildPlayerCmd(self.url, currentAudioTrack)
                 except Exception as e:
-                    cprint("IPStreamer FFmpeg build error: {}".format(str(e)))
+                    cprint("IPStreamer player build error: {}".format(str(e)))
                     self.session.open(
                         MessageBox,
-                        "Cannot build FFmpeg command!\n{}".format(str(e)),
+                        _("Cannot build player command!\n{}").format(str(e)),
                         MessageBox.TYPE_ERROR,
                         timeout=5,
                     )
                     return
+                self.audioTrack = currentAudioTrack
+                self.runCmd(cmd, control)
             # NEW: Check bitrate after starting audio
             # Wait 2 seconds for stream to stabilize, then check bitrate
             self.currentBitrate = None
@@ -2479,21 +2783,19 @@ class IPStreamerScreen(Screen):
         cprint("[IPStreamer] Restoring service")
         self.session.nav.playService(self.lastservice)
 
-    def runCmd(self, cmd):
-        cprint("[IPStreamer] runCmd called with: {}".format(cmd))
-        
-        # Stop any existing process first
+    def stopAudioProcess(self):
+        """Stop the directly launched player, if any"""
+        clear_live_control()
+        if self.playerMonitor:
+            self.playerMonitor.stop()
+            self.playerMonitor = None
         if self.audio_process:
-            try:
-                self.audio_process.terminate()
-                try:
-                    self.audio_process.wait(timeout=1)
-                except:
-                    self.audio_process.kill()
-            except:
-                pass
+            # TERM now, KILL later; the next player need not wait
+            getProcessManager().stop(self.audio_process)
             self.audio_process = None
-        
+
+    def prepareAudioOutput(self):
+        """Free ALSA / DVB audio for the external player"""
         if IPStreamerHandler.container.running():
             IPStreamerHandler.container.kill()
         
@@ -2509,22 +2811,83 @@ class IPStreamerScreen(Screen):
                     except:
                         pass
                     self.session.nav.playService(self.lastservice)
+
+    def runPool(self, url, neighbours):
+        """Play url through the warm decoder pool"""
+        cprint("[IPStreamer] runPool called with: {}".format(url))
+        getSupervisor().stop()
+        self.stopAudioProcess()
+        self.prepareAudioOutput()
+        try:
+            getWarmPool().play(url, neighbours)
+        except Exception as e:
+            cprint("[IPStreamer] ERROR starting warm pool: {}".format(str(e)))
+            trace_error()
+        
+        config.plugins.IPStreamer.running.value = True
+        config.plugins.IPStreamer.running.save()
+        if not self.statusTimer.isActive():
+            self.statusTimer.start(2000)
+
+    def switchVariant(self, url):
+        """Continue the channel on another quality variant"""
+        cprint("[IPStreamer] Switching variant: {}".format(url))
+        self.url = url
+        getVariantSelector().started(url)
+        cmd, control = buildPlayerCmd(self.url, self.audioTrack)
+        self.runCmd(cmd, control)
+
+    def reconnectPlayer(self):
+        """Relaunch the current stream with current settings (stream supervisor)"""
+        cprint("[IPStreamer] Reconnecting: {}".format(self.url))
+        if self.playerMonitor is None or not self.playerMonitor.stats.outTime:
+            # Failed before any audio: cached probe hints may be stale,
+            # and a directly played channel goes on with its next mirror
+            getProbeCache().forget(self.url)
+            getMirrorTable().rotate(self.url)
+            if getE2Streams().isAudioOnly(self.url):
+                # The stream server did not take the PID request: full TS
+                self.url, self.audioTrack = getE2Streams().failed(self.url)
+        else:
+            # Rebuffered: a lower quality variant, if the channel has one
+            lower = getVariantSelector().rebuffered(self.url)
+            if lower:
+                self.url = lower
+                getVariantSelector().started(lower)
+        cmd, control = buildPlayerCmd(self.url, self.audioTrack)
+        self.runCmd(cmd, control, reconnect=True)
+
+    def runCmd(self, cmd, control=None, reconnect=False):
+        cprint("[IPStreamer] runCmd called with: {}".format(cmd))
+        
+        # Stop any existing process first
+        self.audioPaused = False
+        getWarmPool().stop()
+        self.stopAudioProcess()
+        self.prepareAudioOutput()
         
         # Run subprocess exactly like the working plugin
         try:
-            cprint("[IPStreamer] Executing subprocess...")
-            self.audio_process = subprocess.Popen(
-                cmd,
-                shell=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
+            cprint("[IPStreamer] Executing player (no shell)...")
+            self.audio_process = launch(cmd, stdin=subprocess.PIPE if control else None)
             cprint("[IPStreamer] Process started with PID: {}".format(self.audio_process.pid))
+            if control:
+                control.attach(self.audio_process)
+                set_live_control(control)
+            # Drain stdout/stderr through the reactor and collect stream stats
+            self.playerMonitor = PlayerMonitor(
+                self.audio_process,
+                parser_for(cmd),
+                control.handleLine if control else None
+            )
         except Exception as e:
             cprint("[IPStreamer] ERROR starting process: {}".format(str(e)))
             trace_error()
             self.audio_process = None
         
+        # Reconnect on exit/stall; our own reconnects keep the backoff count
+        getSupervisor().watch(self.playerMonitor, self.reconnectPlayer, fresh=not reconnect)
+        
         config.plugins.IPStreamer.running.value = True
         config.plugins.IPStreamer.running.save()
         # Start status monitoring
@@ -2533,31 +2896,135 @@ class IPStreamerScreen(Screen):
 
     def audioDelayUp(self):
         """Increase audio delay by 1 second"""
-        # Safety check
-        if config.plugins.IPStreamer.audioDelay.value is None:
-            config.plugins.IPStreamer.audioDelay.value = 0
-        
-        if config.plugins.IPStreamer.audioDelay.value < 60:  # Max 60 seconds
-            config.plugins.IPStreamer.audioDelay.value += 1  # Add 1 second
-            config.plugins.IPStreamer.audioDelay.save()
-            self['audio_delay'].setText('Audio Delay: {}s'.format(config.plugins.IPStreamer.audioDelay.value))
+        self.stepAudioDelay(1)
 
     def audioDelayDown(self):
         """Decrease audio delay by 1 second"""
-        # Safety check
-        if config.plugins.IPStreamer.audioDelay.value is None:
-            config.plugins.IPStreamer.audioDelay.value = 0
-        
-        if config.plugins.IPStreamer.audioDelay.value > -10:  # Min -10 seconds
-            config.plugins.IPStreamer.audioDelay.value -= 1  # Subtract 1 second
-            config.plugins.IPStreamer.audioDelay.save()
-            self['audio_delay'].setText('Audio Delay: {}s'.format(config.plugins.IPStreamer.audioDelay.value))
+        self.stepAudioDelay(-1)
+
+    def audioDelayFineUp(self):
+        """Increase audio delay by one fine step"""
+        self.stepAudioDelay(DELAY_FINE_STEP)
+
+    def audioDelayFineDown(self):
+        """Decrease audio delay by one fine step"""
+        self.stepAudioDelay(-DELAY_FINE_STEP)
 
     def audioDelayReset(self):
         """Reset audio delay to 0"""
-        config.plugins.IPStreamer.audioDelay.value = 0
-        config.plugins.IPStreamer.audioDelay.save()
+        set_audio_delay(0)
         self['audio_delay'].setText('Audio Delay: 0s')
+        self.applyAudioSettings()
+
+    def healthUpdated(self):
+        """Link scan finished: redraw the list with dead/slow marks"""
+        if self.radioList:
+            index = self['list'].getSelectionIndex()
+            self["list"].l.setList(self.iniMenu(self.radioList))
+            self['list'].moveToIndex(index)
+
+    def stopHealthUpdates(self):
+        getHealthScanner().removeListener(self.healthUpdated)
+
+    def titleChanged(self, url, title):
+        """Stream title changed: redraw the rows (same as after a link scan)"""
+        if url == getattr(self, 'url', None):
+            self.healthUpdated()
+
+    def stopTitleUpdates(self):
+        getRelay().removeTitleListener(self.titleChanged)
+
+    def bindCommentary(self):
+        """Bind the playing stream to the current channel, or remove its binding"""
+        service = self.session.nav.getCurrentlyPlayingServiceReference()
+        if not service:
+            return
+        bound = getCommentaryForChannel(service)
+        url = getattr(self, 'url', None)
+        playing = config.plugins.IPStreamer.running.value and url and not url.startswith('http://127.0.0.1:8001/')
+        if bound and (not playing or bound['url'] == url):
+            saveCommentaryForChannel(service, None)
+            self.session.open(MessageBox, _("Commentary unbound from this channel"), MessageBox.TYPE_INFO, timeout=3)
+        elif playing:
+            name = next((ch[0] for ch in self.radioList if ch[1] == url), '')
+            saveCommentaryForChannel(service, url, name)
+            self.session.open(MessageBox, _("Commentary bound to this channel:\n%s") % (name or url), MessageBox.TYPE_INFO, timeout=3)
+        else:
+            self.session.open(MessageBox, _("Play an IP audio stream first."), MessageBox.TYPE_INFO, timeout=5)
+
+    def calibrateDelay(self):
+        """Measure the IP audio offset against the DVB service audio"""
+        if not self.audio_process or not self.url or self.url.startswith('http://127.0.0.1:8001/'):
+            self.session.open(MessageBox, _("Play an IP audio stream first."), MessageBox.TYPE_INFO, timeout=5)
+            return
+        if self.calibration is not None and self.calibration.running():
+            return
+        service = self.session.nav.getCurrentlyPlayingServiceReference() or self.lastservice
+        if not service:
+            return
+        ts = self.getTimeshift()
+        video = self.currentDelaySeconds if ts is not None and ts.isTimeshiftEnabled() else 0
+        seconds = capture_seconds(get_audio_delay() - video)
+        dvb_url = 'http://127.0.0.1:8001/{}'.format(service.toString())
+        # IP side through the relay, so no second upstream connection
+        ip_url = getRelay().localUrl(self.url, 0)
+        self.calibration = DelayCalibration(boundFunction(self.calibrationDone, service, video))
+        try:
+            self.calibration.start(dvb_url, ip_url, seconds)
+        except Exception as e:
+            cprint("[IPStreamer] ERROR starting delay calibration: {}".format(str(e)))
+            self.calibration = None
+            self.session.open(MessageBox, _("Cannot start delay calibration!"), MessageBox.TYPE_ERROR, timeout=5)
+            return
+        self.session.open(MessageBox, _("Measuring audio delay, this takes about %d seconds...") % seconds, MessageBox.TYPE_INFO, timeout=5)
+
+    def calibrationDone(self, service, video, offset, confidence, error):
+        """Apply a calibration result and store it for the channel"""
+        self.calibration = None
+        if error:
+            self.session.open(MessageBox, _("Delay calibration failed:\n%s") % error, MessageBox.TYPE_ERROR, timeout=8)
+            return
+        audio, new_video = suggest_delays(offset, video)
+        set_audio_delay(audio)
+        saveAudioDelayForChannel(service, get_audio_delay())
+        self['audio_delay'].setText('Audio Delay: {}'.format(format_audio_delay(get_audio_delay())))
+        self.applyAudioSettings()
+        text = _("Measured offset: %+.2fs\nAudio delay set to %s") % (offset, format_audio_delay(get_audio_delay()))
+        if new_video != video:
+            # IP audio runs behind the picture: the video has to wait
+            config.plugins.IPStreamer.tsDelay.value = new_video
+            config.plugins.IPStreamer.tsDelay.save()
+            self['sync'].setText('Video Delay: {}s'.format(new_video))
+            saveVideoDelayForChannel(service, new_video)
+            text += "\n" + _("Video delay set to %ds, press PAUSE to apply") % new_video
+        self.session.open(MessageBox, text, MessageBox.TYPE_INFO, timeout=8)
+
+    def cancelCalibration(self):
+        if self.calibration is not None:
+            self.calibration.cancel()
+            self.calibration = None
+
+    def stepAudioDelay(self, step):
+        """Move audio delay by step seconds (-10s to 60s)"""
+        set_audio_delay(get_audio_delay() + step)
+        self['audio_delay'].setText('Audio Delay: {}'.format(format_audio_delay(get_audio_delay())))
+        self.applyAudioSettings()
+
+    def applyAudioSettings(self):
+        """Apply audio settings live, else restart the player from the relay buffer"""
+        if apply_live_settings():
+            return
+        if self.audio_process and getRelay().session(self.url) is not None:
+            # No reconnect: the new player reads from the relay ring.
+            # Let repeated key presses settle first.
+            self.applyTimer.start(500, True)
+
+    def restartPlayer(self):
+        """Relaunch the running player with current settings"""
+        if not self.audio_process:
+            return
+        cmd, control = buildPlayerCmd(self.url, self.audioTrack)
+        self.runCmd(cmd, control)
 
     def resetAudio(self):
         cprint("[IPStreamer] resetAudio called")
@@ -2570,34 +3037,21 @@ class IPStreamerScreen(Screen):
             self.bitrateCheckTimer.stop()
         
         self.currentBitrate = None  # Clear bitrate        
-        # Kill audio process if running - aggressive approach
+        # Stop warm pool decoders and sink
+        getWarmPool().stop()
+        getSupervisor().stop()
+        getRelay().stopAll()
+        self.audioPaused = False
+        clear_live_control()
+        if self.playerMonitor:
+            self.playerMonitor.stop()
+            self.playerMonitor = None
+        # Stop the player's process group (TERM, KILL after a grace period)
         if self.audio_process:
-            try:
-                cprint("[IPStreamer] Terminating process PID: {}".format(self.audio_process.pid))
-                # Send SIGTERM first
-                self.audio_process.terminate()
-                try:
-                    self.audio_process.wait(timeout=1)
-                    cprint("[IPStreamer] Process terminated gracefully")
-                except subprocess.TimeoutExpired:
-                    # Force kill if still running
-                    cprint("[IPStreamer] Process not responding, force killing")
-                    self.audio_process.kill()
-                    self.audio_process.wait(timeout=1)
-                    cprint("[IPStreamer] Process force killed")
-                self.audio_process = None
-            except Exception as e:
-                cprint("[IPStreamer] Error killing process: {}".format(str(e)))
-                # Force kill using OS command as fallback
-                try:
-                    os.system("killall -9 gst-launch-1.0 ffmpeg 2>/dev/null")
-                except:
-                    pass
-                self.audio_process = None
-        else:
-            # No process tracked, try to kill any running instances
-            cprint("[IPStreamer] No process tracked, killing all gst-launch and ffmpeg")
-            os.system("killall -9 gst-launch-1.0 ffmpeg 2>/dev/null")
+            getProcessManager().stop(self.audio_process)
+            self.audio_process = None
+        # Anything else we launched that is still around
+        getProcessManager().stopAll()
         
         # Kill container processes
         if IPStreamerHandler.container.running():
@@ -2706,9 +3160,14 @@ class IPStreamerScreenGrid(Screen):
         config.plugins.IPStreamer.tsDelay.value = loaded_delay
         self['sync'].setText('Video Delay: {}s'.format(config.plugins.IPStreamer.tsDelay.value))
         
+        # Calibrated audio delay for this channel, if any
+        saved_audio = getAudioDelayForChannel(self.session.nav.getCurrentlyPlayingServiceReference())
+        if saved_audio is not None:
+            set_audio_delay(saved_audio)
         self['audio_delay'] = Label()
-        self['audio_delay'].setText('Audio Delay: {}s'.format(config.plugins.IPStreamer.audioDelay.value))
+        self['audio_delay'].setText('Audio Delay: {}'.format(format_audio_delay(get_audio_delay())))
         self['network_status'] = Label()
+        self.listDownload = None  # provider list download in progress
         self['network_status'].setText('')
         self['countdown'] = Label()
         self['countdown'].setText('')
@@ -2765,6 +3224,10 @@ class IPStreamerScreenGrid(Screen):
             "audioDelayDown": self.audioDelayDown,
             "audioDelayReset": self.audioDelayReset,
             "audioDelayUp": self.audioDelayUp,
+            "audioDelayFineDown": self.audioDelayFineDown,
+            "audioDelayFineUp": self.audioDelayFineUp,
+            "calibrateDelay": self.calibrateDelay,
+            "bindCommentary": self.bindCommentary,
             "clearVideoDelay": self.clearVideoDelay,
             "nextBouquet": self.nextPlaylist,
             "prevBouquet": self.prevPlaylist,
@@ -2775,6 +3238,17 @@ class IPStreamerScreenGrid(Screen):
         self.alsa = None
         self.audioPaused = False
         self.audio_process = None
+        self.playerMonitor = None
+        self.audioTrack = 0
+        self.calibration = None
+        self.onClose.append(self.cancelCalibration)
+        # Mark dead/slow links once a background scan finishes
+        getHealthScanner().addListener(self.healthUpdated)
+        self.onClose.append(self.stopHealthUpdates)
+        startHealthScan()
+        # Now-playing title from the stream's ICY metadata
+        getRelay().addTitleListener(self.titleChanged)
+        self.onClose.append(self.stopTitleUpdates)
         self.radioList = []
         self.currentDelaySeconds = 0
         self.targetDelaySeconds = 0
@@ -2792,17 +3266,20 @@ class IPStreamerScreenGrid(Screen):
         # Initialize timers (same as list view)
         self.timeShiftTimer = eTimer()
         self.statusTimer = eTimer()
+        self.applyTimer = eTimer()
         self.countdownTimer = eTimer()
         self.bitrateCheckTimer = eTimer()
         
         try:
             self.timeShiftTimer.callback.append(self.unpauseService)
             self.statusTimer.callback.append(self.checkNetworkStatus)
+            self.applyTimer.callback.append(self.restartPlayer)
             self.countdownTimer.callback.append(self.updateCountdown)
             self.bitrateCheckTimer.callback.append(self.checkAudioBitrate)
         except:
             self.timeShiftTimer_conn = self.timeShiftTimer.timeout.connect(self.unpauseService)
             self.statusTimer_conn = self.statusTimer.timeout.connect(self.checkNetworkStatus)
+            self.applyTimer_conn = self.applyTimer.timeout.connect(self.restartPlayer)
             self.countdownTimer_conn = self.countdownTimer.timeout.connect(self.updateCountdown)
             self.bitrateCheckTimer_conn = self.bitrateCheckTimer.timeout.connect(self.checkAudioBitrate)
         
@@ -2837,8 +3314,8 @@ class IPStreamerScreenGrid(Screen):
                 channel_name = current[0]
                 self['channelname'].setText(channel_name)
                 
-                # FIXED EPG using grid's working method
-                epg_text = self.getEPGForChannel(channel_name)
+                # FIXED EPG using grid's working method; the live stream title wins
+                epg_text = nowPlayingTitle(current[1]) or self.getEPGForChannel(channel_name)
                 self['epginfo'].setText(epg_text)
                 print(f"[DEBUG] {channel_name} -> EPG: {epg_text}")
             else:
@@ -2904,8 +3381,7 @@ class IPStreamerScreenGrid(Screen):
         
         try:
             # Download tar.gz to /tmp/
-            import urllib.request
-            urllib.request.urlretrieve(download_url, tmp_file)
+            fetch_to_file(download_url, tmp_file)
             
             # Ensure target directory exists
             if not os.path.exists(target_path):
@@ -2995,81 +3471,45 @@ class IPStreamerScreenGrid(Screen):
                 )
                 return
 
-        last_error = None
-        m3u_text = None
-
-        for url, fmt in m3u_urls:
-            cprint("[IPStreamer] Trying %s URL (%s): %s" % (provider, fmt, url))
-            try:
-                m3u_text = simpleDownloadM3U(url)
-                cprint("[IPStreamer] %s M3U download OK using %s" % (provider, fmt))
-                break
-            except Exception as e:
-                last_error = str(e)
-                cprint("[IPStreamer] %s M3U download failed (%s): %s" % (provider, fmt, last_error))
-                m3u_text = None
-
-        if not m3u_text:
-            self.session.open(
-                MessageBox,
-                _("Download failed.\nLast error:\n%s") % (last_error or _("Unknown error")),
-                MessageBox.TYPE_ERROR, timeout=5
-            )
+        if self.listDownload is not None:
+            self.session.open(MessageBox, _("A list download is already running."), MessageBox.TYPE_INFO, timeout=5)
             return
 
-        # Rest of your code unchanged
-        json_data, count = self.m3uToIPStreamerJson(m3u_text, base_name)
-        if count == 0:
-            self.session.open(
-                MessageBox,
-                _("No channels found in downloaded list."),
-                MessageBox.TYPE_INFO, timeout=5
-            )
-            return
+        # Off the UI thread; progress and result come back through the reactor
+        self['network_status'].setText(_("Downloading %s list...") % choice[0])
+        progress = lambda received, total: reactor.callFromThread(self.listProgress, choice[0], received, total)
+        self.listDownload = deferToThread(downloadProviderList, provider, username, base_name,
+                                          m3u_urls, self.applyProviderRenames, progress)
+        self.listDownload.addCallbacks(self.listDownloaded, self.listDownloadFailed, callbackArgs=(choice[0],))
 
-        json_data = self.applyProviderRenames(json_data, base_name)
-        out_dir = config.plugins.IPStreamer.settingsPath.value
-        try:
-            if not os.path.exists(out_dir):
-                os.makedirs(out_dir)
-            out_path = os.path.join(out_dir, "ipstreamer_%s.json" % base_name)
-            with open(out_path, "w") as f:
-                json.dump(json_data, f, indent=4)
-        except Exception as e:
-            self.session.open(
-                MessageBox,
-                _("Save failed:\n%s") % str(e),
-                MessageBox.TYPE_ERROR, timeout=5
-            )
+    def listProgress(self, name, received, total):
+        if self.listDownload is None:
             return
+        if total:
+            text = _("Downloading %s list: %.1f MB (%d%%)") % (name, received / 1048576.0, received * 100 // total)
+        else:
+            text = _("Downloading %s list: %.1f MB") % (name, received / 1048576.0)
+        self['network_status'].setText(text)
 
-        msg = _("Download and conversion successful!\n\n"
-                "Provider: %s\n"
-                "Channels: %d\n"
-                "Saved to:\n%s") % (choice[0], count, out_path)
+    def listDownloaded(self, result, name):
+        self.listDownload = None
+        self['network_status'].setText('')
+        count, out_path, fmt = result
+        if count is None:
+            msg = _("List unchanged since the last download.\n\n"
+                    "Provider: %s\n"
+                    "Kept:\n%s") % (name, out_path)
+        else:
+            msg = _("Download and conversion successful!\n\n"
+                    "Provider: %s\n"
+                    "Channels: %d\n"
+                    "Saved to:\n%s") % (name, count, out_path)
         self.session.open(MessageBox, msg, MessageBox.TYPE_INFO, timeout=7)
 
-    def m3uToIPStreamerJson(self, m3u_text, base_name):
-        lines = m3u_text.splitlines()
-        playlist = []
-        last_name = None
-
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith("#EXTM3U"):
-                continue
-            if line.startswith("#EXTINF"):
-                parts = line.split(",", 1)
-                if len(parts) == 2:
-                    last_name = parts[1].strip()
-            elif line.startswith("http://") or line.startswith("https://"):
-                url = line
-                if not last_name:
-                    continue
-                playlist.append({"channel": last_name, "url": url})
-                last_name = None
-
-        return {"playlist": playlist}, len(playlist)
+    def listDownloadFailed(self, failure):
+        self.listDownload = None
+        self['network_status'].setText('')
+        self.session.open(MessageBox, failure.getErrorMessage(), MessageBox.TYPE_ERROR, timeout=5)
 
     def applyProviderRenames(self, json_data, base_name):
         """
@@ -3151,6 +3591,10 @@ class IPStreamerScreenGrid(Screen):
         if config.plugins.IPStreamer.lastidx.value:
             try:
                 lastplaylist, lastchannel = map(int, config.plugins.IPStreamer.lastidx.value.split(','))
+                # Follow the last channel if its list was edited since
+                found = self.locateLastChannel() if config.plugins.IPStreamer.lastAudioChannel.value else None
+                if found is not None:
+                    lastplaylist, lastchannel = found
                 self.plIndex = lastplaylist
                 self.changePlaylist()
                 self.index = lastchannel
@@ -3214,10 +3658,10 @@ class IPStreamerScreenGrid(Screen):
             if item_idx < end_idx:
                 # Channel name
                 channel_name = str(self.radioList[item_idx][0])
-                label_widget.setText(channel_name)
+                label_widget.setText(health_mark(self.radioList[item_idx][1]) + channel_name)
 
-                # EPG title using same helper as simple list
-                epg_title = findEPGTitleForAudioName(channel_name, ch_events)
+                # Live stream title, else EPG title using same helper as simple list
+                epg_title = nowPlayingTitle(self.radioList[item_idx][1]) or findEPGTitleForAudioName(channel_name, ch_events)
                 if event_widget is not None:
                     event_widget.setText(epg_title or '')
 
@@ -3388,11 +3832,9 @@ class IPStreamerScreenGrid(Screen):
     def getHosts(self):
         """Get all available playlists including custom categories"""
         hosts = resolveFilename(SCOPE_PLUGINS, "Extensions/IPStreamer/hosts.json")
-        self.hosts = None
+        self.hosts = getCatalog().hosts(hosts)
         
-        if fileExists(hosts):
-            hosts = open(hosts, 'r').read()
-            self.hosts = json.loads(hosts, object_pairs_hook=OrderedDict)
+        if self.hosts:
             for host in self.hosts:
                 yield host
         
@@ -3400,6 +3842,27 @@ class IPStreamerScreenGrid(Screen):
         custom_playlists = getPlaylistFiles()
         for playlist in custom_playlists:
             yield playlist['name']
+
+    def locateLastChannel(self):
+        """(playlist index, channel index) of the last audio channel, None if gone"""
+        prefer = None
+        try:
+            prefer = self.choices[int(config.plugins.IPStreamer.lastidx.value.split(',')[0])]
+        except (ValueError, IndexError):
+            pass
+        hosts = resolveFilename(SCOPE_PLUGINS, "Extensions/IPStreamer/hosts.json")
+        found = getCatalog().locate(hosts, getPlaylistDir(),
+                                    config.plugins.IPStreamer.lastAudioChannel.value,
+                                    config.plugins.IPStreamer.lastAudioName.value, prefer)
+        if found is None or found[0] not in self.choices:
+            return None
+        plIndex = self.choices.index(found[0])
+        lastidx = '{},{}'.format(plIndex, found[1])
+        if config.plugins.IPStreamer.lastidx.value != lastidx:
+            # Update lastidx to new position
+            config.plugins.IPStreamer.lastidx.value = lastidx
+            config.plugins.IPStreamer.lastidx.save()
+        return plIndex, found[1]
     
     def setPlaylist(self):
         """Load and display playlist"""
@@ -3431,12 +3894,11 @@ class IPStreamerScreenGrid(Screen):
             if fileExists(playlist_file):
                 playlist = getPlaylist(playlist_file)
                 if playlist:
-                    list = []
-                    for channel in playlist['playlist']:
-                        try:
-                            list.append([str(channel['channel']), str(channel['url'])])
-                        except KeyError:
-                            pass
+                    getVariantSelector().load(playlist['playlist'])
+                    getMirrorTable().load(playlist['playlist'])
+                    # Resolve the stream hosts now, not when OK is pressed
+                    prefetch_hosts([u for ch in playlist['playlist'] for u in getMirrorTable().urls(str(ch.get('url', '')))])
+                    list = getCatalog().channels(playlist_file)
                     
                     if len(list) > 0:
                         self.radioList = list
@@ -3475,17 +3937,20 @@ class IPStreamerScreenGrid(Screen):
         
         # Determine which player to use
         if config.plugins.IPStreamer.player.value == "gst1.0-ipstreamer":
-            player_check = '/usr/bin/gst-launch-1.0'
+            player_check = resolve_binary('gst-launch-1.0')
+        elif config.plugins.IPStreamer.player.value == "gst1.0-engine":
+            player_check = resolve_binary('python3' if PY3 else 'python') if gst_engine_available() else resolve_binary('gst-launch-1.0')
         else:
-            player_check = '/usr/bin/ffmpeg'
+            player_check = resolve_binary('ffmpeg')
         
-        if fileExists(player_check):
+        if player_check:
             currentAudioTrack = 0
             if long:
                 service = self.session.nav.getCurrentService()
                 if not service.streamed():
                     currentAudioTrack = service.audioTracks().getCurrentTrack()
-                self.url = 'http://127.0.0.1:8001/{}'.format(self.lastservice.toString())
+                # Only the selected audio PID (plus PMT/PCR) when the stream server filters
+                self.url, currentAudioTrack = getE2Streams().url(service, self.lastservice.toString(), currentAudioTrack)
                 config.plugins.IPStreamer.lastplayed.value = "e2_service"
             else:
                 try:
@@ -3497,57 +3962,37 @@ class IPStreamerScreenGrid(Screen):
                     # Save last audio channel
                     config.plugins.IPStreamer.lastAudioChannel.value = self.url
                     config.plugins.IPStreamer.lastAudioChannel.save()
+                    config.plugins.IPStreamer.lastAudioName.value = self.radioList[self.index][0]
+                    config.plugins.IPStreamer.lastAudioName.save()
                     cprint("[IPStreamer] Saved last audio channel: {}".format(self.url))
                 except (IndexError, KeyError) as e:
                     cprint("[IPStreamer] Error accessing radioList: {}".format(str(e)))
                     self.session.open(MessageBox, _("Error selecting channel."), MessageBox.TYPE_ERROR, timeout=5)
                     return
             
-            if config.plugins.IPStreamer.player.value == "gst1.0-ipstreamer":
-                # GStreamer path via wrapper
-                delaysec = config.plugins.IPStreamer.audioDelay.value
-                vol_level = config.plugins.IPStreamer.volLevel.value
+            if not long:
+                # Quality variant of this channel that the line is known to carry
+                self.url = getVariantSelector().choose(self.url)
 
-                try:
-                    cmd = build_gst_cmd(
-                        url=self.url,
-                        delay_sec=delaysec,
-                        volume_level=vol_level,
-                    )
-                    self.runCmd(cmd)
-                except Exception as e:
-                    cprint("IPStreamer GStreamer build error: {}".format(str(e)))
-                    self.session.open(
-                        MessageBox,
-                        _("Cannot build GStreamer command!\n{}").format(str(e)),
-                        MessageBox.TYPE_ERROR,
-                        timeout=5,
-                    )
-                    return
+            if not long and is_pool_enabled():
+                # Warm pool: switch to an already buffered decoder when possible
+                self.runPool(self.url, neighbour_urls(self.radioList, self.index))
 
             else:
-                # FFmpeg command with audio delay AND volume
-                delaysec = config.plugins.IPStreamer.audioDelay.value
-                vol_level = config.plugins.IPStreamer.volLevel.value  # 1–100 from config
-                track = currentAudioTrack if currentAudioTrack > 0 else None
-
+                # Direct player, built from the current delay/volume/equalizer settings
                 try:
-                    cmd = build_ffmpeg_cmd(
-                        url=self.url,
-                        delay_sec=delaysec,
-                        volume_level=vol_level,
-                        track_index=track,
-                    )
-                    self.runCmd(cmd)
+                    cmd, control = buildPlayerCmd(self.url, currentAudioTrack)
                 except Exception as e:
-                    cprint("IPStreamer FFmpeg build error: {}".format(str(e)))
+                    cprint("IPStreamer player build error: {}".format(str(e)))
                     self.session.open(
                         MessageBox,
-                        "Cannot build FFmpeg command!\n{}".format(str(e)),
+                        _("Cannot build player command!\n{}").format(str(e)),
                         MessageBox.TYPE_ERROR,
                         timeout=5,
                     )
                     return
+                self.audioTrack = currentAudioTrack
+                self.runCmd(cmd, control)
             # NEW: Check bitrate after starting audio
             # Wait 2 seconds for stream to stabilize, then check bitrate
             self.currentBitrate = None
@@ -3658,32 +4103,135 @@ class IPStreamerScreenGrid(Screen):
     
     def audioDelayUp(self):
         """Increase audio delay by 1 second"""
-        # Safety check
-        if config.plugins.IPStreamer.audioDelay.value is None:
-            config.plugins.IPStreamer.audioDelay.value = 0
-        
-        if config.plugins.IPStreamer.audioDelay.value < 60:  # Max 60 seconds
-            config.plugins.IPStreamer.audioDelay.value += 1  # Add 1 second
-            config.plugins.IPStreamer.audioDelay.save()
-            self['audio_delay'].setText('Audio Delay: {}s'.format(config.plugins.IPStreamer.audioDelay.value))
-    
+        self.stepAudioDelay(1)
+
     def audioDelayDown(self):
         """Decrease audio delay by 1 second"""
-        # Safety check
-        if config.plugins.IPStreamer.audioDelay.value is None:
-            config.plugins.IPStreamer.audioDelay.value = 0
-        
-        if config.plugins.IPStreamer.audioDelay.value > -10:  # Min -10 seconds
-            config.plugins.IPStreamer.audioDelay.value -= 1  # Subtract 1 second
-            config.plugins.IPStreamer.audioDelay.save()
-            self['audio_delay'].setText('Audio Delay: {}s'.format(config.plugins.IPStreamer.audioDelay.value))
-    
+        self.stepAudioDelay(-1)
+
+    def audioDelayFineUp(self):
+        """Increase audio delay by one fine step"""
+        self.stepAudioDelay(DELAY_FINE_STEP)
+
+    def audioDelayFineDown(self):
+        """Decrease audio delay by one fine step"""
+        self.stepAudioDelay(-DELAY_FINE_STEP)
+
     def audioDelayReset(self):
         """Reset audio delay to 0"""
-        config.plugins.IPStreamer.audioDelay.value = 0
-        config.plugins.IPStreamer.audioDelay.save()
+        set_audio_delay(0)
         self['audio_delay'].setText('Audio Delay: 0s')
-    
+        self.applyAudioSettings()
+
+    def healthUpdated(self):
+        """Link scan finished: redraw the page with dead/slow marks"""
+        if self.radioList:
+            self.updateGrid()
+            self.updateChannelInfo()
+
+    def stopHealthUpdates(self):
+        getHealthScanner().removeListener(self.healthUpdated)
+
+    def titleChanged(self, url, title):
+        """Stream title changed: redraw the rows (same as after a link scan)"""
+        if url == getattr(self, 'url', None):
+            self.healthUpdated()
+
+    def stopTitleUpdates(self):
+        getRelay().removeTitleListener(self.titleChanged)
+
+    def bindCommentary(self):
+        """Bind the playing stream to the current channel, or remove its binding"""
+        service = self.session.nav.getCurrentlyPlayingServiceReference()
+        if not service:
+            return
+        bound = getCommentaryForChannel(service)
+        url = getattr(self, 'url', None)
+        playing = config.plugins.IPStreamer.running.value and url and not url.startswith('http://127.0.0.1:8001/')
+        if bound and (not playing or bound['url'] == url):
+            saveCommentaryForChannel(service, None)
+            self.session.open(MessageBox, _("Commentary unbound from this channel"), MessageBox.TYPE_INFO, timeout=3)
+        elif playing:
+            name = next((ch[0] for ch in self.radioList if ch[1] == url), '')
+            saveCommentaryForChannel(service, url, name)
+            self.session.open(MessageBox, _("Commentary bound to this channel:\n%s") % (name or url), MessageBox.TYPE_INFO, timeout=3)
+        else:
+            self.session.open(MessageBox, _("Play an IP audio stream first."), MessageBox.TYPE_INFO, timeout=5)
+
+    def calibrateDelay(self):
+        """Measure the IP audio offset against the DVB service audio"""
+        if not self.audio_process or not self.url or self.url.startswith('http://127.0.0.1:8001/'):
+            self.session.open(MessageBox, _("Play an IP audio stream first."), MessageBox.TYPE_INFO, timeout=5)
+            return
+        if self.calibration is not None and self.calibration.running():
+            return
+        service = self.session.nav.getCurrentlyPlayingServiceReference() or self.lastservice
+        if not service:
+            return
+        ts = self.getTimeshift()
+        video = self.currentDelaySeconds if ts is not None and ts.isTimeshiftEnabled() else 0
+        seconds = capture_seconds(get_audio_delay() - video)
+        dvb_url = 'http://127.0.0.1:8001/{}'.format(service.toString())
+        # IP side through the relay, so no second upstream connection
+        ip_url = getRelay().localUrl(self.url, 0)
+        self.calibration = DelayCalibration(boundFunction(self.calibrationDone, service, video))
+        try:
+            self.calibration.start(dvb_url, ip_url, seconds)
+        except Exception as e:
+            cprint("[IPStreamer] ERROR starting delay calibration: {}".format(str(e)))
+            self.calibration = None
+            self.session.open(MessageBox, _("Cannot start delay calibration!"), MessageBox.TYPE_ERROR, timeout=5)
+            return
+        self.session.open(MessageBox, _("Measuring audio delay, this takes about %d seconds...") % seconds, MessageBox.TYPE_INFO, timeout=5)
+
+    def calibrationDone(self, service, video, offset, confidence, error):
+        """Apply a calibration result and store it for the channel"""
+        self.calibration = None
+        if error:
+            self.session.open(MessageBox, _("Delay calibration failed:\n%s") % error, MessageBox.TYPE_ERROR, timeout=8)
+            return
+        audio, new_video = suggest_delays(offset, video)
+        set_audio_delay(audio)
+        saveAudioDelayForChannel(service, get_audio_delay())
+        self['audio_delay'].setText('Audio Delay: {}'.format(format_audio_delay(get_audio_delay())))
+        self.applyAudioSettings()
+        text = _("Measured offset: %+.2fs\nAudio delay set to %s") % (offset, format_audio_delay(get_audio_delay()))
+        if new_video != video:
+            # IP audio runs behind the picture: the video has to wait
+            config.plugins.IPStreamer.tsDelay.value = new_video
+            config.plugins.IPStreamer.tsDelay.save()
+            self['sync'].setText('Video Delay: {}s'.format(new_video))
+            saveVideoDelayForChannel(service, new_video)
+            text += "\n" + _("Video delay set to %ds, press PAUSE to apply") % new_video
+        self.session.open(MessageBox, text, MessageBox.TYPE_INFO, timeout=8)
+
+    def cancelCalibration(self):
+        if self.calibration is not None:
+            self.calibration.cancel()
+            self.calibration = None
+
+    def stepAudioDelay(self, step):
+        """Move audio delay by step seconds (-10s to 60s)"""
+        set_audio_delay(get_audio_delay() + step)
+        self['audio_delay'].setText('Audio Delay: {}'.format(format_audio_delay(get_audio_delay())))
+        self.applyAudioSettings()
+
+    def applyAudioSettings(self):
+        """Apply audio settings live, else restart the player from the relay buffer"""
+        if apply_live_settings():
+            return
+        if self.audio_process and getRelay().session(self.url) is not None:
+            # No reconnect: the new player reads from the relay ring.
+            # Let repeated key presses settle first.
+            self.applyTimer.start(500, True)
+
+    def restartPlayer(self):
+        """Relaunch the running player with current settings"""
+        if not self.audio_process:
+            return
+        cmd, control = buildPlayerCmd(self.url, self.audioTrack)
+        self.runCmd(cmd, control)
+
     def resetAudio(self):
         cprint("[IPStreamer] resetAudio called")
         
@@ -3695,34 +4243,21 @@ class IPStreamerScreenGrid(Screen):
             self.bitrateCheckTimer.stop()
         
         self.currentBitrate = None  # Clear bitrate        
-        # Kill audio process if running - aggressive approach
+        # Stop warm pool decoders and sink
+        getWarmPool().stop()
+        getSupervisor().stop()
+        getRelay().stopAll()
+        self.audioPaused = False
+        clear_live_control()
+        if self.playerMonitor:
+            self.playerMonitor.stop()
+            self.playerMonitor = None
+        # Stop the player's process group (TERM, KILL after a grace period)
         if self.audio_process:
-            try:
-                cprint("[IPStreamer] Terminating process PID: {}".format(self.audio_process.pid))
-                # Send SIGTERM first
-                self.audio_process.terminate()
-                try:
-                    self.audio_process.wait(timeout=1)
-                    cprint("[IPStreamer] Process terminated gracefully")
-                except subprocess.TimeoutExpired:
-                    # Force kill if still running
-                    cprint("[IPStreamer] Process not responding, force killing")
-                    self.audio_process.kill()
-                    self.audio_process.wait(timeout=1)
-                    cprint("[IPStreamer] Process force killed")
-                self.audio_process = None
-            except Exception as e:
-                cprint("[IPStreamer] Error killing process: {}".format(str(e)))
-                # Force kill using OS command as fallback
-                try:
-                    os.system("killall -9 gst-launch-1.0 ffmpeg 2>/dev/null")
-                except:
-                    pass
-                self.audio_process = None
-        else:
-            # No process tracked, try to kill any running instances
-            cprint("[IPStreamer] No process tracked, killing all gst-launch and ffmpeg")
-            os.system("killall -9 gst-launch-1.0 ffmpeg 2>/dev/null")
+            getProcessManager().stop(self.audio_process)
+            self.audio_process = None
+        # Anything else we launched that is still around
+        getProcessManager().stopAll()
         
         # Kill container processes
         if IPStreamerHandler.container.running():
@@ -3762,21 +4297,19 @@ class IPStreamerScreenGrid(Screen):
         config.plugins.IPStreamer.running.value = False
         config.plugins.IPStreamer.running.save()
     
-    def runCmd(self, cmd):
-        """Execute audio command"""
-        cprint("[IPStreamer] runCmd called with: {}".format(cmd))
-        
+    def stopAudioProcess(self):
+        """Stop the directly launched player, if any"""
+        clear_live_control()
+        if self.playerMonitor:
+            self.playerMonitor.stop()
+            self.playerMonitor = None
         if self.audio_process:
-            try:
-                self.audio_process.terminate()
-                try:
-                    self.audio_process.wait(timeout=1)
-                except:
-                    self.audio_process.kill()
-            except:
-                pass
+            # TERM now, KILL later; the next player need not wait
+            getProcessManager().stop(self.audio_process)
             self.audio_process = None
-        
+
+    def prepareAudioOutput(self):
+        """Free ALSA / DVB audio for the external player"""
         if IPStreamerHandler.container.running():
             IPStreamerHandler.container.kill()
         
@@ -3792,19 +4325,77 @@ class IPStreamerScreenGrid(Screen):
                     except:
                         pass
                     self.session.nav.playService(self.lastservice)
+
+    def runPool(self, url, neighbours):
+        """Play url through the warm decoder pool"""
+        cprint("[IPStreamer] runPool called with: {}".format(url))
+        getSupervisor().stop()
+        self.stopAudioProcess()
+        self.prepareAudioOutput()
+        try:
+            getWarmPool().play(url, neighbours)
+        except Exception as e:
+            cprint("[IPStreamer] ERROR starting warm pool: {}".format(str(e)))
+        
+        config.plugins.IPStreamer.running.value = True
+        config.plugins.IPStreamer.running.save()
+        if not self.statusTimer.isActive():
+            self.statusTimer.start(2000)
+
+    def switchVariant(self, url):
+        """Continue the channel on another quality variant"""
+        cprint("[IPStreamer] Switching variant: {}".format(url))
+        self.url = url
+        getVariantSelector().started(url)
+        cmd, control = buildPlayerCmd(self.url, self.audioTrack)
+        self.runCmd(cmd, control)
+
+    def reconnectPlayer(self):
+        """Relaunch the current stream with current settings (stream supervisor)"""
+        if self.playerMonitor is None or not self.playerMonitor.stats.outTime:
+            # Failed before any audio: cached probe hints may be stale,
+            # and a directly played channel goes on with its next mirror
+            getProbeCache().forget(self.url)
+            getMirrorTable().rotate(self.url)
+            if getE2Streams().isAudioOnly(self.url):
+                # The stream server did not take the PID request: full TS
+                self.url, self.audioTrack = getE2Streams().failed(self.url)
+        else:
+            # Rebuffered: a lower quality variant, if the channel has one
+            lower = getVariantSelector().rebuffered(self.url)
+            if lower:
+                self.url = lower
+                getVariantSelector().started(lower)
+        cmd, control = buildPlayerCmd(self.url, self.audioTrack)
+        self.runCmd(cmd, control, reconnect=True)
+
+    def runCmd(self, cmd, control=None, reconnect=False):
+        """Execute audio command, optionally with a live control on its stdin"""
+        cprint("[IPStreamer] runCmd called with: {}".format(cmd))
+        
+        self.audioPaused = False
+        getWarmPool().stop()
+        self.stopAudioProcess()
+        self.prepareAudioOutput()
         
         try:
-            self.audio_process = subprocess.Popen(
-                cmd,
-                shell=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
+            self.audio_process = launch(cmd, stdin=subprocess.PIPE if control else None)
             cprint("[IPStreamer] Process started with PID: {}".format(self.audio_process.pid))
+            if control:
+                control.attach(self.audio_process)
+                set_live_control(control)
+            # Drain stdout/stderr through the reactor and collect stream stats
+            self.playerMonitor = PlayerMonitor(
+                self.audio_process,
+                parser_for(cmd),
+                control.handleLine if control else None
+            )
         except Exception as e:
             cprint("[IPStreamer] ERROR starting process: {}".format(str(e)))
             self.audio_process = None
         
+        getSupervisor().watch(self.playerMonitor, self.reconnectPlayer, fresh=not reconnect)
+        
         config.plugins.IPStreamer.running.value = True
         config.plugins.IPStreamer.running.save()
         
@@ -3813,35 +4404,96 @@ class IPStreamerScreenGrid(Screen):
     
     def checkNetworkStatus(self):
         """Check if audio stream is still playing with bitrate info"""
+        if self.audioPaused:
+            # Paused into the relay buffer; nothing is playing
+            self['network_status'].setText(pause_status_text(self.url))
+            return
+        reconnecting = getSupervisor().statusText()
+        if reconnecting:
+            # Supervisor is between attempts (or waiting for the network)
+            self['network_status'].setText(reconnecting)
+            return
         if self.audio_process:
             if self.audio_process.poll() is None:
-                if self.currentBitrate is not None:
+                stats = self.playerMonitor.sample() if self.playerMonitor else None
+                status = stats.statusText() if stats else ''
+                if getRelay().caughtUp(self.url):
+                    # Back at live: normal tempo again
+                    self.restartPlayer()
+                    return
+                if stats and stats.outTime:
+                    # Playing: keep its format for a faster probe next time
+                    getProbeCache().remember(self.url, stats)
+                    getE2Streams().check(self.url, stats)
+                    if stats.silent:
+                        # Silent for a while: the next mirror, if the channel has one
+                        stats.silent = False
+                        if not getRelay().failover(self.url, "silent") and getMirrorTable().rotate(self.url):
+                            self.restartPlayer()
+                            return
+                    higher = getVariantSelector().poll(self.url, stats)
+                    if higher:
+                        self.switchVariant(higher)
+                        return
+                variant = getVariantSelector().label(self.url)
+                if variant:
+                    status = '{} · {}'.format(variant, status) if status else variant
+                relayed = relay_status_text(self.url)
+                if relayed:
+                    status = '{} · {}'.format(status, relayed) if status else relayed
+                saving = getE2Streams().statusText(self.url, stats)
+                if saving:
+                    status = '{} · {}'.format(status, saving) if status else saving
+                if status:
+                    self['network_status'].setText('● Playing {}'.format(status))
+                elif self.currentBitrate is not None:
                     self['network_status'].setText('● Playing {}kb/s'.format(self.currentBitrate))
                 else:
                     self['network_status'].setText('● Playing')
             else:
                 self['network_status'].setText('✗ Stopped')
+                if self.playerMonitor:
+                    self.playerMonitor.dumpTail()
+                    if not self.playerMonitor.stats.outTime:
+                        # Exited before any audio: cached probe hints may be stale
+                        getProbeCache().forget(self.url)
                 self.audio_process = None
                 self.currentBitrate = None
+        elif getWarmPool().active is not None:
+            if getWarmPool().isPlaying():
+                stats = getWarmPool().activeStats()
+                if stats is not None and self.currentBitrate is not None:
+                    stats.bitrate = self.currentBitrate
+                status = stats.statusText() if stats else ''
+                if status:
+                    self['network_status'].setText('● Playing {}'.format(status))
+                else:
+                    self['network_status'].setText('● Playing')
+            else:
+                self['network_status'].setText('✗ Stopped')
+                self.currentBitrate = None
         else:
             self['network_status'].setText('')
             self.currentBitrate = None
     
     def checkAudioBitrate(self):
-        """Check audio bitrate of current stream"""
-        if hasattr(self, 'url') and self.url and config.plugins.IPStreamer.running.value:
-            cprint("[IPStreamer] Checking bitrate for: {}".format(self.url))
-            bitrate = getAudioBitrate(self.url)
-            
-            if bitrate:
-                self.currentBitrate = bitrate
-                cprint("[IPStreamer] Detected bitrate: {} kb/s".format(bitrate))
-                if self.audio_process and self.audio_process.poll() is None:
-                    self['network_status'].setText('● Playing {}kb/s'.format(self.currentBitrate))
-            else:
-                self.currentBitrate = None
-        
+        """Fill in the bitrate when the player does not report it itself"""
         self.bitrateCheckTimer.stop()
+        if not (hasattr(self, 'url') and self.url and config.plugins.IPStreamer.running.value):
+            return
+        
+        if self.playerMonitor:
+            stats = self.playerMonitor.stats
+            if stats.bitrate:
+                self.currentBitrate = stats.bitrate
+            return
+        
+        probeAudioBitrate(self.url, boundFunction(self.gotAudioBitrate, self.url))
+
+    def gotAudioBitrate(self, url, bitrate):
+        if url != getattr(self, 'url', None):
+            return
+        self.currentBitrate = bitrate if bitrate else None
     
     def getTimeshift(self):
         service = self.session.nav.getCurrentService()
@@ -3872,15 +4524,43 @@ class IPStreamerScreenGrid(Screen):
             self.countdownTimer.stop()
     
     def pauseAudioProcess(self):
-        if config.plugins.IPStreamer.running.value and IPStreamerHandler.container.running():
-            pid = IPStreamerHandler.container.getPID()
-            if not self.audioPaused:
-                cmd = "kill -STOP {}".format(pid)
-                self.audioPaused = True
-            else:
-                cmd = "kill -CONT {}".format(pid)
-                self.audioPaused = False
-            eConsoleAppContainer().execute(cmd)
+        """Pause the IP audio into the relay buffer, or resume it from there"""
+        if not config.plugins.IPStreamer.running.value or not getattr(self, 'url', None):
+            return
+        if self.audioPaused:
+            self.resumeAudio()
+            return
+        if not self.audio_process or not getRelay().pause(self.url):
+            self.session.open(MessageBox, _("Pause needs the local stream relay."), MessageBox.TYPE_INFO, timeout=5)
+            return
+        # Playout stops, the relay keeps receiving
+        getSupervisor().stop()
+        self.stopAudioProcess()
+        self.audioPaused = True
+        self['network_status'].setText(pause_status_text(self.url))
+
+    def resumeAudio(self):
+        """Continue from the pause point, then offer to catch up with live"""
+        behind = getRelay().resume(self.url, get_audio_delay())
+        cmd, control = buildPlayerCmd(self.url, self.audioTrack)
+        self.runCmd(cmd, control)
+        if behind < 1:
+            return
+        choices = [(_("Stay %d s behind live") % behind, "stay")]
+        if config.plugins.IPStreamer.player.value not in ("gst1.0-ipstreamer", "gst1.0-engine"):
+            choices.append((_("Catch up (play a little faster)"), "catchup"))
+        choices.append((_("Jump to live"), "live"))
+        self.session.openWithCallback(self.catchUpChoice, ChoiceBox, title=_("Audio resumed behind live"), list=choices)
+
+    def catchUpChoice(self, choice):
+        if not choice or self.audioPaused or not getattr(self, 'url', None):
+            return
+        if choice[1] == "catchup":
+            getRelay().catchUp(self.url)
+            self.restartPlayer()
+        elif choice[1] == "live":
+            getRelay().jumpLive(self.url)
+            self.restartPlayer()
     
     def showInfo(self):
         """Open info/about screen"""
@@ -3963,8 +4643,8 @@ class IPStreamerScreenGrid(Screen):
     
     def callUrl(self, url, callback):
         try:
-            from twisted.web.client import getPage
-            getPage(str.encode(url), headers={b'Content-Type': b'application/x-www-form-urlencoded'}).addCallback(callback).addErrback(self.addErrback)
+            # GitHub raw files; certificates were never checked here
+            fetch_deferred(url, verify=False).addCallback(callback).addErrback(self.addErrback)
         except:
             pass
     
@@ -4091,12 +4771,7 @@ class IPStreamerPlaylist(IPStreamerScreen):
     def loadPlaylist(self):
         playlist = getPlaylist()
         if playlist:
-            list = []
-            for channel in playlist['playlist']:
-                try:
-                    list.append((str(channel['channel']), str(channel['url'])))
-                except KeyError:
-                    pass
+            list = getCatalog().channels(os.path.join(config.plugins.IPStreamer.settingsPath.value, 'ipstreamer.json'))
             if len(list) > 0:
                 self["list"].l.setList(self.iniMenu(list))
                 self["server"].setText('Custom Playlist')
@@ -4107,10 +4782,14 @@ class IPStreamerPlaylist(IPStreamerScreen):
             self["list"].hide()
             self["server"].setText('Cannot load playlist')
 
+    def healthUpdated(self):
+        self.loadPlaylist()
+
     def keyRed(self):
         playlist = getPlaylist()
         if playlist:
-            playlist['playlist'] = []
+            # The catalog's copy stays untouched; the file write reloads it
+            playlist = dict(playlist, playlist=[])
             with open("/etc/enigma2/ipstreamer.json", 'w')as f:
                 json.dump(playlist, f, indent=4)
             self.loadPlaylist()
@@ -4120,9 +4799,9 @@ class IPStreamerPlaylist(IPStreamerScreen):
         if playlist:
             if len(playlist['playlist']) > 0:
                 index = self['list'].getSelectionIndex()
-                currentPlaylist = playlist["playlist"]
+                currentPlaylist = list(playlist["playlist"])
                 del currentPlaylist[index]
-                playlist['playlist'] = currentPlaylist
+                playlist = dict(playlist, playlist=currentPlaylist)
                 with open("/etc/enigma2/ipstreamer.json", 'w')as f:
                     json.dump(playlist, f, indent=4)
                 self.loadPlaylist()
@@ -4256,9 +4935,15 @@ class IPStreamerHelp(Screen):
 
     AUDIO CONTROLS (during playback)
     • GREEN: Stop/Reset audio
+    • PLAY: Pause/resume IP audio (keeps receiving, resume
+      from the pause point, then catch up or jump to live)
     • 7: Decrease Audio delay (-1s)
     • 9: Increase Audio delay (+1s)
     • 8: Reset Audio delay (0s)
+    • 4/6: Fine tune Audio delay (-/+50ms)
+    • 5: Measure Audio delay against the channel audio
+    • 2: Bind playing stream to this TV channel (again: unbind)
+      Zapping to a bound channel switches the commentary
     • Range: -10s to +60s (GStreamer/FFmpeg)
 
     VIDEO SYNC (with live TV)
@@ -4272,6 +4957,8 @@ class IPStreamerHelp(Screen):
     • Player: GStreamer 1.0 / FFmpeg
     • Audio Sink: alsasink/osssink/autoaudiosink
     • Volume: 1-100 (external links)
+    • Warm decoder pool: keep next/previous/recent channels
+      connected for instant switching (0 = off, lower on weak boxes)
     • Equalizer: Bass/Treble/Vocal/Rock/Pop/Classic/Jazz
     • Mute: Force DVB audio mute hack
     • Picons: Grid(200x120) or List(110x56)
@@ -4315,12 +5002,28 @@ class IPStreamerHelp(Screen):
         
         self["help_text"].setText(help_text)
 
+ZAP_GRACE_MS = 1500  # evEnd without evStart within this: the service really stopped
+
 class IPStreamerHandler(Screen):
+    """
+    Follows channel changes while external audio plays: a zap to a channel
+    with a bound commentary stream switches to that stream with the
+    channel's saved delays; a zap to any other channel stops cleanly.
+    """
     container = eConsoleAppContainer()
     
     def __init__(self, session):
         Screen.__init__(self, session)
         self.session = session
+        current_service = session.nav.getCurrentlyPlayingServiceReference()
+        self.serviceRef = current_service.toString() if current_service else None
+        self.url = None
+        self.playerMonitor = None
+        self.endTimer = eTimer()
+        try:
+            self.endTimer.callback.append(self.serviceStopped)
+        except:
+            self.endTimer_conn = self.endTimer.timeout.connect(self.serviceStopped)
         
         # Track service events including channel changes
         ServiceEventTracker(screen=self, eventmap={
@@ -4336,55 +5039,122 @@ class IPStreamerHandler(Screen):
             self.container.kill()
     
     def evServiceChanged(self):
-        """Called when service changes (channel zap) - restore audio AND video"""
-        cprint("[IPStreamer] Service changed - stopping external audio and restoring original")
+        """Called when a service starts (channel zap) - follow it with the bound commentary"""
+        self.endTimer.stop()
+        service_ref = self.session.nav.getCurrentlyPlayingServiceReference()
+        ref_str = service_ref.toString() if service_ref else None
+        if ref_str == self.serviceRef:
+            # Same channel restarted (audio device handover), not a zap
+            return
+        self.serviceRef = ref_str
+        if not config.plugins.IPStreamer.running.value:
+            return
         
-        # Stop external audio when user changes channel
-        if config.plugins.IPStreamer.running.value:
-            cprint("[IPStreamer] Channel changed - restoring original audio/video")
-            
-            # Kill container processes
-            if self.container.running():
-                self.container.kill()
-            
-            # Kill any running audio processes
-            os.system("killall -9 gst-launch-1.0 ffmpeg 2>/dev/null")
-            
-            # For mutable boxes - restore audio device
-            if fileExists("/dev/dvb/adapter0/audio10"):
-                try:
-                    os.rename("/dev/dvb/adapter0/audio10", "/dev/dvb/adapter0/audio0")
-                    cprint("[IPStreamer] Audio device restored")
-                except:
-                    pass
-            
-            # Restart the current service to restore both audio AND video
-            current_service = self.session.nav.getCurrentlyPlayingServiceReference()
-            if current_service:
-                cprint("[IPStreamer] Restarting service to restore audio/video")
+        binding = getCommentaryForChannel(service_ref)
+        if binding:
+            self.playBound(service_ref, binding)
+        else:
+            cprint("[IPStreamer] Channel changed, no commentary bound - restoring original audio/video")
+            self.stopExternal(service_ref)
+    
+    def playBound(self, service_ref, binding):
+        """Switch the external audio to the stream bound to service_ref"""
+        cprint("[IPStreamer] Zap to bound commentary: {}".format(binding.get('channel') or binding['url']))
+        # The channel's own delays
+        saved_audio = getAudioDelayForChannel(service_ref)
+        if saved_audio is not None:
+            set_audio_delay(saved_audio)
+        config.plugins.IPStreamer.tsDelay.value = getVideoDelayForChannel(
+            service_ref, fallback=config.plugins.IPStreamer.tsDelay.value)
+        self.url = binding['url']
+        config.plugins.IPStreamer.lastAudioChannel.value = self.url
+        config.plugins.IPStreamer.lastAudioChannel.save()
+        config.plugins.IPStreamer.lastAudioName.value = binding.get('channel', '')
+        config.plugins.IPStreamer.lastAudioName.save()
+        self.startPlayer()
+    
+    def startPlayer(self, reconnect=False):
+        """Launch the player for self.url; the service keeps running"""
+        self.stopPlayer()
+        if HAVE_EALSA:
+            # The new service took ALSA again
+            try:
+                alsa = eAlsaOutput.getInstance()
+                alsa.stop()
+                alsa.close()
+            except:
+                pass
+        audio_process = None
+        try:
+            cmd, control = buildPlayerCmd(self.url)
+            audio_process = launch(cmd, stdin=subprocess.PIPE if control else None)
+            cprint("[IPStreamer] Process started with PID: {}".format(audio_process.pid))
+            if control:
+                control.attach(audio_process)
+                set_live_control(control)
+            self.playerMonitor = PlayerMonitor(
+                audio_process,
+                parser_for(cmd),
+                control.handleLine if control else None
+            )
+        except Exception as e:
+            cprint("[IPStreamer] ERROR starting process: {}".format(str(e)))
+            trace_error()
+        getSupervisor().watch(self.playerMonitor, self.reconnectPlayer, fresh=not reconnect)
+        config.plugins.IPStreamer.running.value = True
+        config.plugins.IPStreamer.running.save()
+    
+    def reconnectPlayer(self):
+        """Relaunch the bound stream (stream supervisor)"""
+        if self.url:
+            self.startPlayer(reconnect=True)
+    
+    def stopPlayer(self):
+        """Stop the running player, whichever screen started it"""
+        getSupervisor().stop()
+        getWarmPool().stop()
+        clear_live_control()
+        if self.playerMonitor:
+            self.playerMonitor.stop()
+            self.playerMonitor = None
+        getProcessManager().stopAll()
+    
+    def stopExternal(self, service_ref):
+        """Stop external audio and give the channel its own audio back"""
+        if self.container.running():
+            self.container.kill()
+        self.stopPlayer()
+        self.url = None
+        
+        # For mutable boxes - restore audio device
+        if fileExists("/dev/dvb/adapter0/audio10"):
+            try:
+                os.rename("/dev/dvb/adapter0/audio10", "/dev/dvb/adapter0/audio0")
+                cprint("[IPStreamer] Audio device restored")
+            except:
+                pass
+            # The service opened without an audio device; restart it once
+            if service_ref:
                 self.session.nav.stopService()
-                
-                # Use timer to restart service after short delay
-                from enigma import eTimer
                 self.restoreTimer = eTimer()
                 try:
-                    self.restoreTimer.callback.append(lambda: self.restoreService(current_service))
+                    self.restoreTimer.callback.append(lambda: self.restoreService(service_ref))
                 except:
-                    self.restoreTimer_conn = self.restoreTimer.timeout.connect(lambda: self.restoreService(current_service))
+                    self.restoreTimer_conn = self.restoreTimer.timeout.connect(lambda: self.restoreService(service_ref))
                 self.restoreTimer.start(100, True)  # 100ms delay
-            
-            # Update running status
-            config.plugins.IPStreamer.running.value = False
-            config.plugins.IPStreamer.running.save()
-            
-            # Unmute if using ALSA
-            if HAVE_EALSA:
-                try:
-                    alsa = eAlsaOutput.getInstance()
-                    alsa.setMute(False)
-                    cprint("[IPStreamer] ALSA unmuted")
-                except:
-                    pass
+        
+        # Update running status
+        config.plugins.IPStreamer.running.value = False
+        config.plugins.IPStreamer.running.save()
+        
+        # Unmute if using ALSA
+        if HAVE_EALSA:
+            try:
+                alsa = eAlsaOutput.getInstance()
+                alsa.setMute(False)
+                cprint("[IPStreamer] ALSA unmuted")
+            except:
+                pass
     
     def restoreService(self, service_ref):
         """Restore the service after stopping external audio"""
@@ -4392,15 +5162,22 @@ class IPStreamerHandler(Screen):
         self.session.nav.playService(service_ref)
     
     def evEnd(self):
-        """Called when service ends or stops"""
+        """Called when service ends or stops; a zap follows with evStart"""
+        if not self.endTimer.isActive():
+            self.endTimer.start(ZAP_GRACE_MS, True)
+    
+    def serviceStopped(self):
+        """The service stopped without a new one starting"""
         cprint("[IPStreamer] Service ended")
+        self.serviceRef = None
         
         # Only clean up if we were playing external audio
         if config.plugins.IPStreamer.running.value:
             if not config.plugins.IPStreamer.keepaudio.value:
                 cprint("[IPStreamer] Cleaning up audio on service end")
                 self.stopIPStreamer()
-                os.system("killall -9 gst-launch-1.0 ffmpeg 2>/dev/null")
+                self.stopPlayer()
+                self.url = None
                 
                 # Restore audio device for mutable boxes
                 if fileExists("/dev/dvb/adapter0/audio10"):
@@ -4429,9 +5206,20 @@ class IPStreamerLauncher():
 
 # Add at the end of the file, in sessionstart() function:
 
+def gstEngineChecked(available):
+    """Report when the live control player cannot load GStreamer"""
+    # The choice stays (setChoices would drop the saved value on the next
+    # setup save); buildPlayerCmd plays it with gst-launch meanwhile
+    if not available and config.plugins.IPStreamer.player.value == "gst1.0-engine":
+        cprint("[IPStreamer] GStreamer bindings missing, playing with gst-launch instead")
+
 def sessionstart(reason, session=None, **kwargs):
     if reason == 0:
-        #IPStreamerHandler(session)
+        # Which ffmpeg filters take runtime commands, probed off the UI thread
+        start_runtime_filter_probe()
+        # The live control player needs the python GStreamer bindings
+        start_gst_engine_check(gstEngineChecked)
+        IPStreamerHandler(session)
         IPStreamerLauncher(session).gotSession()
         
         # Start web interface
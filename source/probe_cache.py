@@ -0,0 +1,121 @@
+# probe_cache.py
+#
+# Per-URL stream facts from earlier plays, used to skip ffmpeg's format probe.
+#
+# Without hints ffmpeg reads up to 5 MB / 5 s of a stream to find the
+# container, its streams and their parameters before the first sample is
+# played. On slow radio servers that is most of the wait. After the first
+# play that produced audio, the container (demuxer), codec, sample rate,
+# channels and the audio track ffmpeg mapped are stored here. The next
+# launch names the demuxer and the track explicitly and probes with a
+# small window. An entry is dropped when a launch with it fails, so the
+# following start probes fully again.
+
+import json
+import os
+import time
+
+from Components.config import config
+
+REDC = "**"
+ENDC = "**"
+
+def cprint(text):
+    print(REDC + text + ENDC)
+
+
+PROBE_FILE = "probe_cache.json"
+MAX_ENTRIES = 500
+PROBE_SIZE = 32768              # bytes read while probing with a known format
+ANALYZE_US = 500000             # microseconds analysed with a known format
+
+# Demuxers that are safe to force with -f; anything else is probed as before
+KNOWN_FORMATS = ("mp3", "aac", "mpegts", "hls", "ogg", "flac")
+
+
+def get_probe_file():
+    return os.path.join(config.plugins.IPStreamer.settingsPath.value, PROBE_FILE)
+
+
+def stream_type(url, container):
+    """Kind of stream for the cache entry: e2, hls, mpegts or icecast-<format>."""
+    if url.startswith("http://127.0.0.1:8001/"):
+        return "e2"
+    if container in ("hls", "mpegts"):
+        return container
+    return "icecast-{}".format(container)
+
+
+def ffmpeg_input_args(entry):
+    """ffmpeg options placed before -i for a cached entry ([] if not usable)."""
+    if not entry or entry.get("format") not in KNOWN_FORMATS:
+        return []
+    return ["-probesize", PROBE_SIZE, "-analyzeduration", ANALYZE_US, "-f", entry["format"]]
+
+
+class ProbeCache(object):
+    """URL -> stream facts table, kept in memory and saved when it changes."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (IOError, OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self.entries, f, separators=(",", ":"))
+            os.rename(tmp, self.path)
+        except (IOError, OSError) as e:
+            cprint("[IPStreamer] Cannot save probe cache: {}".format(str(e)))
+
+    def get(self, url):
+        return self.entries.get(url)
+
+    def remember(self, url, stats):
+        """Store what the player reported for url once it played audio."""
+        if not stats.container or not stats.codec or stats.audioTrack is None:
+            return
+        container = stats.container.split(",")[0]
+        entry = {
+            "type": stream_type(url, container),
+            "format": container,
+            "codec": stats.codec,
+            "rate": stats.sampleRate,
+            "channels": stats.channels,
+            "track": stats.audioTrack,
+        }
+        old = self.entries.get(url)
+        if old is not None and all(old.get(k) == v for k, v in entry.items()):
+            return
+        entry["saved"] = int(time.time())
+        self.entries[url] = entry
+        if len(self.entries) > MAX_ENTRIES:
+            oldest = sorted(self.entries, key=lambda u: self.entries[u].get("saved", 0))
+            for old_url in oldest[:len(self.entries) - MAX_ENTRIES]:
+                del self.entries[old_url]
+        cprint("[IPStreamer] Probe cache: {} {}".format(url, entry))
+        self.save()
+
+    def forget(self, url):
+        if self.entries.pop(url, None) is not None:
+            cprint("[IPStreamer] Probe cache entry dropped: {}".format(url))
+            self.save()
+
+
+_cache = None
+
+def getProbeCache():
+    global _cache
+    path = get_probe_file()
+    if _cache is None or _cache.path != path:
+        _cache = ProbeCache(path)
+    return _cache
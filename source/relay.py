@@ -0,0 +1,926 @@
+# relay.py
+#
+# Local ring-buffer HTTP relay in front of the audio streams.
+#
+# For every stream URL one RelaySession opens the upstream connection once
+# (a small HTTP/1.0 client on the reactor) and keeps the last N seconds of the
+# compressed stream in a fixed-size memory ring. The player is pointed at
+# http://127.0.0.1:<port>/stream/<id> and reads from a cursor into that
+# ring, so:
+#   - a player restart (delay/volume/EQ change, crash, backend switch in
+#     ok()) continues from the buffer without a new upstream connection,
+#   - the audio delay is where in the ring a player starts: ?lag=<ms>
+#     puts it that far behind the live edge (plus a short preroll), and a
+#     smaller delay skips ahead in data that is already buffered,
+#   - an upstream drop is reconnected by the relay while the player stays
+#     connected and just sees a short gap,
+#   - fill level, upstream throughput and reconnect count are known,
+#   - Shoutcast/Icecast in-band metadata is requested on that same
+#     connection; the metadata blocks are cut out of the audio and the
+#     StreamTitle is published to title listeners,
+#   - a channel with mirror URLs is opened by racing them (staggered by
+#     RACE_STAGGER) and the first mirror that delivers audio is kept; when
+#     it stops delivering (or the player reports silence) the session
+#     switches to the next mirror while the player keeps reading the ring,
+#   - pause keeps receiving: the player is stopped, the ring grows to the
+#     pause buffer (memory or a file on e.g. /media/hdd) and resume starts
+#     the player at the pause point. Playback then stays that far behind
+#     live until the user jumps to live or catches up (player tempo a bit
+#     above 1 until the shift is gone).
+# HLS playlists and non-HTTP URLs are not relayed, and a stream the relay
+# never managed to open is played directly on the next start.
+
+import base64
+import hashlib
+import os
+import re
+import time
+from collections import deque
+
+try:
+    from urllib.parse import urljoin, urlsplit
+except ImportError:
+    from urlparse import urljoin, urlsplit
+
+from twisted.internet import reactor
+from twisted.internet.protocol import ClientFactory, Protocol
+from twisted.web import resource, server
+
+from Components.config import config
+from Plugins.Extensions.IPStreamer.net import cached_address
+from Plugins.Extensions.IPStreamer.ring import ByteRing, FileRing
+
+REDC = "**"
+ENDC = "**"
+
+def cprint(text):
+    print(REDC + text + ENDC)
+
+
+# Ring size is configured in seconds; this is the rate it is sized for
+ASSUMED_BYTES_PER_SEC = 48000       # 384 kb/s
+RATE_WINDOW = 5.0                   # seconds of upstream history for throughput
+PREROLL_SECONDS = 2.0               # burst a new client gets to start quickly
+IDLE_TIMEOUT = 20.0                 # close upstream this long after the last client left
+MAX_SESSIONS = 2
+RETRY_BASE = 1.0
+RETRY_MAX = 30.0
+CONNECT_TIMEOUT = 10
+HEADER_MAX = 16384
+MAX_REDIRECTS = 3
+GIVE_UP_FAILURES = 2                # failed opens before a stream is played directly
+RACE_STAGGER = 1.5                  # seconds before the next mirror joins the race
+STALL_SECONDS = 5                   # no upstream data for this long -> next mirror
+CATCH_UP_TEMPO = 1.05               # playback speed while catching up to live
+FLUSH_CHUNK = 65536                 # bytes per write to a player (backlog after resume)
+PAUSE_FILE = "ipstreamer_pause_{}.ring"
+MAX_MEMORY_PAUSE_MB = 128           # larger pause buffers only with a pause storage directory
+USER_AGENT = "Mozilla/5.0 IPStreamer"
+
+RE_STREAM_TITLE = re.compile(br"StreamTitle='(.*?)';", re.S)
+
+
+def is_relay_enabled():
+    try:
+        return bool(config.plugins.IPStreamer.relayEnabled.value)
+    except Exception:
+        return False
+
+
+def get_ring_capacity():
+    try:
+        seconds = int(config.plugins.IPStreamer.relayBuffer.value)
+    except Exception:
+        seconds = 60
+    return max(10, seconds) * ASSUMED_BYTES_PER_SEC
+
+
+def get_pause_capacity(in_memory=False):
+    try:
+        megabytes = int(config.plugins.IPStreamer.pauseBuffer.value)
+    except Exception:
+        megabytes = 32
+    if in_memory:
+        megabytes = min(megabytes, MAX_MEMORY_PAUSE_MB)
+    return max(ASSUMED_BYTES_PER_SEC * 10, megabytes * 1024 * 1024)
+
+
+def get_pause_storage():
+    """Directory for the pause buffer file, None to keep it in memory."""
+    try:
+        path = config.plugins.IPStreamer.pauseStorage.value
+    except Exception:
+        return None
+    if not path or path == "memory":
+        return None
+    if not os.path.isdir(path) or not os.access(path, os.W_OK):
+        cprint("[IPStreamer] Pause storage {} not writable, using memory".format(path))
+        return None
+    return path
+
+
+LOCAL_HOSTS = ("localhost", "::1")
+E2_STREAM_PORT = 8001
+
+
+def can_relay(url):
+    if not url or not (url.startswith("http://") or url.startswith("https://")):
+        return False
+    try:
+        parts = urlsplit(url)
+        host, port = (parts.hostname or "").lower(), parts.port
+    except ValueError:
+        return False
+    # The enigma2 stream server and other local sources send full TS: not
+    # through Python on the main loop, and far beyond a ring sized for audio
+    if host in LOCAL_HOSTS or host.startswith("127.") or port == E2_STREAM_PORT:
+        return False
+    path = url.split("?", 1)[0].lower()
+    if path.endswith(".m3u8") or path.endswith(".m3u"):
+        return False
+    if url.startswith("https://"):
+        try:
+            from twisted.internet import ssl
+        except ImportError:
+            return False
+    return True
+
+
+def parse_stream_title(meta):
+    """StreamTitle from one ICY metadata block, None if it has none."""
+    match = RE_STREAM_TITLE.search(meta)
+    if not match:
+        return None
+    raw = match.group(1)
+    try:
+        return raw.decode("utf-8").strip()
+    except UnicodeDecodeError:
+        return raw.decode("latin-1").strip()
+
+
+def parse_response_head(head):
+    """(code, headers) of an HTTP or Shoutcast ("ICY 200 OK") response head."""
+    lines = head.decode("latin-1").splitlines()
+    status = lines[0].split() if lines else []
+    code = int(status[1]) if len(status) > 1 and status[1].isdigit() else 0
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+    return code, headers
+
+
+def tls_options(host):
+    from twisted.internet import ssl
+    try:
+        return ssl.optionsForClientTLS(host)
+    except Exception:
+        return ssl.ClientContextFactory()
+
+
+class UpstreamProtocol(Protocol):
+    """
+    HTTP/1.0 client for one upstream connection attempt. Takes Shoutcast's
+    "ICY 200 OK" status line, asks for in-band metadata and strips the
+    metadata blocks (every icy-metaint bytes) before audio reaches the ring.
+    """
+
+    def __init__(self, session, url, redirects, candidate, race):
+        self.session = session
+        self.url = url
+        self.redirects = redirects
+        self.candidate = candidate  # mirror URL this attempt started from
+        self.race = race
+        self.head = b""
+        self.headersDone = False
+        self.metaint = 0
+        self.audioLeft = 0
+        self.metaLeft = None        # bytes still missing from the current metadata block
+        self.meta = b""
+
+    def connectionMade(self):
+        parts = urlsplit(self.url)
+        path = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+        host = parts.hostname if parts.port is None else "{}:{}".format(parts.hostname, parts.port)
+        lines = [
+            "GET {} HTTP/1.0".format(path),
+            "Host: {}".format(host),
+            "User-Agent: {}".format(USER_AGENT),
+            "Icy-MetaData: 1",
+            "Accept: */*",
+        ]
+        if parts.username:
+            token = "{}:{}".format(parts.username, parts.password or "").encode("utf-8")
+            lines.append("Authorization: Basic {}".format(base64.b64encode(token).decode("ascii")))
+        self.transport.write(("\r\n".join(lines) + "\r\n\r\n").encode("utf-8"))
+
+    def dataReceived(self, data):
+        if not self.headersDone:
+            self.head += data
+            end, size = self.head.find(b"\r\n\r\n"), 4
+            if end < 0:
+                end, size = self.head.find(b"\n\n"), 2
+            if end < 0:
+                if len(self.head) > HEADER_MAX:
+                    self.headersDone = True
+                    self.session.attemptFailed(self, "bad response header")
+                    self.transport.loseConnection()
+                return
+            head, data = self.head[:end], self.head[end + size:]
+            self.head = b""
+            self.headersDone = True
+            code, headers = parse_response_head(head)
+            if not self.session.gotHeaders(self, code, headers):
+                self.transport.loseConnection()
+                return
+            metaint = headers.get("icy-metaint", "")
+            self.metaint = int(metaint) if metaint.isdigit() else 0
+            self.audioLeft = self.metaint
+        if data:
+            self.body(data)
+
+    def body(self, data):
+        if not self.metaint:
+            self.session.received(self, data)
+            return
+        audio = []
+        while data:
+            if self.metaLeft is None and self.audioLeft > 0:
+                audio.append(data[:self.audioLeft])
+                taken = len(audio[-1])
+                self.audioLeft -= taken
+                data = data[taken:]
+            elif self.metaLeft is None:
+                # Length byte: metadata size in 16 byte units
+                self.metaLeft = ord(data[:1]) * 16
+                self.meta = b""
+                data = data[1:]
+            else:
+                part = data[:self.metaLeft]
+                self.meta += part
+                self.metaLeft -= len(part)
+                data = data[len(part):]
+            if self.metaLeft == 0:
+                if self.meta:
+                    self.session.gotMetadata(self, self.meta)
+                self.metaLeft = None
+                self.audioLeft = self.metaint
+        if audio:
+            self.session.received(self, b"".join(audio))
+
+    def connectionLost(self, reason):
+        self.session.attemptLost(self, reason)
+
+
+class UpstreamFactory(ClientFactory):
+    noisy = False
+
+    def __init__(self, session, url, redirects, candidate, race):
+        self.session = session
+        self.url = url
+        self.redirects = redirects
+        self.candidate = candidate
+        self.race = race
+
+    def buildProtocol(self, addr):
+        protocol = UpstreamProtocol(self.session, self.url, self.redirects, self.candidate, self.race)
+        protocol.factory = self
+        return protocol
+
+    def clientConnectionFailed(self, connector, reason):
+        self.session.attemptFailed(self, reason.getErrorMessage())
+
+
+class RelayClient(object):
+    """One player connection reading from the ring (a push producer for its request)."""
+
+    def __init__(self, session, request, cursor):
+        self.session = session
+        self.request = request
+        self.cursor = cursor
+        self.headersSent = False
+        self.finished = False
+        self.holdCall = None
+        self.holdUntil = 0          # when the last hold ends or ended (time.time())
+        self.producing = True
+
+    def pauseProducing(self):
+        self.producing = False
+
+    def resumeProducing(self):
+        self.producing = True
+        self.flush()
+
+    def stopProducing(self):
+        self.finished = True
+
+    def hold(self, seconds):
+        """Send nothing for seconds (ring does not reach back far enough yet)."""
+        self.holdUntil = time.time() + seconds
+        self.holdCall = reactor.callLater(seconds, self.release)
+
+    def release(self):
+        self.holdCall = None
+        self.flush()
+
+    def flush(self):
+        if self.finished or self.holdCall is not None or self.session.contentType is None:
+            return
+        if not self.headersSent:
+            self.request.setHeader(b"content-type", self.session.contentType)
+            self.request.setHeader(b"cache-control", b"no-cache")
+            self.headersSent = True
+        ring = self.session.ring
+        if self.cursor < ring.start:
+            # Player fell behind the ring; continue with the oldest data
+            self.cursor = ring.start
+        # In chunks: after a resume the backlog can be the whole pause buffer
+        while self.producing and not self.finished:
+            data = ring.read(self.cursor, FLUSH_CHUNK)
+            if not data:
+                break
+            self.cursor += len(data)
+            self.request.write(data)
+
+
+class RelaySession(object):
+    """Upstream connection plus ring for one stream URL (and its mirrors)."""
+
+    def __init__(self, relay, url, mirrors=None):
+        self.relay = relay
+        self.url = url
+        self.candidates = [url] + list(mirrors or [])
+        self.current = 0            # index of the mirror in use (or tried first)
+        self.race = 0
+        self.queue = []             # mirrors not yet started in this race
+        self.attempts = 0           # attempts of this race still open
+        self.racers = []            # attempts that answered 200, waiting for audio
+        self.raceCall = None
+        self.stallCall = None
+        self.lastData = 0
+        self.id = hashlib.md5(url.encode("utf-8")).hexdigest()[:12]
+        self.ring = ByteRing(get_ring_capacity())
+        self.clients = []
+        self.contentType = None
+        self.upstream = None
+        self.connecting = False
+        self.opened = False         # upstream answered 200 at least once
+        self.failures = 0
+        self.reconnects = 0
+        self.attempt = 0
+        self.title = None
+        self.rates = deque()
+        self.idleCall = None
+        self.retryCall = None
+        self.closed = False
+        self.pausedAt = None        # ring offset where playout stopped
+        self.pausedSince = None
+        self.connect()
+
+    def setMirrors(self, mirrors):
+        candidates = [self.url] + list(mirrors or [])
+        if candidates != self.candidates:
+            self.candidates = candidates
+            self.current = 0
+
+    def connect(self):
+        """Start a race: the current mirror first, the others RACE_STAGGER apart."""
+        self.retryCall = None
+        if self.closed:
+            return
+        self.cancelRace()
+        self.race += 1
+        self.queue = self.candidates[self.current:] + self.candidates[:self.current]
+        self.attempts = 0
+        self.racers = []
+        self.connecting = True
+        self.startNext()
+
+    def startNext(self):
+        self.raceCall = None
+        if self.closed or self.upstream is not None or not self.queue:
+            return
+        self.open(self.queue.pop(0))
+        if self.queue:
+            self.raceCall = reactor.callLater(RACE_STAGGER, self.startNext)
+        else:
+            self.raceCall = reactor.callLater(CONNECT_TIMEOUT + STALL_SECONDS, self.raceExpired)
+
+    def raceExpired(self):
+        """No mirror delivered audio in time (e.g. answered 200, then nothing)."""
+        self.raceCall = None
+        if self.closed or self.upstream is not None:
+            return
+        self.cancelRace()
+        self.race += 1              # late answers of this race are ignored
+        self.connecting = False
+        self.failures += 1
+        cprint("[IPStreamer] Relay upstream: no audio from any source")
+        self.scheduleRetry()
+
+    def open(self, url, redirects=MAX_REDIRECTS, candidate=None):
+        parts = urlsplit(url)
+        self.attempts += 1
+        cprint("[IPStreamer] Relay connecting upstream: {}".format(url))
+        factory = UpstreamFactory(self, url, redirects, candidate or url, self.race)
+        # Hosts of the open category are resolved ahead (net.prefetch_hosts)
+        address = cached_address(parts.hostname) or parts.hostname
+        if parts.scheme == "https":
+            reactor.connectSSL(address, parts.port or 443, factory, tls_options(parts.hostname), timeout=CONNECT_TIMEOUT)
+        else:
+            reactor.connectTCP(address, parts.port or 80, factory, timeout=CONNECT_TIMEOUT)
+
+    def cancelRace(self):
+        if self.raceCall is not None and self.raceCall.active():
+            self.raceCall.cancel()
+        self.raceCall = None
+        for protocol in self.racers:
+            if protocol.transport is not None:
+                protocol.transport.loseConnection()
+        self.racers = []
+        self.queue = []
+
+    def gotHeaders(self, protocol, code, headers):
+        """Response head of an attempt; True when its body may be the stream."""
+        if self.closed or protocol.race != self.race:
+            return False
+        if code in (301, 302, 303, 307, 308) and headers.get("location") and protocol.redirects > 0:
+            self.attempts -= 1
+            self.open(urljoin(protocol.url, headers["location"]), protocol.redirects - 1, protocol.candidate)
+            return False
+        if code != 200:
+            self.attemptFailed(protocol, "HTTP {}".format(code))
+            return False
+        if self.upstream is not None:
+            # Another mirror won meanwhile
+            self.attempts -= 1
+            return False
+        protocol.headers = headers
+        self.racers.append(protocol)
+        return True
+
+    def received(self, protocol, data):
+        if protocol is not self.upstream:
+            if self.upstream is not None or protocol not in self.racers:
+                return
+            self.adopt(protocol)
+        self.feed(data)
+
+    def adopt(self, protocol):
+        """First audio of the race: keep this attempt, drop the others."""
+        self.racers.remove(protocol)
+        self.upstream = protocol
+        self.cancelRace()
+        self.attempts = 0
+        self.connecting = False
+        self.opened = True
+        self.failures = 0
+        headers = protocol.headers
+        default_type = "audio/mpeg" if "icy-metaint" in headers or "icy-name" in headers else "application/octet-stream"
+        self.contentType = headers.get("content-type", default_type).encode("latin-1")
+        index = self.candidates.index(protocol.candidate) if protocol.candidate in self.candidates else 0
+        if len(self.candidates) > 1:
+            cprint("[IPStreamer] Relay using mirror {}/{}: {}".format(index + 1, len(self.candidates), protocol.candidate))
+        self.current = index
+        self.lastData = time.time()
+        self.watchStall()
+
+    def watchStall(self):
+        self.stallCall = None
+        if self.closed or self.upstream is None:
+            return
+        idle = time.time() - self.lastData
+        if idle >= STALL_SECONDS:
+            self.failover("no data for {}s".format(int(idle)))
+            return
+        self.stallCall = reactor.callLater(STALL_SECONDS - idle, self.watchStall)
+
+    def failover(self, reason):
+        """Drop the current upstream and race again, starting with the next mirror."""
+        cprint("[IPStreamer] Relay upstream {}, switching".format(reason))
+        upstream, self.upstream = self.upstream, None
+        if upstream is not None and upstream.transport is not None:
+            upstream.transport.loseConnection()
+        if self.stallCall is not None and self.stallCall.active():
+            self.stallCall.cancel()
+        self.stallCall = None
+        if len(self.candidates) > 1:
+            self.current = (self.current + 1) % len(self.candidates)
+            self.reconnects += 1
+            if self.retryCall is not None and self.retryCall.active():
+                self.retryCall.cancel()
+            self.connect()
+        else:
+            self.scheduleRetry()
+
+    def gotMetadata(self, protocol, meta):
+        if protocol is not self.upstream:
+            return
+        title = parse_stream_title(meta)
+        if title and title != self.title:
+            self.title = title
+            cprint("[IPStreamer] Now playing: {}".format(title))
+            self.relay.notifyTitle(self.url, title)
+
+    def attemptFailed(self, attempt, reason):
+        """One attempt failed; the race fails when none is left."""
+        if self.closed or attempt.race != self.race:
+            return
+        cprint("[IPStreamer] Relay upstream failed: {}".format(reason))
+        self.attempts -= 1
+        if self.upstream is not None or self.attempts > 0 or self.racers:
+            return
+        if self.queue:
+            # Nothing left in flight: do not wait for the stagger
+            self.startNext()
+            return
+        self.cancelRace()
+        self.connecting = False
+        self.failures += 1
+        self.scheduleRetry()
+
+    def attemptLost(self, protocol, reason):
+        if protocol is self.upstream:
+            self.upstreamLost(protocol, reason)
+        elif protocol in self.racers:
+            self.racers.remove(protocol)
+            self.attemptFailed(protocol, reason.getErrorMessage())
+        elif not protocol.headersDone:
+            self.attemptFailed(protocol, reason.getErrorMessage())
+
+    def usable(self):
+        """False once opening the stream failed repeatedly without ever working."""
+        return self.opened or self.failures < GIVE_UP_FAILURES
+
+    def upstreamLost(self, protocol, reason):
+        if protocol is not self.upstream:
+            return
+        if self.closed:
+            self.upstream = None
+            return
+        self.failover("lost ({})".format(reason.getErrorMessage()))
+
+    def scheduleRetry(self):
+        if self.closed or self.retryCall is not None:
+            return
+        delay = min(RETRY_MAX, RETRY_BASE * (2 ** self.attempt))
+        self.attempt += 1
+        self.reconnects += 1
+        self.retryCall = reactor.callLater(delay, self.connect)
+
+    def feed(self, data):
+        self.attempt = 0
+        self.ring.write(data)
+        now = time.time()
+        self.lastData = now
+        self.rates.append((now, len(data)))
+        while self.rates and now - self.rates[0][0] > RATE_WINDOW:
+            self.rates.popleft()
+        for client in list(self.clients):
+            client.flush()
+
+    def bytesPerSecond(self):
+        """Upstream rate over the last RATE_WINDOW seconds (0 if unknown)."""
+        if len(self.rates) < 2:
+            return 0
+        span = max(1.0, self.rates[-1][0] - self.rates[0][0])
+        return sum(n for t, n in self.rates) / span
+
+    def startCursor(self, lag):
+        """
+        (cursor, hold) for a client lag seconds behind the live edge.
+        Every start is measured from the edge, so restarts keep the same
+        sync. hold is how long to wait when the ring is still too short
+        for a positive lag; a negative lag stops at the live edge.
+        """
+        ring = self.ring
+        rate = self.bytesPerSecond() or ASSUMED_BYTES_PER_SEC
+        target = ring.end - int(rate * max(0.0, PREROLL_SECONDS + lag))
+        if target >= ring.start:
+            return target, 0
+        missing = ring.start - (ring.end - int(rate * max(0.0, lag)))
+        return ring.start, max(0, missing) / float(rate)
+
+    def addClient(self, request, lag=0):
+        if self.idleCall is not None:
+            self.idleCall.cancel()
+            self.idleCall = None
+        cursor, hold = self.startCursor(lag)
+        client = RelayClient(self, request, cursor)
+        if hold > 0:
+            client.hold(hold)
+        self.clients.append(client)
+        if self.upstream is None and not self.connecting and self.retryCall is None:
+            self.connect()
+        return client
+
+    def removeClient(self, client):
+        client.finished = True
+        if client.holdCall is not None and client.holdCall.active():
+            client.holdCall.cancel()
+        if client in self.clients:
+            self.clients.remove(client)
+        if not self.clients and not self.closed and self.idleCall is None and self.pausedAt is None:
+            self.idleCall = reactor.callLater(IDLE_TIMEOUT, self.relay.closeSession, self)
+
+    def pause(self):
+        """Stop playout here; the upstream keeps filling a ring sized for the pause."""
+        self.pausedAt = min([c.cursor for c in self.clients] or [self.ring.end])
+        self.pausedSince = time.time()
+        if self.idleCall is not None and self.idleCall.active():
+            self.idleCall.cancel()
+        self.idleCall = None
+        storage = get_pause_storage()
+        capacity = get_pause_capacity(storage is None)
+        if storage is not None and not isinstance(self.ring, FileRing):
+            try:
+                ring = FileRing(capacity, os.path.join(storage, PAUSE_FILE.format(self.id)))
+                self.ring = ring.takeOver(self.ring)
+            except (IOError, OSError) as e:
+                cprint("[IPStreamer] Pause file unavailable: {}".format(str(e)))
+                storage = None
+                capacity = get_pause_capacity(True)
+        if storage is None and self.ring.capacity < capacity:
+            try:
+                self.ring = ByteRing(capacity).takeOver(self.ring)
+            except MemoryError:
+                cprint("[IPStreamer] No memory for a {} MB pause buffer, keeping the relay ring".format(
+                    capacity // (1024 * 1024)))
+        cprint("[IPStreamer] Relay paused at {} ({} MB buffer{})".format(
+            self.pausedAt, self.ring.capacity // (1024 * 1024), " in " + storage if storage else ""))
+
+    def resume(self):
+        """Seconds of stream between the pause point and the live edge."""
+        if self.pausedAt is None:
+            return 0
+        if self.pausedAt < self.ring.start:
+            cprint("[IPStreamer] Pause buffer overflowed, resuming from its oldest data")
+        behind = self.ring.end - max(self.pausedAt, self.ring.start)
+        self.pausedAt = self.pausedSince = None
+        return behind / float(self.bytesPerSecond() or ASSUMED_BYTES_PER_SEC)
+
+    def stats(self):
+        rate = self.bytesPerSecond()
+        return {
+            "url": self.url,
+            "fill_bytes": self.ring.size(),
+            "fill_percent": int(self.ring.size() * 100 / self.ring.capacity),
+            "fill_seconds": round(self.ring.size() / rate, 1) if rate else None,
+            "throughput_kbps": int(rate * 8 / 1000),
+            "reconnects": self.reconnects,
+            "mirror": self.current if len(self.candidates) > 1 else None,
+            "clients": len(self.clients),
+            "connected": self.upstream is not None,
+        }
+
+    def close(self):
+        self.closed = True
+        self.ring.close()
+        self.cancelRace()
+        for call in (self.idleCall, self.retryCall, self.stallCall):
+            if call is not None and call.active():
+                call.cancel()
+        self.idleCall = self.retryCall = self.stallCall = None
+        if self.upstream is not None and self.upstream.transport is not None:
+            self.upstream.transport.loseConnection()
+        self.upstream = None
+        for client in list(self.clients):
+            client.finished = True
+            if client.holdCall is not None and client.holdCall.active():
+                client.holdCall.cancel()
+            try:
+                client.request.finish()
+            except Exception:
+                pass
+        self.clients = []
+
+
+class RelayResource(resource.Resource):
+    isLeaf = True
+
+    def __init__(self, relay):
+        resource.Resource.__init__(self)
+        self.relay = relay
+
+    def render_GET(self, request):
+        parts = request.path.decode("utf-8").strip("/").split("/")
+        session = self.relay.sessions.get(parts[-1]) if len(parts) == 2 and parts[0] == "stream" else None
+        if session is None:
+            request.setResponseCode(404)
+            return b"unknown stream"
+        try:
+            lag = int(request.args.get(b"lag", [b"0"])[0]) / 1000.0
+        except ValueError:
+            lag = 0
+        client = session.addClient(request, lag)
+        request.registerProducer(client, True)
+        request.notifyFinish().addBoth(lambda _: session.removeClient(client))
+        client.flush()
+        return server.NOT_DONE_YET
+
+
+class Relay(object):
+    """Localhost HTTP server plus the relay sessions."""
+
+    def __init__(self):
+        self.sessions = {}
+        self.port = None
+        self.titleListeners = []
+        self.shifts = {}            # url -> seconds behind live after a resume (on top of the delay)
+        self.catchUps = {}          # url -> (shift, started) while playing faster
+
+    def listen(self):
+        if self.port is None:
+            site = server.Site(RelayResource(self))
+            site.noisy = False
+            self.port = reactor.listenTCP(0, site, interface="127.0.0.1")
+            cprint("[IPStreamer] Relay listening on 127.0.0.1:{}".format(self.port.getHost().port))
+        return self.port.getHost().port
+
+    def session(self, url):
+        for session in self.sessions.values():
+            if session.url == url:
+                return session
+        return None
+
+    def localUrl(self, url, delay_sec=0, mirrors=None):
+        """
+        Relay URL for url (starts its session), or url itself if not relayed.
+        The player reading it starts delay_sec behind the live edge.
+        mirrors: further URLs of the same channel, raced against url.
+        """
+        if not is_relay_enabled() or not can_relay(url):
+            return url
+        try:
+            port = self.listen()
+        except Exception as e:
+            cprint("[IPStreamer] Relay unavailable: {}".format(str(e)))
+            return url
+        session = self.session(url)
+        if session is not None and not session.usable():
+            # The relay cannot open this one (TLS, odd server); play it directly
+            cprint("[IPStreamer] Relay gave up, playing directly: {}".format(url))
+            self.closeSession(session)
+            return url
+        if session is None:
+            self.trim()
+            session = RelaySession(self, url, mirrors)
+            self.sessions[session.id] = session
+        else:
+            session.setMirrors(mirrors)
+        lag = (delay_sec or 0) + self.shift(url)
+        return "http://127.0.0.1:{}/stream/{}?lag={}".format(port, session.id, int(lag * 1000))
+
+    def trim(self):
+        """Keep at most MAX_SESSIONS - 1 idle sessions before adding one."""
+        idle = [s for s in self.sessions.values() if not s.clients]
+        while idle and len(self.sessions) >= MAX_SESSIONS:
+            self.closeSession(idle.pop(0))
+
+    def closeSession(self, session):
+        session.close()
+        self.sessions.pop(session.id, None)
+        self.shifts.pop(session.url, None)
+        self.catchUps.pop(session.url, None)
+        cprint("[IPStreamer] Relay closed: {}".format(session.url))
+
+    def stats(self, url):
+        session = self.session(url)
+        return session.stats() if session is not None else None
+
+    def failover(self, url, reason):
+        """Switch url's session to its next mirror; False if it has none."""
+        session = self.session(url)
+        if session is None or len(session.candidates) < 2:
+            return False
+        session.failover(reason)
+        return True
+
+    def pause(self, url):
+        """Pause url's playout into the ring; False if url is not relayed."""
+        session = self.session(url)
+        if session is None or not session.opened:
+            return False
+        self.catchUps.pop(url, None)
+        self.shifts[url] = self.shift(url)
+        session.pause()
+        return True
+
+    def resume(self, url, delay_sec=0):
+        """Place url's next player at the pause point; returns the seconds behind live."""
+        session = self.session(url)
+        if session is None or session.pausedAt is None:
+            return 0
+        behind = session.resume()
+        self.shifts[url] = max(0.0, behind - PREROLL_SECONDS - (delay_sec or 0))
+        return self.shifts[url]
+
+    def heldUntil(self):
+        """When the last delay hold of a connected player ends or ended, 0 if none.
+
+        A held player gets no bytes on purpose; the stream supervisor does
+        not count that time as a stall.
+        """
+        return max([c.holdUntil for s in self.sessions.values() for c in s.clients] or [0])
+
+    def isPaused(self, url):
+        session = self.session(url)
+        return session is not None and session.pausedAt is not None
+
+    def shift(self, url):
+        """Seconds url plays behind live on top of the audio delay."""
+        shift = self.shifts.get(url, 0.0)
+        if url in self.catchUps:
+            start, started = self.catchUps[url]
+            shift = max(0.0, start - (time.time() - started) * (CATCH_UP_TEMPO - 1))
+        return shift
+
+    def catchUp(self, url):
+        """Play url a little faster until it is back at live."""
+        if self.shift(url) > 0:
+            self.catchUps[url] = (self.shift(url), time.time())
+
+    def jumpLive(self, url):
+        self.shifts.pop(url, None)
+        self.catchUps.pop(url, None)
+
+    def tempo(self, url):
+        """Player tempo for url: CATCH_UP_TEMPO while catching up, else None."""
+        return CATCH_UP_TEMPO if url in self.catchUps and self.shift(url) > 0 else None
+
+    def caughtUp(self, url):
+        """True once when a catch-up of url reached live (the player needs its normal tempo)."""
+        if url in self.catchUps and self.shift(url) <= 0:
+            self.jumpLive(url)
+            cprint("[IPStreamer] Caught up with live: {}".format(url))
+            return True
+        return False
+
+    def title(self, url):
+        """Last StreamTitle of url's stream, None if unknown."""
+        session = self.session(url)
+        return session.title if session is not None else None
+
+    def nowPlaying(self):
+        """(url, title) of the stream a player is reading, (None, None) if none."""
+        for session in self.sessions.values():
+            if session.clients:
+                return session.url, session.title
+        return None, None
+
+    def addTitleListener(self, callback):
+        """callback(url, title) whenever a stream's title changes."""
+        if callback not in self.titleListeners:
+            self.titleListeners.append(callback)
+
+    def removeTitleListener(self, callback):
+        if callback in self.titleListeners:
+            self.titleListeners.remove(callback)
+
+    def notifyTitle(self, url, title):
+        for callback in list(self.titleListeners):
+            try:
+                callback(url, title)
+            except Exception as e:
+                cprint("[IPStreamer] Title listener error: {}".format(str(e)))
+
+    def stopAll(self):
+        for session in list(self.sessions.values()):
+            self.closeSession(session)
+
+
+def relay_status_text(url):
+    """Short relay state for the status label, empty when not relayed."""
+    stats = getRelay().stats(url)
+    if not stats:
+        return ""
+    parts = []
+    shift = getRelay().shift(url)
+    if shift >= 1:
+        parts.append("-{}s{}".format(int(shift), " ▸▸" if getRelay().tempo(url) else ""))
+    if stats["fill_seconds"] is not None:
+        parts.append("buf {}s".format(int(stats["fill_seconds"])))
+    if stats["reconnects"]:
+        parts.append("↻{}".format(stats["reconnects"]))
+    if stats["mirror"]:
+        parts.append("mirror {}".format(stats["mirror"] + 1))
+    return " · ".join(parts)
+
+
+def pause_status_text(url):
+    """Status label text while url is paused in the relay."""
+    session = getRelay().session(url)
+    if session is None or session.pausedAt is None:
+        return ""
+    paused = int(time.time() - session.pausedSince)
+    return "❚❚ Paused {}s · buffer {}%".format(paused, int(session.ring.size() * 100 / session.ring.capacity))
+
+
+_relay = None
+
+def getRelay():
+    global _relay
+    if _relay is None:
+        _relay = Relay()
+    return _relay
@@ -0,0 +1,109 @@
+# ring.py
+#
+# Byte rings for the relay (relay.py), addressed by absolute stream offsets.
+#
+# ByteRing keeps the last <capacity> bytes of a stream in memory; FileRing
+# keeps them in a file (pause buffers larger than memory allows). A ring
+# that takes over another one (pause grows the ring) starts at the oldest
+# offset the other one still held: base is that offset, and bytes before
+# it were never in this ring. Like av_calibrate.py it must not import any
+# enigma2 module, so it can be tested offline.
+
+import os
+
+COPY_CHUNK = 65536                  # bytes per copy step in takeOver
+
+
+class ByteRing(object):
+    """Fixed-size byte ring addressed by absolute stream offsets."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buf = bytearray(capacity)
+        self.base = 0       # absolute offset of the first byte this ring got
+        self.end = 0        # absolute offset one past the newest byte
+
+    @property
+    def start(self):
+        """Absolute offset of the oldest byte still held."""
+        return max(self.base, self.end - self.capacity)
+
+    def size(self):
+        return self.end - self.start
+
+    def put(self, pos, data):
+        self.buf[pos:pos + len(data)] = data
+
+    def get(self, pos, size):
+        return bytes(self.buf[pos:pos + size])
+
+    def position(self, offset):
+        return (offset - self.base) % self.capacity
+
+    def write(self, data):
+        if len(data) > self.capacity:
+            skip = len(data) - self.capacity
+            data = data[skip:]
+            self.end += skip
+        pos = self.position(self.end)
+        first = min(len(data), self.capacity - pos)
+        self.put(pos, data[:first])
+        if first < len(data):
+            self.put(0, data[first:])
+        self.end += len(data)
+
+    def read(self, offset, size):
+        offset = max(offset, self.start)
+        size = min(size, self.end - offset)
+        if size <= 0:
+            return b""
+        pos = self.position(offset)
+        first = min(size, self.capacity - pos)
+        data = self.get(pos, first)
+        if first < size:
+            data += self.get(0, size - first)
+        return data
+
+    def takeOver(self, other):
+        """Continue other's stream: same absolute offsets, its held bytes copied."""
+        self.base = self.end = other.start
+        offset = other.start
+        while offset < other.end:
+            chunk = other.read(offset, COPY_CHUNK)
+            self.write(chunk)
+            offset += len(chunk)
+        return self
+
+    def close(self):
+        return
+
+
+class FileRing(ByteRing):
+    """
+    ByteRing in a file, for pause buffers larger than memory allows.
+    The file grows with the stream (positions count from base, so writes
+    are sequential until it wraps) instead of being preallocated: on vfat
+    a truncate to the full size zero-fills it before pause returns.
+    """
+
+    def __init__(self, capacity, path):
+        self.capacity = capacity
+        self.path = path
+        self.base = 0
+        self.end = 0
+        self.file = open(path, "w+b")
+
+    def put(self, pos, data):
+        self.file.seek(pos)
+        self.file.write(data)
+
+    def get(self, pos, size):
+        self.file.seek(pos)
+        return self.file.read(size)
+
+    def close(self):
+        try:
+            self.file.close()
+            os.remove(self.path)
+        except (IOError, OSError):
+            pass
@@ -0,0 +1,319 @@
+# stream_stats.py
+#
+# Background drain of the player's stdout/stderr plus live stream stats.
+#
+# The player pipes are switched to non-blocking and registered with the
+# twisted reactor (which enigma2 runs in its main loop), so they are read
+# as soon as data arrives and a chatty player can never block on a full
+# pipe. Every line goes to a small ring buffer for diagnostics and through
+# a parser that fills a StreamStats object:
+#   ffmpeg    -progress key=value lines on stdout, stream info on stderr
+#   gst       -t tag lines on stdout
+#   engine    JSON events (handled by the live control, see player_control)
+# Network throughput comes from the process' own read counter
+# (/proc/<pid>/io rchar), so it needs no extra connection.
+
+import errno
+import fcntl
+import os
+import re
+import time
+from collections import deque
+
+from twisted.internet import reactor
+
+from Plugins.Extensions.IPStreamer.player_cmd import mark_first_audio
+
+REDC = "**"
+ENDC = "**"
+
+def cprint(text):
+    print(REDC + text + ENDC)
+
+
+LINES_MAX = 200
+READ_SIZE = 65536
+
+RE_FF_INPUT = re.compile(r"^Input #\d+, ([\w,]+), from ")
+RE_FF_STREAM = re.compile(r"Stream #\d+:(\d+)")
+RE_FF_MAPPING = re.compile(r"^\s*Stream #\d+:(\d+) -> #\d+:\d+")
+RE_FF_SILENCE = re.compile(r"\] silence_(start|end):")
+RE_FF_VIDEO = re.compile(r"Stream #\d+:\d+.*?: Video: ")
+RE_FF_AUDIO = re.compile(r"Stream #\d+:\d+.*?: Audio: (\w+)[^,]*, (\d+) Hz, ([^,]+)(?:, [^,]+)?(?:, (\d+) kb/s)?")
+RE_FF_BITRATE = re.compile(r"Duration: .*bitrate: (\d+) kb/s")
+RE_GST_TAG = re.compile(r"^\s*(audio codec|nominal bitrate|bitrate|channel-mode)\s*:\s*(.+)$")
+
+
+class StreamStats(object):
+    """What is known about the playing stream, updated as output arrives."""
+
+    def __init__(self, pid=None):
+        self.pid = pid
+        self.started = time.time()
+        self.lines = deque(maxlen=LINES_MAX)
+        self.container = None        # input format (demuxer) name
+        self.codec = None
+        self.sampleRate = None
+        self.channels = None
+        self.audioStreams = []       # (stream index, codec, rate, channels) of the input
+        self.audioTrack = None       # which of audioStreams the player decodes
+        self.videoStreams = 0        # video streams in the input (read and dropped)
+        self.bitrate = None          # declared stream bitrate, kb/s
+        self.speed = None
+        self.outTime = None          # seconds of audio played
+        self.bytesIn = 0             # bytes read by the player so far
+        self.throughput = None       # measured input rate, kb/s
+        self.lastProgress = self.started
+        self.silent = False          # silencedetect reported silence (cleared by the reader)
+        self.ioSample = None
+        self.inputSection = False
+
+    def addLine(self, source, line):
+        self.lines.append("{} {}".format(source, line))
+
+    def tail(self, count=20):
+        return list(self.lines)[-count:]
+
+    def update(self, **fields):
+        for key, value in fields.items():
+            if value is not None:
+                setattr(self, key, value)
+
+    def progress(self):
+        """Note that the player made progress (data or playback time moved)."""
+        self.lastProgress = time.time()
+
+    def sampleIO(self):
+        """Refresh bytesIn/throughput from /proc/<pid>/io; cheap, call from a timer."""
+        if not self.pid:
+            return
+        try:
+            with open("/proc/{}/io".format(self.pid)) as f:
+                for line in f:
+                    if line.startswith("rchar:"):
+                        rchar = int(line.split()[1])
+                        break
+                else:
+                    return
+        except (IOError, OSError, ValueError):
+            return
+        now = time.time()
+        if self.ioSample is not None:
+            last_time, last_bytes = self.ioSample
+            if now > last_time and rchar >= last_bytes:
+                self.throughput = int((rchar - last_bytes) * 8 / 1000.0 / (now - last_time))
+            if rchar > last_bytes:
+                self.progress()
+        self.ioSample = (now, rchar)
+        self.bytesIn = rchar
+
+    def stalledFor(self):
+        return time.time() - self.lastProgress
+
+    def statusText(self):
+        """Short text for the network status label."""
+        parts = []
+        if self.bitrate:
+            parts.append("{}kb/s".format(self.bitrate))
+        if self.codec:
+            parts.append(self.codec)
+        if self.sampleRate:
+            parts.append("{}kHz".format(self.sampleRate // 1000 if self.sampleRate % 1000 == 0 else self.sampleRate / 1000.0))
+        if self.throughput is not None:
+            parts.append("in {}kb/s".format(self.throughput))
+        return " · ".join(parts)
+
+
+def parse_ffmpeg_line(stats, process, line):
+    """ffmpeg: -progress key=value lines and the stream info banner."""
+    if "=" in line and " " not in line.strip():
+        key, value = line.strip().split("=", 1)
+        if key == "out_time_us" or key == "out_time_ms":
+            # out_time_ms is in microseconds as well (long-standing ffmpeg quirk)
+            try:
+                out_time = int(value) / 1000000.0
+            except ValueError:
+                return
+            if out_time > 0:
+                if stats.outTime is None or out_time > stats.outTime:
+                    stats.progress()
+                stats.outTime = out_time
+                mark_first_audio(process)
+        elif key == "speed":
+            try:
+                stats.speed = float(value.rstrip("x"))
+            except ValueError:
+                pass
+        return
+
+    match = RE_FF_SILENCE.search(line)
+    if match:
+        stats.silent = match.group(1) == "start"
+        return
+
+    # Only the input streams describe the network stream; the output
+    # section lists the PCM sent to ALSA.
+    if line.startswith("Input #"):
+        stats.inputSection = True
+        match = RE_FF_INPUT.match(line)
+        if match:
+            stats.container = match.group(1)
+        return
+    if line.startswith("Output #"):
+        stats.inputSection = False
+        return
+    if not stats.inputSection:
+        return
+
+    match = RE_FF_AUDIO.search(line)
+    if match:
+        stats.update(codec=match.group(1), sampleRate=int(match.group(2)), channels=match.group(3).strip())
+        if match.group(4):
+            stats.bitrate = int(match.group(4))
+        stream = RE_FF_STREAM.search(line)
+        if stream:
+            stats.audioStreams.append((int(stream.group(1)), stats.codec, stats.sampleRate, stats.channels))
+        return
+    if RE_FF_VIDEO.search(line):
+        stats.videoStreams += 1
+        return
+    # "Stream #0:2 -> #0:0 (...)": the audio stream ffmpeg picked
+    match = RE_FF_MAPPING.match(line)
+    if match and stats.audioTrack is None:
+        index = int(match.group(1))
+        for track, (stream, codec, rate, channels) in enumerate(stats.audioStreams):
+            if stream == index:
+                stats.update(audioTrack=track, codec=codec, sampleRate=rate, channels=channels)
+                break
+        return
+    match = RE_FF_BITRATE.search(line)
+    if match and not stats.bitrate:
+        stats.bitrate = int(match.group(1))
+
+
+def parse_gst_line(stats, process, line):
+    """gst-launch-1.0 -t: tag lines and pipeline state messages."""
+    match = RE_GST_TAG.match(line)
+    if match:
+        key, value = match.group(1), match.group(2).strip()
+        if key == "audio codec":
+            stats.codec = value
+        elif key in ("bitrate", "nominal bitrate"):
+            try:
+                stats.bitrate = int(value) // 1000
+            except ValueError:
+                pass
+        return
+    if line.startswith("Setting pipeline to PLAYING") or line.startswith("New clock"):
+        mark_first_audio(process)
+
+
+def parser_for(command):
+    if os.path.basename(command.binary or "").startswith("ffmpeg"):
+        return parse_ffmpeg_line
+    return parse_gst_line
+
+
+class PipeReader(object):
+    """IReadDescriptor for one non-blocking player pipe."""
+
+    def __init__(self, pipe, onLine, onClose=None):
+        self.pipe = pipe
+        self.fd = pipe.fileno()
+        self.onLine = onLine
+        self.onClose = onClose
+        self.pending = b""
+        self.closed = False
+        flags = fcntl.fcntl(self.fd, fcntl.F_GETFL)
+        fcntl.fcntl(self.fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+
+    def fileno(self):
+        return -1 if self.closed else self.fd
+
+    def logPrefix(self):
+        return "IPStreamerPipe"
+
+    def doRead(self):
+        while True:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                    return
+                data = b""
+            if not data:
+                self.close()
+                return
+            self.pending += data
+            # ffmpeg status lines end in \r, everything else in \n
+            lines = re.split(b"[\r\n]", self.pending)
+            self.pending = lines.pop()
+            for line in lines:
+                if line:
+                    self.onLine(line.decode("utf-8", "ignore"))
+
+    def connectionLost(self, reason):
+        self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        reactor.removeReader(self)
+        self.closed = True
+        try:
+            self.pipe.close()
+        except Exception:
+            pass
+        if self.onClose:
+            self.onClose()
+
+
+class PlayerMonitor(object):
+    """
+    Drains a launched player's pipes into StreamStats.
+    stdoutHandler, when given, takes over stdout lines (live controls that
+    talk to their player over stdout); everything else goes to the parser.
+    """
+
+    def __init__(self, process, parser, stdoutHandler=None):
+        self.process = process
+        self.stats = StreamStats(process.pid)
+        self.parser = parser
+        self.stdoutHandler = stdoutHandler
+        self.readers = []
+        if process.stdout is not None:
+            self.readers.append(PipeReader(process.stdout, self.onStdout))
+        if process.stderr is not None:
+            self.readers.append(PipeReader(process.stderr, self.onStderr))
+        for reader in self.readers:
+            reactor.addReader(reader)
+
+    def onStdout(self, line):
+        self.stats.addLine("out", line)
+        if self.stdoutHandler is not None:
+            self.stdoutHandler(line, self.stats)
+        else:
+            self.parse(line)
+
+    def onStderr(self, line):
+        self.stats.addLine("err", line)
+        self.parse(line)
+
+    def parse(self, line):
+        try:
+            self.parser(self.stats, self.process, line)
+        except Exception as e:
+            cprint("[IPStreamer] Stats parse error: {}".format(str(e)))
+
+    def sample(self):
+        self.stats.sampleIO()
+        return self.stats
+
+    def dumpTail(self, count=20):
+        for line in self.stats.tail(count):
+            cprint("[IPStreamer] player> {}".format(line))
+
+    def stop(self):
+        for reader in self.readers:
+            reader.close()
+        self.readers = []
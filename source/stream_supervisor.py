@@ -0,0 +1,308 @@
+# stream_supervisor.py
+#
+# Keeps the directly launched player alive.
+#
+# The supervisor watches the PlayerMonitor of the running player once a
+# second. A player that exited, or that made no progress (no bytes read,
+# playback time not moving) for longer than stallTimeout, counts as failed
+# and is relaunched through the screen's restart callback. That callback
+# rebuilds the command from the current config, so audio delay and volume
+# are kept. Retries back off exponentially with jitter and the count
+# resets after a stretch of healthy playback.
+#
+# A netlink socket reports network link changes as they happen: while no
+# link is up, retries are paused, and when a link (or an address) comes
+# back a stalled stream is reconnected at once instead of waiting for the
+# next backoff step.
+
+import random
+import socket
+import struct
+import time
+
+from twisted.internet import reactor
+from twisted.internet.task import LoopingCall
+
+from Components.config import config
+from Plugins.Extensions.IPStreamer.relay import getRelay
+
+REDC = "**"
+ENDC = "**"
+
+def cprint(text):
+    print(REDC + text + ENDC)
+
+
+CHECK_INTERVAL = 1.0
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+STABLE_RESET = 30.0     # healthy seconds after which retries count from 0 again
+LINK_STALL = 2.0        # gap that is reconnected right away when a link comes up
+
+# linux/netlink.h, linux/rtnetlink.h
+NETLINK_ROUTE = 0
+NLMSG_DONE = 3
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+IFF_UP = 0x1
+IFF_LOOPBACK = 0x8
+IFF_RUNNING = 0x40
+
+
+def get_stall_timeout():
+    """Seconds without progress before a reconnect (0 = supervisor off)."""
+    try:
+        return int(config.plugins.IPStreamer.stallTimeout.value)
+    except Exception:
+        return 0
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with equal jitter: half fixed, half random."""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+    return delay / 2.0 + random.uniform(0, delay / 2.0)
+
+
+class LinkMonitor(object):
+    """rtnetlink listener registered with the reactor; calls listeners(up)."""
+
+    def __init__(self):
+        self.sock = None
+        self.links = {}
+        self.listeners = []
+        self.dumping = False
+        self.reported = True
+
+    def isUp(self):
+        # Unknown state (no netlink, nothing reported yet) counts as up
+        if not self.links:
+            return True
+        return any(self.links.values())
+
+    def addListener(self, callback):
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+        self.open()
+
+    def removeListener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def open(self):
+        if self.sock is not None:
+            return
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+            sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR))
+            sock.setblocking(False)
+            # Ask for the current links so isUp() is right from the start
+            sock.send(struct.pack("=LHHLLB3x", 20, RTM_GETLINK, NLM_F_REQUEST | NLM_F_DUMP, 1, 0, socket.AF_UNSPEC))
+        except Exception as e:
+            cprint("[IPStreamer] Link monitor unavailable: {}".format(str(e)))
+            return
+        self.sock = sock
+        self.dumping = True
+        reactor.addReader(self)
+
+    def fileno(self):
+        return self.sock.fileno() if self.sock is not None else -1
+
+    def logPrefix(self):
+        return "IPStreamerLink"
+
+    def connectionLost(self, reason):
+        self.close()
+
+    def doRead(self):
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except (socket.error, OSError):
+                return
+            if not data:
+                return
+            self.parse(data)
+
+    def parse(self, data):
+        address = False
+        offset = 0
+        while offset + 16 <= len(data):
+            length, msg_type, flags, seq, pid = struct.unpack_from("=LHHLL", data, offset)
+            if length < 16:
+                break
+            if msg_type in (RTM_NEWLINK, RTM_DELLINK) and offset + 32 <= len(data):
+                family, if_type, index, if_flags, change = struct.unpack_from("=BxHiII", data, offset + 16)
+                if msg_type == RTM_DELLINK:
+                    self.links.pop(index, None)
+                elif not if_flags & IFF_LOOPBACK:
+                    self.links[index] = bool(if_flags & IFF_UP and if_flags & IFF_RUNNING)
+            elif msg_type == RTM_NEWADDR:
+                address = True
+            elif msg_type == NLMSG_DONE:
+                self.dumping = False
+            offset += (length + 3) & ~3
+        if self.dumping:
+            # The initial link dump arrives in several parts; judge it whole
+            return
+        up = self.isUp()
+        if up != self.reported or (address and up):
+            self.reported = up
+            cprint("[IPStreamer] Network link {}".format("up" if up else "down"))
+            for callback in list(self.listeners):
+                try:
+                    callback(up)
+                except Exception as e:
+                    cprint("[IPStreamer] Link listener error: {}".format(str(e)))
+
+    def close(self):
+        if self.sock is not None:
+            reactor.removeReader(self)
+            try:
+                self.sock.close()
+            except Exception:
+                pass
+            self.sock = None
+
+
+class StreamSupervisor(object):
+    """Restarts the watched player after exit or stall, with backoff."""
+
+    def __init__(self):
+        self.monitor = None
+        self.restart = None
+        self.attempt = 0
+        self.pending = None
+        self.waiting = False
+        self.started = 0
+        self.state = ""
+        self.checker = LoopingCall(self.check)
+
+    def watch(self, monitor, restart, fresh=True):
+        """
+        Supervise monitor (PlayerMonitor of the new player, None if it did
+        not start). restart() relaunches the stream. fresh=False when this
+        is one of our own reconnects, so the backoff keeps counting.
+        """
+        if get_stall_timeout() <= 0:
+            self.stop()
+            return
+        self.cancelPending()
+        if fresh:
+            self.attempt = 0
+        self.monitor = monitor
+        self.restart = restart
+        self.started = time.time()
+        self.waiting = False
+        self.state = ""
+        getLinkMonitor().addListener(self.linkChanged)
+        if not self.checker.running:
+            self.checker.start(CHECK_INTERVAL, now=False)
+        if monitor is None:
+            self.failed("player did not start")
+
+    def check(self):
+        if self.pending is not None or self.waiting or self.monitor is None:
+            return
+        process = self.monitor.process
+        stats = self.monitor.sample()
+        if process.poll() is not None:
+            self.failed("player exited ({})".format(process.returncode))
+        elif min(stats.stalledFor(), time.time() - getRelay().heldUntil()) > get_stall_timeout():
+            # A player the relay holds back for its delay is not stalled
+            self.failed("no data for {}s".format(int(stats.stalledFor())))
+        elif self.attempt and time.time() - self.started > STABLE_RESET:
+            cprint("[IPStreamer] Stream stable again, reset reconnect backoff")
+            self.attempt = 0
+
+    def failed(self, reason):
+        if not getLinkMonitor().isUp():
+            cprint("[IPStreamer] Stream failed ({}), waiting for network".format(reason))
+            self.waiting = True
+            self.state = "↻ Waiting for network"
+            return
+        delay = backoff_delay(self.attempt)
+        self.attempt += 1
+        cprint("[IPStreamer] Stream failed ({}), reconnect #{} in {:.1f}s".format(reason, self.attempt, delay))
+        self.state = "↻ Reconnecting ({})".format(self.attempt)
+        self.pending = reactor.callLater(delay, self.reconnect)
+
+    def reconnect(self):
+        self.pending = None
+        self.waiting = False
+        restart = self.restart
+        if restart is None:
+            return
+        try:
+            restart()
+        except Exception as e:
+            cprint("[IPStreamer] Reconnect failed: {}".format(str(e)))
+            self.monitor = None
+            self.failed("restart error")
+
+    def linkChanged(self, up):
+        if self.restart is None:
+            return
+        if not up:
+            # Retrying now is pointless; resume when a link comes back
+            self.cancelPending()
+            self.waiting = True
+            self.state = "↻ Waiting for network"
+            return
+        affected = self.waiting or self.pending is not None or self.monitor is None
+        if not affected:
+            affected = self.monitor.process.poll() is not None or \
+                self.monitor.sample().stalledFor() > LINK_STALL
+        if affected:
+            cprint("[IPStreamer] Network back, reconnecting now")
+            self.cancelPending()
+            self.attempt = 0
+            self.reconnect()
+
+    def statusText(self):
+        """Reconnect state for the status label, empty while all is well."""
+        if self.pending is not None or self.waiting:
+            return self.state
+        return ""
+
+    def cancelPending(self):
+        if self.pending is not None:
+            try:
+                self.pending.cancel()
+            except Exception:
+                pass
+            self.pending = None
+
+    def stop(self):
+        """Stop supervising (user stopped playback or switched to the pool)."""
+        self.cancelPending()
+        if self.checker.running:
+            self.checker.stop()
+        getLinkMonitor().removeListener(self.linkChanged)
+        self.monitor = None
+        self.restart = None
+        self.waiting = False
+        self.attempt = 0
+        self.state = ""
+
+
+_linkMonitor = None
+_supervisor = None
+
+def getLinkMonitor():
+    global _linkMonitor
+    if _linkMonitor is None:
+        _linkMonitor = LinkMonitor()
+    return _linkMonitor
+
+
+def getSupervisor():
+    global _supervisor
+    if _supervisor is None:
+        _supervisor = StreamSupervisor()
+    return _supervisor
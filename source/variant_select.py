@@ -0,0 +1,264 @@
+# variant_select.py
+#
+# Automatic choice between quality variants of one channel.
+#
+# Providers publish the same channel several times ("LOW SPORTS 3",
+# "VIP SPORTS 3", "4k SPORTS 3"). When a provider list is converted the
+# entries are grouped: variant_group / variant keys in the playlist JSON.
+# While a variant plays, the selector keeps per-variant history:
+#   - the bitrate the player reported,
+#   - rebuffers (the stream supervisor reconnected after audio had played),
+#   - throughput of short background downloads of the next variant up.
+# A rebuffer steps down one variant at once. Stepping up is opt-in
+# (variantProbe, off by default): after a quiet spell the next variant up
+# is downloaded for a few seconds while the current one keeps playing; if
+# it arrives at least as fast as it plays, the player steps up. That is a
+# second connection on the same account, which providers with a limit of
+# one connection answer by dropping the playing stream.
+# A new start takes the highest variant the line is known to carry. The
+# user picks the channel, the selector picks the quality.
+
+import re
+import threading
+import time
+
+from twisted.internet import reactor
+
+from Components.config import config
+from Plugins.Extensions.IPStreamer.health_scan import open_stream
+
+REDC = "**"
+ENDC = "**"
+
+def cprint(text):
+    print(REDC + text + ENDC)
+
+
+VARIANT_ORDER = ("low", "vip", "4k")    # lowest quality first
+RE_VARIANT = re.compile(r"^(LOW|VIP|4k)\s+(.+)$", re.I)
+
+REBUFFER_WINDOW = 600       # seconds a rebuffer counts against a variant
+STEP_UP_AFTER = 120         # clean seconds before the next variant up is tried
+PROBE_SECONDS = 6           # length of the background download
+KEEP_UP = 0.95              # probe rate / bitrate needed to step up
+HEADROOM = 1.2              # measured capacity / bitrate needed to start a variant
+UNKNOWN_STEP = 1.5          # assumed bitrate ratio to an unmeasured variant up
+
+
+def is_auto_variant_enabled():
+    try:
+        return bool(config.plugins.IPStreamer.autoVariant.value)
+    except Exception:
+        return False
+
+
+def is_variant_probe_enabled():
+    try:
+        return bool(config.plugins.IPStreamer.variantProbe.value)
+    except Exception:
+        return False
+
+
+def variant_of(name):
+    """(group, quality) for a "VIP SPORTS 3" style name, None otherwise."""
+    match = RE_VARIANT.match(name.strip())
+    if not match:
+        return None
+    return match.group(2).strip().upper(), match.group(1).lower()
+
+
+def note_variant(ch, groups):
+    """First pass: collect the qualities of each variant group in groups (bit mask)."""
+    variant = variant_of(ch.get("channel", ""))
+    if variant and variant[1] in VARIANT_ORDER:
+        groups[variant[0]] = groups.get(variant[0], 0) | 1 << VARIANT_ORDER.index(variant[1])
+
+
+def tag_variant(ch, groups):
+    """Second pass: tag ch if its group has at least two qualities (in place)."""
+    variant = variant_of(ch.get("channel", ""))
+    mask = groups.get(variant[0], 0) if variant else 0
+    if mask & (mask - 1):
+        ch["variant_group"] = variant[0]
+        ch["variant"] = variant[1]
+
+
+def measure_throughput(url, seconds=PROBE_SECONDS):
+    """(kb/s, declared icy-br or None) of a short download of url."""
+    sock, code, headers, body, ttfb_ms = open_stream(url)
+    try:
+        if code != 200:
+            raise IOError("HTTP {}".format(code))
+        received = len(body)
+        started = time.time()
+        while time.time() - started < seconds:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            received += len(chunk)
+        elapsed = max(0.1, time.time() - started)
+        icy_br = headers.get("icy-br", "").split(",")[0]
+        return int(received * 8 / 1000.0 / elapsed), (int(icy_br) if icy_br.isdigit() else None)
+    finally:
+        try:
+            sock.close()
+        except Exception:
+            pass
+
+
+class VariantSelector(object):
+    """Variant sets of the loaded playlists plus what was measured on them."""
+
+    def __init__(self):
+        self.variants = {}          # url -> (group, quality)
+        self.groups = {}            # group -> {quality: url}
+        self.bitrates = {}          # url -> kb/s as played
+        self.rebuffers = {}         # url -> [time, ...]
+        self.capacity = None        # estimated line throughput, kb/s
+        self.playing = None
+        self.playingSince = 0
+        self.probing = None
+        self.lastProbe = {}         # url -> time of its last background download
+        self.upgrade = None         # (from url, to url) once a probe passed
+
+    def load(self, entries):
+        """Register the variant keys of playlist entries."""
+        for ch in entries:
+            group, quality = ch.get("variant_group"), ch.get("variant")
+            url = ch.get("url")
+            if group and quality in VARIANT_ORDER and url:
+                self.variants[str(url)] = (group, quality)
+                self.groups.setdefault(group, {})[quality] = str(url)
+
+    def ladder(self, url):
+        """URLs of url's variant set, lowest quality first ([url] if it has none)."""
+        variant = self.variants.get(url)
+        if variant is None:
+            return [url]
+        members = self.groups.get(variant[0], {})
+        return [members[q] for q in VARIANT_ORDER if q in members]
+
+    def label(self, url):
+        variant = self.variants.get(url)
+        return variant[1].upper() if variant and len(self.ladder(url)) > 1 else ""
+
+    def recentRebuffers(self, url):
+        now = time.time()
+        recent = [t for t in self.rebuffers.get(url, []) if now - t < REBUFFER_WINDOW]
+        self.rebuffers[url] = recent
+        return len(recent)
+
+    def fits(self, url):
+        """True/False if history says the line carries url, None if unknown."""
+        if self.recentRebuffers(url):
+            return False
+        bitrate = self.bitrates.get(url)
+        if bitrate is None or self.capacity is None:
+            return None
+        return bitrate * HEADROOM <= self.capacity
+
+    def choose(self, url):
+        """
+        Variant to start for the channel at url: the highest one history
+        says fits; url itself when nothing is known about the others.
+        """
+        ladder = self.ladder(url)
+        if len(ladder) < 2 or not is_auto_variant_enabled():
+            self.started(url)
+            return url
+        best = None
+        for candidate in ladder:
+            fit = self.fits(candidate)
+            if fit or (fit is None and candidate == url):
+                best = candidate
+        best = best or ladder[0]
+        if best != url:
+            cprint("[IPStreamer] Variant {} instead of {}".format(self.label(best), self.label(url)))
+        self.started(best)
+        return best
+
+    def started(self, url):
+        if url != self.playing:
+            self.playing = url
+            self.playingSince = time.time()
+        self.upgrade = None
+
+    def rebuffered(self, url):
+        """The playing variant rebuffered; returns the variant to step down to, or None."""
+        self.rebuffers.setdefault(url, []).append(time.time())
+        self.playingSince = time.time()
+        bitrate = self.bitrates.get(url)
+        if bitrate is not None:
+            # The line did not carry this one
+            self.capacity = min(self.capacity, bitrate) if self.capacity is not None else bitrate
+        if not is_auto_variant_enabled():
+            return None
+        ladder = self.ladder(url)
+        index = ladder.index(url) if url in ladder else 0
+        if index == 0:
+            return None
+        cprint("[IPStreamer] Variant {} rebuffered, stepping down".format(self.label(url)))
+        return ladder[index - 1]
+
+    def poll(self, url, stats):
+        """
+        Called while url plays with its StreamStats. Starts background
+        downloads of the next variant up when due; returns that variant
+        once one showed the line carries it, else None.
+        """
+        if stats.bitrate:
+            self.bitrates[url] = stats.bitrate
+        if url != self.playing or not is_auto_variant_enabled():
+            return None
+        if self.upgrade is not None and self.upgrade[0] == url:
+            higher = self.upgrade[1]
+            self.upgrade = None
+            return higher
+        ladder = self.ladder(url)
+        index = ladder.index(url) if url in ladder else len(ladder)
+        if index + 1 >= len(ladder) or self.probing is not None or not is_variant_probe_enabled():
+            return None
+        higher = ladder[index + 1]
+        now = time.time()
+        if now - self.playingSince < STEP_UP_AFTER or now - self.lastProbe.get(higher, 0) < STEP_UP_AFTER:
+            return None
+        if self.recentRebuffers(higher):
+            return None
+        self.probing = higher
+        self.lastProbe[higher] = now
+        thread = threading.Thread(target=self.probe, args=(url, higher))
+        thread.daemon = True
+        thread.start()
+        return None
+
+    def probe(self, current, higher):
+        try:
+            rate, icy_br = measure_throughput(higher)
+        except Exception as e:
+            cprint("[IPStreamer] Variant probe failed: {}".format(str(e)))
+            rate, icy_br = None, None
+        reactor.callFromThread(self.probed, current, higher, rate, icy_br)
+
+    def probed(self, current, higher, rate, icy_br):
+        self.probing = None
+        if rate is None:
+            return
+        if icy_br and higher not in self.bitrates:
+            self.bitrates[higher] = icy_br
+        current_rate = self.bitrates.get(current)
+        # Both streams flowed at once; the line carries at least their sum
+        carried = rate + (current_rate or 0)
+        self.capacity = carried if self.capacity is None else max(carried, (self.capacity + carried) / 2.0)
+        need = self.bitrates.get(higher) or (current_rate * UNKNOWN_STEP if current_rate else None)
+        cprint("[IPStreamer] Variant probe {}: {} kb/s (needs {})".format(self.label(higher), rate, need))
+        if need and rate >= need * KEEP_UP and self.playing == current:
+            self.upgrade = (current, higher)
+
+
+_selector = None
+
+def getVariantSelector():
+    global _selector
+    if _selector is None:
+        _selector = VariantSelector()
+    return _selector
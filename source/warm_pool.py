@@ -0,0 +1,278 @@
+# warm_pool.py
+#
+# Warm decoder pool for fast channel switching.
+#
+# Every pooled stream runs its own decoder process (gst-launch-1.0 or ffmpeg)
+# that writes raw PCM to stdout. One long-lived sink process owns ALSA and
+# reads PCM from stdin. A reader thread per decoder forwards PCM to the sink
+# while that decoder is active, and keeps only the last couple of seconds
+# while it is parked. Switching channel just changes which decoder feeds the
+# sink, so an already connected and buffered stream is heard immediately.
+
+import subprocess
+import threading
+from collections import deque
+
+from Components.config import config
+from Plugins.Extensions.IPStreamer.ffmpeg_wrapper import build_ffmpeg_decoder_cmd, build_ffmpeg_sink_cmd
+from Plugins.Extensions.IPStreamer.gst_wrapper import build_gst_decoder_cmd, build_gst_sink_cmd
+from Plugins.Extensions.IPStreamer.lifecycle import getProcessManager
+from Plugins.Extensions.IPStreamer.player_cmd import launch, mark_first_audio
+from Plugins.Extensions.IPStreamer.player_control import get_audio_delay
+from Plugins.Extensions.IPStreamer.stream_stats import StreamStats
+
+REDC = "**"
+ENDC = "**"
+
+def cprint(text):
+    print(REDC + text + ENDC)
+
+
+PCM_RATE = 48000
+PCM_CHANNELS = 2
+PCM_BYTES_PER_SEC = PCM_RATE * PCM_CHANNELS * 2
+CHUNK_SIZE = 4096
+PARKED_SECONDS = 2
+RECENTS_MAX = 4
+
+
+def use_gst():
+    return config.plugins.IPStreamer.player.value.startswith("gst")
+
+
+def get_pool_size():
+    """Number of extra decoders kept warm next to the playing one (0 = off)."""
+    try:
+        return int(config.plugins.IPStreamer.warmPoolSize.value)
+    except Exception:
+        return 0
+
+
+def is_pool_enabled():
+    return get_pool_size() > 0
+
+
+def neighbour_urls(entries, index):
+    """URLs around index in a [name, url] list, nearest first."""
+    urls = []
+    for offset in (1, -1, 2, -2):
+        pos = index + offset
+        if 0 <= pos < len(entries):
+            urls.append(entries[pos][1])
+    return urls
+
+
+class WarmDecoder(object):
+    """One decoder process plus the thread that drains its PCM output."""
+
+    def __init__(self, pool, url):
+        self.pool = pool
+        self.url = url
+        self.parked = deque(maxlen=max(1, (PCM_BYTES_PER_SEC * PARKED_SECONDS) // CHUNK_SIZE))
+        self.process = None
+        self.thread = None
+        self.stopped = False
+        self.stats = None
+
+    def start(self):
+        if use_gst():
+            cmd = build_gst_decoder_cmd(self.url, PCM_RATE, PCM_CHANNELS)
+        else:
+            cmd = build_ffmpeg_decoder_cmd(self.url, PCM_RATE, PCM_CHANNELS)
+        self.process = launch(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self.stats = StreamStats(self.process.pid)
+        cprint("[IPStreamer] Warm decoder started PID {} for {}".format(self.process.pid, self.url))
+        self.thread = threading.Thread(target=self.readLoop, name="IPStreamerWarmDecoder")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def readLoop(self):
+        stdout = self.process.stdout
+        while not self.stopped:
+            try:
+                chunk = stdout.read(CHUNK_SIZE)
+            except Exception:
+                break
+            if not chunk:
+                break
+            self.pool.deliver(self, chunk)
+        cprint("[IPStreamer] Warm decoder finished for {}".format(self.url))
+
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self):
+        self.stopped = True
+        if self.process is not None:
+            getProcessManager().stop(self.process)
+            try:
+                self.process.stdout.close()
+            except Exception:
+                pass
+        self.parked.clear()
+
+
+class WarmPool(object):
+    """Keeps the current stream and its neighbours decoding, one sink for ALSA."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.writeLock = threading.Lock()
+        self.decoders = {}
+        self.active = None
+        self.sink = None
+        self.sinkKey = None
+        self.recents = deque(maxlen=RECENTS_MAX)
+
+    def sinkSettings(self):
+        return (
+            config.plugins.IPStreamer.player.value,
+            config.plugins.IPStreamer.sync.value,
+            get_audio_delay(),
+            config.plugins.IPStreamer.volLevel.value,
+            config.plugins.IPStreamer.equalizer.value,
+        )
+
+    def ensureSink(self):
+        """(Re)start the ALSA sink when missing or when audio settings changed."""
+        key = self.sinkSettings()
+        if self.sink is not None and self.sink.poll() is None and key == self.sinkKey:
+            return
+        self.stopSink()
+        delay_sec = max(0, get_audio_delay())
+        vol_level = config.plugins.IPStreamer.volLevel.value
+        if use_gst():
+            cmd = build_gst_sink_cmd(delay_sec, vol_level, PCM_RATE, PCM_CHANNELS)
+        else:
+            cmd = build_ffmpeg_sink_cmd(delay_sec, vol_level, PCM_RATE, PCM_CHANNELS)
+        self.sink = launch(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            bufsize=0
+        )
+        self.sinkKey = key
+        cprint("[IPStreamer] Warm pool sink started PID {}".format(self.sink.pid))
+
+    def stopSink(self):
+        if self.sink is not None:
+            try:
+                self.sink.stdin.close()
+            except Exception:
+                pass
+            getProcessManager().stop(self.sink)
+        self.sink = None
+        self.sinkKey = None
+
+    def deliver(self, decoder, chunk):
+        """
+        Called from decoder threads with a fresh block of PCM.
+        A decoder that just became active first flushes what it buffered
+        while parked, so the flush never runs on the UI thread.
+        """
+        with self.lock:
+            if decoder is not self.active:
+                decoder.parked.append(chunk)
+                return
+            backlog = list(decoder.parked)
+            decoder.parked.clear()
+        backlog.append(chunk)
+        with self.writeLock:
+            for block in backlog:
+                if not self.writeSink(block):
+                    return
+        mark_first_audio(decoder.process)
+
+    def writeSink(self, chunk):
+        sink = self.sink
+        if sink is None:
+            return False
+        try:
+            sink.stdin.write(chunk)
+            return True
+        except Exception:
+            # Sink died (ALSA busy, killed externally). Next play() restarts it.
+            return False
+
+    def play(self, url, neighbours=None):
+        """Make url the audible stream and keep neighbours/recents warm."""
+        self.ensureSink()
+
+        decoder = self.decoders.get(url)
+        if decoder is not None and not decoder.running():
+            decoder.stop()
+            decoder = None
+        warm = decoder is not None
+        if decoder is None:
+            decoder = WarmDecoder(self, url)
+            self.decoders[url] = decoder
+            decoder.start()
+
+        with self.lock:
+            if warm:
+                decoder.process.launch_timing.restart()
+            self.active = decoder
+
+        cprint("[IPStreamer] Warm pool switched to {} ({})".format(url, "warm" if warm else "cold"))
+
+        if url in self.recents:
+            self.recents.remove(url)
+        self.recents.appendleft(url)
+        self.prefetch(neighbours or [])
+        return warm
+
+    def prefetch(self, neighbours):
+        """Start decoders for the wanted set and stop everything else."""
+        size = get_pool_size()
+        wanted = []
+        for url in list(neighbours) + list(self.recents):
+            if url and url != self.active.url and url not in wanted:
+                wanted.append(url)
+        wanted = wanted[:size]
+
+        for url in list(self.decoders.keys()):
+            if url != self.active.url and url not in wanted:
+                self.decoders.pop(url).stop()
+
+        for url in wanted:
+            decoder = self.decoders.get(url)
+            if decoder is None or not decoder.running():
+                decoder = WarmDecoder(self, url)
+                self.decoders[url] = decoder
+                try:
+                    decoder.start()
+                except Exception as e:
+                    cprint("[IPStreamer] Warm decoder failed for {}: {}".format(url, str(e)))
+                    self.decoders.pop(url, None)
+
+    def activeStats(self):
+        """StreamStats (byte counter only) of the audible decoder, or None."""
+        decoder = self.active
+        if decoder is None or decoder.stats is None:
+            return None
+        decoder.stats.sampleIO()
+        return decoder.stats
+
+    def isPlaying(self):
+        return self.active is not None and self.active.running() and \
+            self.sink is not None and self.sink.poll() is None
+
+    def stop(self):
+        """Stop every decoder and the sink."""
+        with self.lock:
+            self.active = None
+        for decoder in self.decoders.values():
+            decoder.stop()
+        self.decoders = {}
+        self.stopSink()
+        cprint("[IPStreamer] Warm pool stopped")
+
+
+_pool = None
+
+def getWarmPool():
+    global _pool
+    if _pool is None:
+        _pool = WarmPool()
+    return _pool
@@ -4,12 +4,14 @@
 IPStreamer Web Interface for Multi-Category Playlist Management
 Access at: http://box-ip:6688/ipstreamer
 """
-from Components.config import config
+from Components.config import config, configfile
+from Plugins.Extensions.IPStreamer.catalog import getCatalog
 from Plugins.Extensions.IPStreamer.plugin import getPlaylistDir
+from Plugins.Extensions.IPStreamer.player_control import apply_live_settings, current_settings, set_audio_delay
+from Plugins.Extensions.IPStreamer.relay import getRelay
 from twisted.web import resource, server
 import json
 import os
-import glob
 
 def getPlaylistDirWeb():
     path = config.plugins.IPStreamer.settingsPath.value
@@ -37,6 +39,10 @@ class IPStreamerAPI(resource.Resource):
             # Get category from query parameter
             category = request.args.get(b'category', [b''])[0].decode('utf-8')
             return self.getPlaylist(category)
+        elif path.endswith('/audio'):
+            return self.getAudio()
+        elif path.endswith('/nowplaying'):
+            return self.getNowPlaying()
         else:
             return b'{"error": "Unknown endpoint"}'
     
@@ -55,6 +61,8 @@ class IPStreamerAPI(resource.Resource):
             return self.deleteCategory(request)
         elif path.endswith('/rename-category'):
             return self.renameCategory(request)
+        elif path.endswith('/audio'):
+            return self.setAudio(request)
         else:
             return b'{"error": "Unknown endpoint"}'
     
@@ -67,19 +75,14 @@ class IPStreamerAPI(resource.Resource):
                 os.makedirs(playlist_dir)
             
             categories = []
-            files = glob.glob(playlist_dir + 'ipstreamer_*.json')
-            
-            for filepath in sorted(files):
+            for entry in getCatalog().categories(playlist_dir):
+                filepath = entry['file']
                 filename = os.path.basename(filepath)
                 category = filename.replace('ipstreamer_', '').replace('.json', '')
                 
                 # Count channels
-                try:
-                    with open(filepath, 'r') as f:
-                        data = json.load(f)
-                        count = len(data.get('playlist', []))
-                except:
-                    count = 0
+                data = getCatalog().playlist(filepath)
+                count = len(data.get('playlist', [])) if isinstance(data, dict) else 0
                 
                 categories.append({
                     'name': category,
@@ -101,10 +104,9 @@ class IPStreamerAPI(resource.Resource):
             
             filepath = playlist_dir + 'ipstreamer_{}.json'.format(category)
             
-            if os.path.exists(filepath):
-                with open(filepath, 'r') as f:
-                    data = f.read()
-                return data.encode('utf-8')
+            data = getCatalog().playlist(filepath)
+            if data is not None:
+                return json.dumps(data).encode('utf-8')
             else:
                 return b'{"playlist": []}'
         except Exception as e:
@@ -214,6 +216,46 @@ class IPStreamerAPI(resource.Resource):
         except Exception as e:
             return json.dumps({'success': False, 'error': str(e)}).encode('utf-8')
 
+    def getAudio(self):
+        """Return volume, equalizer and delay settings"""
+        try:
+            data = current_settings()
+            data['equalizers'] = list(config.plugins.IPStreamer.equalizer.choices)
+            return json.dumps(data).encode('utf-8')
+        except Exception as e:
+            return json.dumps({'error': str(e)}).encode('utf-8')
+    
+    def getNowPlaying(self):
+        """Return the playing stream and its live (ICY) title"""
+        try:
+            url, title = getRelay().nowPlaying()
+            return json.dumps({'url': url, 'title': title}).encode('utf-8')
+        except Exception as e:
+            return json.dumps({'error': str(e)}).encode('utf-8')
+
+    def setAudio(self, request):
+        """Change volume/equalizer/delay; applied live when the player supports it"""
+        try:
+            content = request.content.read()
+            data = json.loads(content.decode('utf-8'))
+            
+            if 'volume_level' in data:
+                config.plugins.IPStreamer.volLevel.value = max(1, min(100, int(data['volume_level'])))
+                config.plugins.IPStreamer.volLevel.save()
+            if 'equalizer' in data:
+                if data['equalizer'] not in list(config.plugins.IPStreamer.equalizer.choices):
+                    return b'{"success": false, "error": "Unknown equalizer preset"}'
+                config.plugins.IPStreamer.equalizer.value = data['equalizer']
+                config.plugins.IPStreamer.equalizer.save()
+            if 'delay_sec' in data:
+                set_audio_delay(float(data['delay_sec']))
+            configfile.save()
+            
+            # live = false: saved, takes effect on the next play
+            return json.dumps({'success': True, 'live': apply_live_settings()}).encode('utf-8')
+        except Exception as e:
+            return json.dumps({'success': False, 'error': str(e)}).encode('utf-8')
+
 class IPStreamerWebInterface(resource.Resource):
     """Main web interface"""
     
@@ -227,6 +269,8 @@ class IPStreamerWebInterface(resource.Resource):
         api.putChild(b"create-category", IPStreamerAPI())
         api.putChild(b"delete-category", IPStreamerAPI())
         api.putChild(b"rename-category", IPStreamerAPI())
+        api.putChild(b"audio", IPStreamerAPI())
+        api.putChild(b"nowplaying", IPStreamerAPI())
         self.putChild(b"api", api)
     
     def getChild(self, path, request):
@@ -478,6 +522,22 @@ class IPStreamerWebInterface(resource.Resource):
             font-size: 14px;
             opacity: 0.9;
         }
+        .audio-panel {
+            margin-top: 25px;
+            padding-top: 15px;
+            border-top: 1px solid #dee2e6;
+        }
+        .audio-panel h3 {
+            margin-bottom: 10px;
+        }
+        .audio-panel select, .audio-panel input[type=range] {
+            width: 100%;
+        }
+        .audio-status {
+            margin-top: 10px;
+            font-size: 12px;
+            color: #6c757d;
+        }
     </style>
 </head>
 <body>
@@ -493,6 +553,26 @@ class IPStreamerWebInterface(resource.Resource):
                     ➕ New Category
                 </button>
                 <div id="categoryList"></div>
+                
+                <div class="audio-panel">
+                    <h3>🔊 Audio</h3>
+                    <p id="nowPlaying" class="audio-status"></p>
+                    <div class="form-group">
+                        <label>Volume <span id="audioVolumeValue"></span></label>
+                        <input type="range" id="audioVolume" min="1" max="100"
+                               oninput="document.getElementById('audioVolumeValue').textContent = this.value">
+                    </div>
+                    <div class="form-group">
+                        <label>Equalizer</label>
+                        <select id="audioEqualizer"></select>
+                    </div>
+                    <div class="form-group">
+                        <label>Delay (seconds)</label>
+                        <input type="number" id="audioDelay" min="-10" max="60" step="0.05">
+                    </div>
+                    <button style="width: 100%;" onclick="saveAudio()">Apply</button>
+                    <p id="audioStatus" class="audio-status"></p>
+                </div>
             </div>
             
             <div class="content">
@@ -570,10 +650,50 @@ class IPStreamerWebInterface(resource.Resource):
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ old_name: oldName, new_name: newName })
-            }).then(r => r.json())
+            }).then(r => r.json()),
+            getAudio: () => fetch('/ipstreamer/api/audio').then(r => r.json()),
+            setAudio: (data) => fetch('/ipstreamer/api/audio', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(data)
+            }).then(r => r.json()),
+            getNowPlaying: () => fetch('/ipstreamer/api/nowplaying').then(r => r.json())
         };
         
-        window.onload = () => loadCategories();
+        window.onload = () => { loadCategories(); loadAudio(); loadNowPlaying(); setInterval(loadNowPlaying, 10000); };
+        
+        function loadNowPlaying() {
+            API.getNowPlaying().then(data => {
+                document.getElementById('nowPlaying').textContent = data.title ? '▶ ' + data.title : '';
+            }).catch(() => {});
+        }
+        
+        function loadAudio() {
+            API.getAudio().then(data => {
+                if (data.error) return;
+                document.getElementById('audioVolume').value = data.volume_level;
+                document.getElementById('audioVolumeValue').textContent = data.volume_level;
+                document.getElementById('audioEqualizer').innerHTML = data.equalizers.map(eq =>
+                    `<option value="${eq}" ${eq === data.equalizer ? 'selected' : ''}>${eq}</option>`
+                ).join('');
+                document.getElementById('audioDelay').value = data.delay_sec;
+            });
+        }
+        
+        function saveAudio() {
+            API.setAudio({
+                volume_level: parseInt(document.getElementById('audioVolume').value),
+                equalizer: document.getElementById('audioEqualizer').value,
+                delay_sec: parseFloat(document.getElementById('audioDelay').value) || 0
+            }).then(data => {
+                const status = document.getElementById('audioStatus');
+                if (!data.success) {
+                    status.textContent = 'Error: ' + data.error;
+                } else {
+                    status.textContent = data.live ? 'Applied to running stream' : 'Saved, applies on next play';
+                }
+            }).catch(err => alert('Error saving audio settings: ' + err));
+        }
         
         function loadCategories() {
             API.getCategories().then(data => {
@@ -0,0 +1,53 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "source"))
+
+import av_calibrate
+
+RATE = av_calibrate.RATE
+SECONDS = 30
+
+
+@unittest.skipIf(av_calibrate.np is None, "numpy not installed")
+class EstimateOffsetTest(unittest.TestCase):
+
+    def check(self, offset):
+        ref, other = av_calibrate.synth_pair(offset, SECONDS, RATE)
+        estimate, confidence = av_calibrate.estimate_offset(ref, other, RATE)
+        self.assertAlmostEqual(estimate, offset, delta=1.0 / RATE)
+        # delay_calibration.MIN_CONFIDENCE: below it a result is not applied
+        self.assertGreater(confidence, 6.0)
+
+    def test_other_ahead(self):
+        self.check(1.25)
+
+    def test_other_behind(self):
+        self.check(-3.5)
+
+    def test_longer_offset(self):
+        self.check(7.0)
+
+    def test_no_offset(self):
+        self.check(0.0)
+
+    def test_wav_round_trip(self):
+        import tempfile
+        ref, other = av_calibrate.synth_pair(2.0, SECONDS, RATE)
+        work = tempfile.mkdtemp()
+        try:
+            paths = [os.path.join(work, name) for name in ("ref.wav", "other.wav")]
+            av_calibrate.write_wav(paths[0], ref, RATE)
+            av_calibrate.write_wav(paths[1], other, RATE)
+            estimate, confidence = av_calibrate.estimate_offset(
+                av_calibrate.read_wav(paths[0], RATE), av_calibrate.read_wav(paths[1], RATE), RATE)
+        finally:
+            for path in paths:
+                os.remove(path)
+            os.rmdir(work)
+        self.assertAlmostEqual(estimate, 2.0, delta=1.0 / RATE)
+
+
+if __name__ == "__main__":
+    unittest.main()
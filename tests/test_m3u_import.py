@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "source"))
+
+from m3u_parse import group_key, iter_entries, iter_lines, parse_extinf, write_playlists
+
+M3U = (u'﻿#EXTM3U\r\n'
+       u'#EXTINF:-1 tvg-id="bein1" tvg-logo="http://logo/1.png" group-title="Sports, HD",beIN 1\r\n'
+       u'http://host/live/1.ts\r\n'
+       u'#EXTINF:-1,News 24\r\n'
+       u'#EXTGRP:News\r\n'
+       u'rtmp://host/live/2\r\n'
+       u'#EXTINF:-1 group-title="الرياضة",رياضة 1\r\n'
+       u'http://host/live/3.ts\r\n').encode("utf-8")
+
+
+class IterLinesTest(unittest.TestCase):
+
+    def test_bom_and_line_endings(self):
+        data = b"\xef\xbb\xbf#EXTM3U\r\na\r\nb\nc\rd"
+        self.assertEqual(list(iter_lines([data])), ["#EXTM3U", "a", "b", "c", "d"])
+
+    def test_crlf_split_between_chunks(self):
+        chunks = [b"#EXTM3U\r", b"\nfirst\r", b"\nsecond\r\n"]
+        self.assertEqual(list(iter_lines(chunks)), ["#EXTM3U", "first", "second"])
+
+    def test_any_chunk_size(self):
+        whole = list(iter_lines([M3U]))
+        for size in (1, 2, 3, 7):
+            chunks = [M3U[i:i + size] for i in range(0, len(M3U), size)]
+            self.assertEqual(list(iter_lines(chunks)), whole)
+
+
+class ParseTest(unittest.TestCase):
+
+    def test_comma_inside_quotes(self):
+        attrs, name = parse_extinf('#EXTINF:-1 tvg-name="A, B" group-title="X,Y",Channel, One')
+        self.assertEqual(attrs["tvg-name"], "A, B")
+        self.assertEqual(attrs["group-title"], "X,Y")
+        self.assertEqual(name, "Channel, One")
+
+    def test_name_from_tvg_name(self):
+        self.assertEqual(parse_extinf('#EXTINF:-1 tvg-name="Only Attr",')[1], "Only Attr")
+
+    def test_entries(self):
+        entries = list(iter_entries(iter_lines([M3U])))
+        self.assertEqual(entries[0], {"channel": "beIN 1", "url": "http://host/live/1.ts", "tvg-id": "bein1",
+                                      "tvg-logo": "http://logo/1.png", "group-title": "Sports, HD"})
+        self.assertEqual(entries[1], {"channel": "News 24", "url": "rtmp://host/live/2", "group-title": "News"})
+        self.assertEqual(entries[2]["group-title"], u"الرياضة")
+
+    def test_url_without_extinf_is_skipped(self):
+        lines = ["#EXTM3U", "http://host/orphan.ts", "#EXTINF:-1,Kept", "http://host/kept.ts"]
+        self.assertEqual([e["channel"] for e in iter_entries(lines)], ["Kept"])
+
+
+class GroupKeyTest(unittest.TestCase):
+
+    def test_keys(self):
+        self.assertEqual(group_key("Sports | HD"), "sports_hd")
+        self.assertEqual(group_key(u"Спорт"), u"спорт")
+        self.assertEqual(group_key(u"الرياضة"), u"الرياضة")
+        self.assertEqual(len(group_key(u"★★★")), 8)
+        self.assertEqual(group_key("  "), "")
+
+
+class WritePlaylistsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self, path):
+        with open(path) as f:
+            return json.load(f)["playlist"]
+
+    def test_single_file(self):
+        entries = list(iter_entries(iter_lines([M3U])))
+        counts = write_playlists(iter(entries), self.dir, "prov")
+        path = os.path.join(self.dir, "ipstreamer_prov.json")
+        self.assertEqual(counts, {path: 3})
+        self.assertEqual(self.read(path), entries)
+        self.assertEqual(os.listdir(self.dir), ["ipstreamer_prov.json"])
+
+    def test_split_by_group(self):
+        entries = [{"channel": "a", "url": "http://h/a", "group-title": "Sport"},
+                   {"channel": "b", "url": "http://h/b", "group-title": "SPORT!"},
+                   {"channel": "c", "url": "http://h/c"},
+                   {"channel": "d", "url": "http://h/d", "group-title": u"Спорт"},
+                   {"channel": "e", "url": "http://h/e", "group-title": "Sport"}]
+        counts = write_playlists(iter(entries), self.dir, "prov", split_groups=True)
+        names = dict((os.path.basename(p), n) for p, n in counts.items())
+        self.assertEqual(names.pop("ipstreamer_prov_sport.json"), 2)
+        self.assertEqual(names.pop("ipstreamer_prov.json"), 1)
+        self.assertEqual(names.pop(u"ipstreamer_prov_спорт.json"), 1)
+        # 'SPORT!' has the same key as 'Sport' and gets a hash suffix
+        (collided, count), = names.items()
+        self.assertTrue(collided.startswith("ipstreamer_prov_sport_"))
+        self.assertEqual(count, 1)
+        self.assertEqual(self.read(os.path.join(self.dir, collided))[0]["channel"], "b")
+
+    def test_failed_write_leaves_nothing(self):
+        def broken():
+            yield {"channel": "a", "url": "http://h/a"}
+            raise IOError("connection lost")
+        self.assertRaises(IOError, write_playlists, broken(), self.dir, "prov")
+        self.assertEqual(os.listdir(self.dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
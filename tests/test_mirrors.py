@@ -0,0 +1,47 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "source"))
+
+from mirrors import add_token_mirror, url_token, with_token
+
+
+class WithTokenTest(unittest.TestCase):
+
+    def test_replaces_only_the_token(self):
+        url = "http://ab.example.com:8000/ab/live/ab.ts?token=ab&type=mpegts"
+        self.assertEqual(with_token(url, "ab_pw"),
+                         "http://ab.example.com:8000/ab/live/ab.ts?token=ab_pw&type=mpegts")
+
+    def test_escapes_the_token(self):
+        for token in ("p&w", "p+w", "p#w", "p%41w", "p w/x"):
+            mirror = with_token("http://host/u/1.ts?token=u&type=mpegts", token)
+            self.assertEqual(url_token(mirror), token)
+            self.assertTrue(mirror.endswith("&type=mpegts"))
+
+
+class AddTokenMirrorTest(unittest.TestCase):
+
+    def test_short_user_in_host_and_path(self):
+        # user "tv" also occurs in the host and the path
+        ch = {"url": "http://tv.example.com/tv/live/tv.ts?token=tv&type=mpegts"}
+        add_token_mirror(ch, "tv", ["tv_secret", "secret"])
+        self.assertEqual(ch["mirrors"], [
+            "http://tv.example.com/tv/live/tv.ts?token=tv_secret&type=mpegts",
+            "http://tv.example.com/tv/live/tv.ts?token=secret&type=mpegts",
+        ])
+
+    def test_short_password_in_path(self):
+        ch = {"url": "http://host/p1/live/p1.ts?token=user_p1"}
+        add_token_mirror(ch, "user_p1", ["p1"])
+        self.assertEqual(ch["mirrors"], ["http://host/p1/live/p1.ts?token=p1"])
+
+    def test_other_token_gets_no_mirrors(self):
+        ch = {"url": "http://host/live/1.ts?token=someone_else"}
+        add_token_mirror(ch, "tv", ["tv_secret"])
+        self.assertNotIn("mirrors", ch)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "source"))
+
+from ring import ByteRing, FileRing
+
+
+def stream(start, end):
+    """Bytes of a test stream whose byte at offset n is n % 251."""
+    return bytes(bytearray(n % 251 for n in range(start, end)))
+
+
+class ByteRingTest(unittest.TestCase):
+
+    def test_wraps_and_keeps_the_newest(self):
+        ring = ByteRing(1000)
+        ring.write(stream(0, 5000))
+        self.assertEqual((ring.start, ring.end), (4000, 5000))
+        self.assertEqual(ring.read(0, 8), stream(4000, 4008))
+        self.assertEqual(ring.read(4990, 100), stream(4990, 5000))
+
+    def check_take_over(self, big):
+        small = ByteRing(1000)
+        small.write(stream(0, 5000))
+        big.takeOver(small)
+        self.assertEqual((big.start, big.end, big.size()), (4000, 5000, 1000))
+        self.assertEqual(big.read(0, 8), stream(4000, 4008))
+        big.write(stream(5000, 7000))
+        self.assertEqual((big.start, big.end), (4000, 7000))
+        self.assertEqual(big.read(4000, 3000), stream(4000, 7000))
+
+    def test_take_over_starts_at_the_old_start(self):
+        self.check_take_over(ByteRing(100 * 1024))
+
+    def test_file_ring_take_over(self):
+        path = os.path.join(tempfile.mkdtemp(), "pause.ring")
+        ring = FileRing(100 * 1024, path)
+        try:
+            self.check_take_over(ring)
+            # grown with the stream, not preallocated
+            self.assertEqual(os.path.getsize(path), 3000)
+        finally:
+            ring.close()
+            os.rmdir(os.path.dirname(path))
+        self.assertFalse(os.path.exists(path))
+
+    def test_file_ring_wraps(self):
+        path = os.path.join(tempfile.mkdtemp(), "pause.ring")
+        ring = FileRing(1000, path)
+        try:
+            small = ByteRing(300)
+            small.write(stream(0, 700))
+            ring.takeOver(small)
+            ring.write(stream(700, 2500))
+            self.assertEqual((ring.start, ring.end), (1500, 2500))
+            self.assertEqual(ring.read(1500, 1000), stream(1500, 2500))
+            self.assertEqual(os.path.getsize(path), 1000)
+        finally:
+            ring.close()
+            os.rmdir(os.path.dirname(path))
+
+
+if __name__ == "__main__":
+    unittest.main()